@@ -0,0 +1,60 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.config import settings
+from app import models
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = models.Base.metadata
+SEARCH_OBJECTS = {"search_vector", "idx_audit_reports_search", "idx_unliquidated_transactions_search"}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Partitions of unliquidated_transactions and the scripts' staging tables are not in the models
+    if type_ == "table" and reflected and compare_to is None:
+        return False
+    # PostgreSQL full-text columns and their GIN indexes come from DDL events in app.models
+    if type_ in ("column", "index") and reflected and compare_to is None and name in SEARCH_OBJECTS:
+        return False
+    # Indexes declared with .ddl_if(dialect=...) only exist on that dialect
+    ddl_if = getattr(obj, "_ddl_if", None)
+    if type_ == "index" and ddl_if is not None and ddl_if.dialect not in (None, context.get_context().dialect.name):
+        return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=settings.database_url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(settings.database_url, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # SQLite cannot ALTER most things in place; batch mode copies the table instead
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
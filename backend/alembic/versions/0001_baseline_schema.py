@@ -0,0 +1,160 @@
+"""Baseline schema
+
+The six tables exactly as models.py (create_all) and database/schema.sql declared
+them before migrations were introduced, with create_all's index names. Databases
+created that way are adopted at this revision by ``python -m app.migrations`` (or
+``alembic stamp 0001``) instead of re-running it; everything added since comes in
+later revisions.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The 25 audit topics from Topicmodel1.R
+AUDIT_TOPICS = [
+    'Citation of COA Circulars',
+    'Financial accounting and bookkeeping',
+    'Employee/Personnel Payment Protocols',
+    'Need for timely submission of documents',
+    'City Audit Recommendations',
+    'Municipal Audit Recommendations',
+    'Fuel, Inventory, and Supplies Anomalies',
+    'Implementation of Audit Recommendations for Past Year',
+    'COA Circular Violations',
+    'Remittance of Withheld Income Taxes',
+    'Completion of Construction Projects/Contracts',
+    'Public land and property management',
+    'Utilization of Disaster Management Fund (LDRRMF)',
+    'Solid Waste Management Issues',
+    'Unliquidated Cash Advances Issues',
+    'Reporting of Local Financial Statements',
+    'General Recommendations and Observations',
+    'Management of Local Development Fund (LDF)',
+    'Procurement and Bidding Issues',
+    'Balance of Disallowances, Suspensions, and Charges',
+    'Real Property Tax Management',
+    'Property, Plant, and Equipment Records and Reporting Issues',
+    'Recommendations for Municipal Treasurer and Accountant',
+    'Gender and Development Budgeting and Project Issues',
+    'Municipal Financial Accounting and Management Issues',
+]
+
+def upgrade() -> None:
+    op.create_table('audit_topics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('topic_number', sa.Integer(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('terms', sa.Text(), nullable=True),
+    sa.Column('prevalence', sa.DECIMAL(precision=5, scale=4), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('topic_number')
+    )
+    op.create_index('ix_audit_topics_id', 'audit_topics', ['id'])
+
+    op.create_table('local_governments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('province', sa.String(length=255), nullable=True),
+    sa.Column('region', sa.String(length=100), nullable=True),
+    sa.Column('lgu_type', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name', 'province', name='_name_province_uc')
+    )
+    op.create_index('ix_local_governments_id', 'local_governments', ['id'])
+
+    op.create_table('audit_reports',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('lgu_id', sa.Integer(), nullable=True),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('report_type', sa.String(length=100), nullable=True),
+    sa.Column('file_path', sa.Text(), nullable=True),
+    sa.Column('raw_text', sa.Text(), nullable=True),
+    sa.Column('findings_text', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['lgu_id'], ['local_governments.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('lgu_id', 'year', 'report_type', name='_lgu_year_type_uc')
+    )
+    op.create_index('ix_audit_reports_id', 'audit_reports', ['id'])
+
+    op.create_table('llm_analysis',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('report_id', sa.Integer(), nullable=True),
+    sa.Column('lgu_id', sa.Integer(), nullable=True),
+    sa.Column('analysis_type', sa.String(length=100), nullable=False),
+    sa.Column('prompt', sa.Text(), nullable=True),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('model_name', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['lgu_id'], ['local_governments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['report_id'], ['audit_reports.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_llm_analysis_id', 'llm_analysis', ['id'])
+    op.create_index('ix_llm_analysis_lgu_id', 'llm_analysis', ['lgu_id'])
+    op.create_index('ix_llm_analysis_report_id', 'llm_analysis', ['report_id'])
+
+    op.create_table('report_topics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('report_id', sa.Integer(), nullable=True),
+    sa.Column('topic_id', sa.Integer(), nullable=True),
+    sa.Column('topic_proportion', sa.DECIMAL(precision=5, scale=4), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['report_id'], ['audit_reports.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['topic_id'], ['audit_topics.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('report_id', 'topic_id', name='_report_topic_uc')
+    )
+    op.create_index('ix_report_topics_id', 'report_topics', ['id'])
+    op.create_index('ix_report_topics_report_id', 'report_topics', ['report_id'])
+    op.create_index('ix_report_topics_topic_id', 'report_topics', ['topic_id'])
+
+    op.create_table('unliquidated_transactions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('lgu_id', sa.Integer(), nullable=True),
+    sa.Column('report_id', sa.Integer(), nullable=True),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.DECIMAL(precision=15, scale=2), nullable=False),
+    sa.Column('context_pre', sa.Text(), nullable=True),
+    sa.Column('context_post', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['lgu_id'], ['local_governments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['report_id'], ['audit_reports.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_unliquidated_transactions_id', 'unliquidated_transactions', ['id'])
+    op.create_index('ix_unliquidated_transactions_lgu_id', 'unliquidated_transactions', ['lgu_id'])
+    op.create_index('ix_unliquidated_transactions_year', 'unliquidated_transactions', ['year'])
+
+    topics = sa.table('audit_topics', sa.column('topic_number', sa.Integer), sa.column('description', sa.Text))
+    op.bulk_insert(topics, [
+        {'topic_number': number, 'description': description}
+        for number, description in enumerate(AUDIT_TOPICS, start=1)
+    ])
+
+
+def downgrade() -> None:
+    for table in (
+        'unliquidated_transactions', 'report_topics', 'llm_analysis', 'audit_reports',
+        'local_governments', 'audit_topics',
+    ):
+        op.drop_table(table)
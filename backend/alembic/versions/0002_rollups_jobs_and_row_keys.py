@@ -0,0 +1,351 @@
+"""Rollups, risk scores, LLM jobs, row keys and search indexes
+
+Everything the performance work added to the baseline schema, apart from the
+transaction partitioning of 0003:
+
+* rollup tables (LGU x year, province x year, year, topic x province x year), LGU
+  risk scores, the data version counter, LLM jobs and cached chunk summaries;
+* content hashes on reports and transactions, and the (lgu_id, year, source_seq)
+  natural key of CSV-loaded transactions;
+* prompt hashes on LLM analyses and the listing / filter indexes;
+* on PostgreSQL, pg_trgm indexes for LGU search and generated full-text columns.
+
+CSV rows already loaded are numbered within their LGU-year in id order (the order
+they were loaded in), so the natural key can be made unique; their content hashes
+are filled in by the next ``load_data.py --incremental``. The derived tables are
+built from the existing rows.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRANSACTIONS = 'unliquidated_transactions'
+SEARCH_DOCUMENTS = {
+    'audit_reports': "setweight(to_tsvector('english', coalesce(findings_text, '')), 'A') || "
+                     "setweight(to_tsvector('english', coalesce(raw_text, '')), 'B')",
+    TRANSACTIONS: "to_tsvector('english', coalesce(context_pre, '') || ' ' || coalesce(context_post, ''))",
+}
+NEW_TABLES = (
+    'llm_job_items', 'topic_province_year_rollups', 'lgu_year_rollups', 'lgu_risk_scores',
+    'yearly_rollups', 'province_year_rollups', 'llm_jobs', 'llm_chunk_summaries', 'data_versions',
+)
+TRANSACTION_INDEXES = [
+    ('idx_unliquidated_year_id', ['year', 'id']),
+    ('idx_unliquidated_report_id', ['report_id']),
+    ('idx_unliquidated_amount_id', ['amount', 'id']),
+    ('idx_unliquidated_year_amount_id', ['year', 'amount', 'id']),
+]
+
+
+def _create_tables():
+    op.create_table('data_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('llm_chunk_summaries',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('model_name', sa.String(length=100), nullable=True),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('content_hash')
+    )
+    op.create_table('llm_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('analysis_type', sa.String(length=100), nullable=False),
+    sa.Column('model_name', sa.String(length=100), nullable=False),
+    sa.Column('custom_prompt', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total_items', sa.Integer(), nullable=False),
+    sa.Column('completed_items', sa.Integer(), nullable=False),
+    sa.Column('failed_items', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.Column('started_at', sa.TIMESTAMP(), nullable=True),
+    sa.Column('finished_at', sa.TIMESTAMP(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_llm_jobs_id', 'llm_jobs', ['id'])
+
+    op.create_table('province_year_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('province', sa.String(length=255), nullable=True),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.DECIMAL(precision=18, scale=2), nullable=False),
+    sa.Column('avg_amount', sa.DECIMAL(precision=15, scale=2), nullable=True),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('lgus_count', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_province_year_rollups_province_year', 'province_year_rollups', ['province', 'year'])
+    op.create_index('ix_province_year_rollups_id', 'province_year_rollups', ['id'])
+    op.create_index('ix_province_year_rollups_year', 'province_year_rollups', ['year'])
+
+    op.create_table('yearly_rollups',
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.DECIMAL(precision=18, scale=2), nullable=False),
+    sa.Column('avg_amount', sa.DECIMAL(precision=15, scale=2), nullable=True),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('lgus_count', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('year')
+    )
+
+    op.create_table('lgu_risk_scores',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('lgu_id', sa.Integer(), nullable=False),
+    sa.Column('province', sa.String(length=255), nullable=True),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.DECIMAL(precision=18, scale=2), nullable=False),
+    sa.Column('previous_year', sa.Integer(), nullable=True),
+    sa.Column('yoy_change', sa.DECIMAL(precision=18, scale=2), nullable=True),
+    sa.Column('yoy_z', sa.Float(), nullable=False),
+    sa.Column('amount_z', sa.Float(), nullable=False),
+    sa.Column('peer_percentile', sa.Float(), nullable=False),
+    sa.Column('province_share', sa.Float(), nullable=False),
+    sa.Column('peer_count', sa.Integer(), nullable=False),
+    sa.Column('risk_score', sa.Float(), nullable=False),
+    sa.Column('scored_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['lgu_id'], ['local_governments.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('lgu_id', 'year', name='uq_lgu_risk_scores_lgu_year')
+    )
+    op.create_index('idx_lgu_risk_scores_province_year_score_id', 'lgu_risk_scores', ['province', 'year', 'risk_score', 'id'])
+    op.create_index('idx_lgu_risk_scores_score_id', 'lgu_risk_scores', ['risk_score', 'id'])
+    op.create_index('idx_lgu_risk_scores_year_score_id', 'lgu_risk_scores', ['year', 'risk_score', 'id'])
+    op.create_index('ix_lgu_risk_scores_id', 'lgu_risk_scores', ['id'])
+
+    op.create_table('lgu_year_rollups',
+    sa.Column('lgu_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.DECIMAL(precision=18, scale=2), nullable=False),
+    sa.Column('avg_amount', sa.DECIMAL(precision=15, scale=2), nullable=True),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['lgu_id'], ['local_governments.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('lgu_id', 'year')
+    )
+    op.create_index('ix_lgu_year_rollups_year', 'lgu_year_rollups', ['year'])
+
+    op.create_table('topic_province_year_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('topic_id', sa.Integer(), nullable=True),
+    sa.Column('province', sa.String(length=255), nullable=True),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('report_count', sa.Integer(), nullable=False),
+    sa.Column('proportion_sum', sa.DECIMAL(precision=18, scale=4), nullable=False),
+    sa.Column('refreshed_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['topic_id'], ['audit_topics.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_topic_province_year_rollups_topic_year', 'topic_province_year_rollups', ['topic_id', 'year'])
+    op.create_index('ix_topic_province_year_rollups_id', 'topic_province_year_rollups', ['id'])
+    op.create_index('ix_topic_province_year_rollups_year', 'topic_province_year_rollups', ['year'])
+
+    op.create_table('llm_job_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('report_id', sa.Integer(), nullable=True),
+    sa.Column('lgu_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('analysis_id', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['analysis_id'], ['llm_analysis.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['job_id'], ['llm_jobs.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['lgu_id'], ['local_governments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['report_id'], ['audit_reports.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_llm_job_items_job_status_id', 'llm_job_items', ['job_id', 'status', 'id'])
+    op.create_index('ix_llm_job_items_id', 'llm_job_items', ['id'])
+
+
+def _number_loaded_rows():
+    """Give CSV rows loaded before the natural key existed their position in their LGU-year."""
+    op.execute(
+        'CREATE TEMPORARY TABLE migration_source_seq AS '
+        'SELECT id, ROW_NUMBER() OVER (PARTITION BY lgu_id, year ORDER BY id) - 1 AS source_seq '
+        f'FROM {TRANSACTIONS} WHERE report_id IS NULL'
+    )
+    op.execute('CREATE INDEX idx_migration_source_seq_id ON migration_source_seq (id)')
+    # Correlated subquery rather than UPDATE ... FROM, which older SQLite lacks
+    op.execute(
+        f'UPDATE {TRANSACTIONS} SET source_seq = '
+        f'(SELECT s.source_seq FROM migration_source_seq s WHERE s.id = {TRANSACTIONS}.id) '
+        'WHERE report_id IS NULL'
+    )
+    op.execute('DROP TABLE migration_source_seq')
+
+
+# The derived tables as this revision builds them, frozen here rather than taken from
+# app.rollups / app.risk_scores, whose queries follow the current models
+ROLLUP_QUERIES = [
+    'INSERT INTO lgu_year_rollups (lgu_id, year, total_amount, avg_amount, transaction_count) '
+    f'SELECT lgu_id, year, SUM(amount), AVG(amount), COUNT(id) FROM {TRANSACTIONS} '
+    'WHERE lgu_id IS NOT NULL GROUP BY lgu_id, year',
+
+    'INSERT INTO province_year_rollups (province, year, total_amount, avg_amount, transaction_count, lgus_count) '
+    'SELECT g.province, r.year, SUM(r.total_amount), SUM(r.total_amount) / SUM(r.transaction_count), '
+    'SUM(r.transaction_count), COUNT(r.lgu_id) '
+    'FROM lgu_year_rollups r JOIN local_governments g ON g.id = r.lgu_id GROUP BY g.province, r.year',
+
+    # Transactions with no LGU are in no province row but count toward their year
+    'INSERT INTO yearly_rollups (year, total_amount, avg_amount, transaction_count, lgus_count) '
+    'SELECT year, SUM(total_amount), SUM(total_amount) / SUM(transaction_count), '
+    'SUM(transaction_count), SUM(lgus_count) FROM ('
+    'SELECT year, total_amount, transaction_count, lgus_count FROM province_year_rollups '
+    'UNION ALL '
+    f'SELECT year, SUM(amount), COUNT(id), 0 FROM {TRANSACTIONS} WHERE lgu_id IS NULL GROUP BY year'
+    ') parts GROUP BY year',
+
+    'INSERT INTO topic_province_year_rollups (topic_id, province, year, report_count, proportion_sum) '
+    'SELECT rt.topic_id, g.province, r.year, COUNT(rt.id), SUM(rt.topic_proportion) '
+    'FROM report_topics rt JOIN audit_reports r ON r.id = rt.report_id '
+    'LEFT OUTER JOIN local_governments g ON g.id = r.lgu_id '
+    'GROUP BY rt.topic_id, g.province, r.year',
+]
+RISK_SCORE_COLUMNS = [
+    'lgu_id', 'province', 'year', 'total_amount', 'previous_year', 'yoy_change',
+    'yoy_z', 'amount_z', 'peer_percentile', 'province_share', 'peer_count', 'risk_score',
+]
+
+
+def _score_lgu_years(rows):
+    """Robust z-scores of each LGU-year against its province-year peers, as of this revision."""
+    import numpy as np
+    import pandas as pd
+
+    def robust_z(values, keys):
+        grouped = values.groupby(keys)
+        median = grouped.transform('median')
+        mad = (values - median).abs().groupby(keys).transform('median') * 1.4826
+        usable = (mad > 0) & (grouped.transform('count') >= 3)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = (values - median) / mad
+        return z.where(usable, 0.0).fillna(0.0).clip(-10.0, 10.0)
+
+    frame = pd.DataFrame(rows, columns=['lgu_id', 'province', 'year', 'total_amount'])
+    frame = frame.sort_values(['lgu_id', 'year'], ignore_index=True)
+    amount = frame['total_amount'].astype(float)
+    log_amount = np.log1p(amount.clip(lower=0))
+
+    by_lgu = frame.groupby('lgu_id', sort=False)
+    previous_amount = by_lgu['total_amount'].shift().astype(float)
+    frame['previous_year'] = by_lgu['year'].shift()
+    frame['yoy_change'] = (amount - previous_amount).round(2)
+    growth = log_amount - np.log1p(previous_amount.clip(lower=0))
+
+    peers = [frame['province'].fillna(''), frame['year']]
+    frame['amount_z'] = robust_z(log_amount, peers)
+    frame['yoy_z'] = robust_z(growth, peers)
+
+    grouped = amount.groupby(peers)
+    frame['peer_percentile'] = grouped.rank(pct=True)
+    province_total = grouped.transform('sum')
+    frame['province_share'] = (amount / province_total).where(province_total > 0, 0.0)
+    frame['peer_count'] = grouped.transform('size')
+    frame['risk_score'] = frame['amount_z'].clip(lower=0) + frame['yoy_z'].clip(lower=0)
+
+    records = frame[RISK_SCORE_COLUMNS].astype(object).where(frame[RISK_SCORE_COLUMNS].notna(), None)
+    records = records.to_dict('records')
+    for record in records:
+        if record['previous_year'] is not None:
+            record['previous_year'] = int(record['previous_year'])
+    return records
+
+
+def _build_derived_tables():
+    bind = op.get_bind()
+    for query in ROLLUP_QUERIES:
+        op.execute(query)
+
+    rows = bind.execute(sa.text(
+        'SELECT r.lgu_id, g.province, r.year, r.total_amount '
+        'FROM lgu_year_rollups r JOIN local_governments g ON g.id = r.lgu_id'
+    )).all()
+    if rows:
+        risk_scores = sa.table('lgu_risk_scores', *[sa.column(name) for name in RISK_SCORE_COLUMNS])
+        op.bulk_insert(risk_scores, _score_lgu_years(rows))
+
+
+def upgrade() -> None:
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    _create_tables()
+
+    op.create_index('idx_local_governments_name_id', 'local_governments', ['name', 'id'])
+    op.create_index('idx_local_governments_province_name_id', 'local_governments', ['province', 'name', 'id'])
+
+    op.add_column('audit_reports', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index('idx_audit_reports_content_hash', 'audit_reports', ['content_hash'])
+
+    op.add_column('llm_analysis', sa.Column('prompt_hash', sa.String(length=64), nullable=True))
+    op.create_index('idx_llm_analysis_created_id', 'llm_analysis', ['created_at', 'id'])
+    op.create_index('idx_llm_analysis_prompt_hash', 'llm_analysis', ['prompt_hash'])
+
+    op.add_column(TRANSACTIONS, sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column(TRANSACTIONS, sa.Column('source_seq', sa.Integer(), server_default='0', nullable=False))
+    _number_loaded_rows()
+    op.create_index(
+        'idx_unliquidated_natural_key', TRANSACTIONS, ['lgu_id', 'year', 'source_seq'], unique=True,
+        postgresql_where=sa.text('report_id IS NULL'), sqlite_where=sa.text('report_id IS NULL')
+    )
+    for name, columns in TRANSACTION_INDEXES:
+        op.create_index(name, TRANSACTIONS, columns)
+
+    if postgresql:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('idx_local_governments_name_trgm', 'local_governments', ['name'],
+                        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+        op.create_index('idx_local_governments_province_trgm', 'local_governments', ['province'],
+                        postgresql_using='gin', postgresql_ops={'province': 'gin_trgm_ops'})
+        for table, document in SEARCH_DOCUMENTS.items():
+            op.execute(f'ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({document}) STORED')
+            op.execute(f'CREATE INDEX idx_{table}_search ON {table} USING gin (search_vector)')
+
+    _build_derived_tables()
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in SEARCH_DOCUMENTS:
+            op.execute(f'DROP INDEX IF EXISTS idx_{table}_search')
+            op.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
+        op.drop_index('idx_local_governments_province_trgm', table_name='local_governments')
+        op.drop_index('idx_local_governments_name_trgm', table_name='local_governments')
+
+    for name, _ in TRANSACTION_INDEXES:
+        op.drop_index(name, table_name=TRANSACTIONS)
+    op.drop_index('idx_unliquidated_natural_key', table_name=TRANSACTIONS)
+    with op.batch_alter_table(TRANSACTIONS) as batch:
+        batch.drop_column('source_seq')
+        batch.drop_column('content_hash')
+
+    op.drop_index('idx_llm_analysis_prompt_hash', table_name='llm_analysis')
+    op.drop_index('idx_llm_analysis_created_id', table_name='llm_analysis')
+    with op.batch_alter_table('llm_analysis') as batch:
+        batch.drop_column('prompt_hash')
+
+    op.drop_index('idx_audit_reports_content_hash', table_name='audit_reports')
+    with op.batch_alter_table('audit_reports') as batch:
+        batch.drop_column('content_hash')
+
+    op.drop_index('idx_local_governments_province_name_id', table_name='local_governments')
+    op.drop_index('idx_local_governments_name_id', table_name='local_governments')
+
+    for table in NEW_TABLES:
+        op.drop_table(table)
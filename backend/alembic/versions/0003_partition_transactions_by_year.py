@@ -0,0 +1,161 @@
+"""Partition unliquidated_transactions by year, denormalize province, covering indexes
+
+On PostgreSQL the table is rebuilt as PARTITION BY RANGE (year): one partition per
+report year from 2010 to 2030, one for earlier (typo) years and a DEFAULT partition
+for everything later. Year filters prune to a single partition, and every index is
+declared on the parent so each partition carries its own copy. The primary key
+becomes (id, year), since a partitioned table's unique keys must include the
+partition key; ids still come from the original sequence and stay unique.
+
+Both dialects gain a province column copied from local_governments, so the province
+filters of /transactions and the amount histogram no longer join, plus indexes that
+match those filters: (province, year, amount, id), (province, id) and (lgu_id, year, id)
+INCLUDE (amount), which replaces the single-column lgu_id and year indexes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = 'unliquidated_transactions'
+FIRST_YEAR = 2010
+LAST_YEAR = 2030
+CATCH_ALL_PARTITIONS = (f'{TABLE}_before_{FIRST_YEAR}', f'{TABLE}_default')
+
+SEARCH_DOCUMENT = "to_tsvector('english', coalesce(context_pre, '') || ' ' || coalesce(context_post, ''))"
+COPIED_COLUMNS = (
+    'id, lgu_id, report_id, year, amount, context_pre, context_post, '
+    'content_hash, source_seq, created_at, updated_at'
+)
+
+KEPT_INDEXES = [
+    ('idx_unliquidated_natural_key', ['lgu_id', 'year', 'source_seq'], {
+        'unique': True,
+        'postgresql_where': sa.text('report_id IS NULL'),
+        'sqlite_where': sa.text('report_id IS NULL'),
+    }),
+    ('idx_unliquidated_year_id', ['year', 'id'], {}),
+    ('idx_unliquidated_report_id', ['report_id'], {}),
+    ('idx_unliquidated_amount_id', ['amount', 'id'], {}),
+    ('idx_unliquidated_year_amount_id', ['year', 'amount', 'id'], {}),
+]
+NEW_INDEXES = [
+    ('idx_unliquidated_province_year_amount_id', ['province', 'year', 'amount', 'id'], {}),
+    ('idx_unliquidated_province_id', ['province', 'id'], {}),
+    ('idx_unliquidated_lgu_year_id', ['lgu_id', 'year', 'id'], {'postgresql_include': ['amount']}),
+]
+# Single-column indexes from the baseline (create_all and schema.sql named them differently)
+SUPERSEDED_INDEXES = [
+    ('ix_unliquidated_transactions_id', ['id']),
+    ('ix_unliquidated_transactions_lgu_id', ['lgu_id']),
+    ('ix_unliquidated_transactions_year', ['year']),
+]
+SCHEMA_SQL_INDEXES = ['idx_unliquidated_lgu', 'idx_unliquidated_year']
+
+
+def _create_table(name: str, partitioned: bool):
+    primary_key = 'PRIMARY KEY (id, year)' if partitioned else 'PRIMARY KEY (id)'
+    province = 'province VARCHAR(255), ' if partitioned else ''
+    op.execute(
+        f'CREATE TABLE {name} ('
+        f"id INTEGER NOT NULL DEFAULT nextval('{TABLE}_id_seq'), "
+        'lgu_id INTEGER REFERENCES local_governments(id) ON DELETE CASCADE, '
+        'report_id INTEGER REFERENCES audit_reports(id) ON DELETE CASCADE, '
+        f'{province}'
+        'year INTEGER NOT NULL, '
+        'amount NUMERIC(15, 2) NOT NULL, '
+        'context_pre TEXT, '
+        'context_post TEXT, '
+        f'search_vector tsvector GENERATED ALWAYS AS ({SEARCH_DOCUMENT}) STORED, '
+        'content_hash VARCHAR(64), '
+        'source_seq INTEGER NOT NULL DEFAULT 0, '
+        'created_at TIMESTAMP DEFAULT now(), '
+        'updated_at TIMESTAMP DEFAULT now(), '
+        f'{primary_key})'
+        + (' PARTITION BY RANGE (year)' if partitioned else '')
+    )
+
+
+def _create_partitions():
+    op.execute(
+        f'CREATE TABLE {CATCH_ALL_PARTITIONS[0]} PARTITION OF {TABLE} '
+        f'FOR VALUES FROM (MINVALUE) TO ({FIRST_YEAR})'
+    )
+    for year in range(FIRST_YEAR, LAST_YEAR + 1):
+        op.execute(f'CREATE TABLE {TABLE}_{year} PARTITION OF {TABLE} FOR VALUES FROM ({year}) TO ({year + 1})')
+    op.execute(f'CREATE TABLE {CATCH_ALL_PARTITIONS[1]} PARTITION OF {TABLE} DEFAULT')
+
+
+def _rebuild_postgresql(partitioned: bool):
+    """Swap the table for a (non-)partitioned copy; ALTER TABLE cannot change either way."""
+    old = f'{TABLE}_old'
+    op.execute(f'ALTER TABLE {TABLE} RENAME TO {old}')
+    # Index and constraint names are schema-wide; free them for the new table
+    for constraint in ('pkey', 'lgu_id_fkey', 'report_id_fkey'):
+        op.execute(f'ALTER TABLE {old} DROP CONSTRAINT IF EXISTS {TABLE}_{constraint}')
+    for name in [name for name, _, _ in KEPT_INDEXES + NEW_INDEXES] + [name for name, _ in SUPERSEDED_INDEXES]:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+    op.execute(f'ALTER SEQUENCE {TABLE}_id_seq OWNED BY NONE')
+
+    _create_table(TABLE, partitioned)
+    if partitioned:
+        _create_partitions()
+        op.execute(
+            f'INSERT INTO {TABLE} ({COPIED_COLUMNS}, province) '
+            f'SELECT {", ".join("t." + c for c in COPIED_COLUMNS.split(", "))}, g.province '
+            f'FROM {old} t LEFT JOIN local_governments g ON g.id = t.lgu_id'
+        )
+    else:
+        op.execute(f'INSERT INTO {TABLE} ({COPIED_COLUMNS}) SELECT {COPIED_COLUMNS} FROM {old}')
+
+    op.execute(f'DROP TABLE {old}')
+    op.execute(f'ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+    op.execute(f'CREATE INDEX IF NOT EXISTS idx_{TABLE}_search ON {TABLE} USING gin (search_vector)')
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _rebuild_postgresql(partitioned=True)
+        for name, columns, options in KEPT_INDEXES:
+            op.create_index(name, TABLE, columns, **options)
+        # Catch-all partitions hold many years each, so pruning alone does not narrow a
+        # year filter there; a BRIN range map of a few pages lets scans skip blocks
+        for partition in CATCH_ALL_PARTITIONS:
+            op.execute(f'CREATE INDEX idx_{partition}_year_brin ON {partition} USING brin (year)')
+    else:
+        op.add_column(TABLE, sa.Column('province', sa.String(length=255)))
+        op.execute(
+            f'UPDATE {TABLE} SET province = '
+            f'(SELECT g.province FROM local_governments g WHERE g.id = {TABLE}.lgu_id)'
+        )
+        for name in [name for name, _ in SUPERSEDED_INDEXES] + SCHEMA_SQL_INDEXES:
+            op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    for name, columns, options in NEW_INDEXES:
+        op.create_index(name, TABLE, columns, **options)
+    op.execute(f'ANALYZE {TABLE}')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _rebuild_postgresql(partitioned=False)
+        for name, columns, options in KEPT_INDEXES:
+            op.create_index(name, TABLE, columns, **options)
+    else:
+        for name, _, _ in NEW_INDEXES:
+            op.drop_index(name, table_name=TABLE)
+        op.drop_column(TABLE, 'province')
+
+    for name, columns in SUPERSEDED_INDEXES:
+        op.create_index(name, TABLE, columns)
@@ -0,0 +1,134 @@
+from decimal import Decimal
+from typing import List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas
+from .columnar import engine as columnar_engine
+
+
+async def yearly_rollups(db: AsyncSession) -> List[models.YearlyRollup]:
+    if columnar_engine.enabled:
+        return (await columnar_engine.snapshot(db)).yearly()
+    return (await db.scalars(select(models.YearlyRollup).order_by(models.YearlyRollup.year))).all()
+
+
+def format_yearly_trends(rollups: List[models.YearlyRollup]) -> List[dict]:
+    return [
+        {
+            "year": r.year,
+            "total_amount": float(r.total_amount),
+            "avg_amount": float(r.avg_amount),
+            "transaction_count": r.transaction_count,
+            "lgus_count": r.lgus_count
+        }
+        for r in rollups
+    ]
+
+
+async def overall_stats(
+    db: AsyncSession,
+    rollups: Optional[List[models.YearlyRollup]] = None
+) -> schemas.StatsResponse:
+    # The three table counts come back in one round trip as scalar subqueries
+    total_lgus, provinces_count, total_reports = (await db.execute(select(
+        select(func.count(models.LocalGovernment.id)).scalar_subquery(),
+        select(func.count(func.distinct(models.LocalGovernment.province))).scalar_subquery(),
+        select(func.count(models.AuditReport.id)).scalar_subquery()
+    ))).one()
+
+    if rollups is None:
+        rollups = await yearly_rollups(db)
+
+    return schemas.StatsResponse(
+        total_lgus=total_lgus,
+        total_reports=total_reports,
+        total_unliquidated_amount=sum((r.total_amount for r in rollups), Decimal(0)),
+        years_covered=[r.year for r in rollups],
+        provinces_count=provinces_count
+    )
+
+
+async def province_totals(db: AsyncSession, year: Optional[int] = None) -> List[dict]:
+    if columnar_engine.enabled:
+        return (await columnar_engine.snapshot(db)).province_totals(year)
+
+    stmt = select(
+        models.ProvinceYearRollup.province,
+        func.sum(models.ProvinceYearRollup.total_amount).label("total_amount"),
+        func.sum(models.ProvinceYearRollup.transaction_count).label("count")
+    )
+
+    if year:
+        stmt = stmt.where(models.ProvinceYearRollup.year == year)
+
+    results = await db.execute(
+        stmt.group_by(models.ProvinceYearRollup.province).order_by(
+            func.sum(models.ProvinceYearRollup.total_amount).desc()
+        )
+    )
+
+    return [
+        {
+            "province": r.province,
+            "total_amount": float(r.total_amount),
+            "count": r.count
+        }
+        for r in results
+    ]
+
+
+async def top_lgus(db: AsyncSession, limit: int, year: Optional[int] = None) -> List[dict]:
+    if columnar_engine.enabled:
+        return (await columnar_engine.snapshot(db)).top_lgus(limit, year)
+
+    stmt = select(
+        models.LocalGovernment.id,
+        models.LocalGovernment.name,
+        models.LocalGovernment.province,
+        func.sum(models.LGUYearRollup.total_amount).label("total_amount"),
+        func.sum(models.LGUYearRollup.transaction_count).label("transaction_count")
+    ).join(models.LGUYearRollup, models.LGUYearRollup.lgu_id == models.LocalGovernment.id)
+
+    if year:
+        stmt = stmt.where(models.LGUYearRollup.year == year)
+
+    results = await db.execute(
+        stmt.group_by(
+            models.LocalGovernment.id,
+            models.LocalGovernment.name,
+            models.LocalGovernment.province
+        ).order_by(
+            func.sum(models.LGUYearRollup.total_amount).desc()
+        ).limit(limit)
+    )
+
+    return [
+        {
+            "lgu_id": r.id,
+            "lgu_name": r.name,
+            "province": r.province,
+            "total_amount": float(r.total_amount),
+            "transaction_count": r.transaction_count
+        }
+        for r in results
+    ]
+
+
+async def province_year_heatmap(db: AsyncSession) -> List[dict]:
+    if columnar_engine.enabled:
+        return (await columnar_engine.snapshot(db)).province_year_heatmap()
+
+    results = await db.execute(select(
+        models.ProvinceYearRollup.province,
+        models.ProvinceYearRollup.year,
+        models.ProvinceYearRollup.total_amount
+    ))
+
+    return [
+        {
+            "province": r.province,
+            "year": r.year,
+            "total_amount": float(r.total_amount)
+        }
+        for r in results
+    ]
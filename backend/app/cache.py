@@ -0,0 +1,145 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CACHEABLE_PATHS = (
+    "/analytics/stats",
+    "/analytics/trends",
+    "/analytics/distribution",
+    "/analytics/heatmap",
+    "/analytics/dashboard",
+    "/transactions/years",
+    "/transactions/aggregate",
+    "/transactions/top-lgus",
+    "/lgus/provinces",
+    "/topics",
+)
+
+
+@dataclass
+class CachedResponse:
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: str
+    stored_at: float
+
+
+class ResponseCache:
+    """LRU cache of rendered responses with a per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: tuple, entry: CachedResponse) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCacheMiddleware:
+    """Serves repeated GETs on read-mostly routes from memory.
+
+    Entries are keyed on path, normalized query string, Accept header and the
+    global data version, so a load that bumps the version makes every older
+    entry unreachable. Responses carry a strong ETag and If-None-Match is
+    answered with 304.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache: ResponseCache,
+        version_source: Callable[[], Awaitable[int]],
+        paths: Sequence[str] = CACHEABLE_PATHS
+    ):
+        self.app = app
+        self.cache = cache
+        self.version_source = version_source
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            version = await self.version_source()
+        except Exception:
+            # No version table yet: serve uncached rather than risk stale data
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        query = urlencode(sorted(parse_qsl(scope["query_string"].decode(), keep_blank_values=True)))
+        key = (scope["path"], query, headers.get("accept", ""), version)
+
+        entry = self.cache.get(key)
+        if entry is None:
+            messages = []
+
+            async def capture(message: Message):
+                messages.append(message)
+
+            await self.app(scope, receive, capture)
+
+            start = messages[0]
+            if start["status"] != 200:
+                for message in messages:
+                    await send(message)
+                return
+
+            body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+            entry = CachedResponse(
+                status=start["status"],
+                headers=[(k, v) for k, v in start["headers"] if k.lower() != b"etag"],
+                body=body,
+                etag=make_etag(body),
+                stored_at=time.monotonic()
+            )
+            self.cache.set(key, entry)
+
+        validators = [(b"etag", entry.etag.encode()), (b"cache-control", b"no-cache")]
+        if etag_matches(headers.get("if-none-match"), entry.etag):
+            await send({"type": "http.response.start", "status": 304, "headers": validators})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": entry.status,
+            "headers": [(k, v) for k, v in entry.headers if k.lower() != b"cache-control"] + validators
+        })
+        await send({"type": "http.response.body", "body": entry.body})
@@ -0,0 +1,232 @@
+import asyncio
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .config import settings
+from .data_version import data_version_tracker
+
+CENTS = Decimal("0.01")
+
+
+def _to_decimal(centavos) -> Decimal:
+    return (Decimal(int(centavos)) * CENTS).quantize(CENTS)
+
+
+@dataclass
+class YearTotals:
+    year: int
+    total_amount: Decimal
+    avg_amount: Decimal
+    transaction_count: int
+    lgus_count: int
+
+
+class TransactionColumns:
+    """Transactions joined to their LGU, held as parallel NumPy arrays.
+
+    Amounts are int64 centavos, LGUs are dense positions into the lgu_* arrays
+    and provinces are dictionary-encoded. Transactions with no LGU are kept
+    apart and only count toward the yearly totals, as in the SQL rollups.
+    Group sums accumulate in int64, so they match the SQL sums exactly at any scale.
+    """
+
+    def __init__(self, transactions, lgus, version: int):
+        self.version = version
+
+        lgu_ids = np.array([row[0] for row in lgus], dtype=np.int64)
+        self.lgu_ids = lgu_ids
+        self.lgu_names = [row[1] for row in lgus]
+        self.provinces: List[Optional[str]] = sorted(
+            {row[2] for row in lgus}, key=lambda p: (p is None, p or "")
+        )
+        province_codes = {province: code for code, province in enumerate(self.provinces)}
+        self.lgu_province_codes = np.array([province_codes[row[2]] for row in lgus], dtype=np.int32)
+        self.province_codes = province_codes
+
+        count = len(transactions)
+        years = np.fromiter((row[0] for row in transactions), dtype=np.int32, count=count)
+        attributed = np.fromiter((row[1] is not None for row in transactions), dtype=bool, count=count)
+        txn_lgu_ids = np.fromiter(
+            (row[1] if row[1] is not None else -1 for row in transactions), dtype=np.int64, count=count
+        )
+        amounts = np.fromiter((round(row[2] * 100) for row in transactions), dtype=np.int64, count=count)
+        self.unattributed_years = years[~attributed]
+        self.unattributed_amounts = amounts[~attributed]
+
+        # Map each transaction's lgu_id to its position in lgu_ids; orphans are dropped
+        order = np.argsort(lgu_ids)
+        positions = np.zeros(count, dtype=np.int64)
+        known = np.zeros(count, dtype=bool)
+        if len(order):
+            found = np.minimum(np.searchsorted(lgu_ids[order], txn_lgu_ids), len(order) - 1)
+            positions = order[found]
+            known = lgu_ids[positions] == txn_lgu_ids
+
+        self.years = years[known]
+        self.lgu_positions = positions[known].astype(np.int32)
+        self.amounts = amounts[known]
+        self.txn_province_codes = self.lgu_province_codes[self.lgu_positions]
+
+        self.year_values, self.year_codes = np.unique(self.years, return_inverse=True)
+
+    @classmethod
+    async def load(cls, db: AsyncSession, version: int) -> "TransactionColumns":
+        txn = models.UnliquidatedTransaction
+        transactions = (await db.execute(
+            select(txn.year, txn.lgu_id, txn.amount).where(txn.amount.isnot(None))
+        )).all()
+        lgus = (await db.execute(select(
+            models.LocalGovernment.id,
+            models.LocalGovernment.name,
+            models.LocalGovernment.province
+        ))).all()
+        return cls(transactions, lgus, version)
+
+    def _mask(self, year: Optional[int] = None, province: Optional[str] = None) -> np.ndarray:
+        mask = np.ones(len(self.amounts), dtype=bool)
+        if year:
+            mask &= self.years == year
+        if province:
+            code = self.province_codes.get(province)
+            if code is None:
+                return np.zeros(len(self.amounts), dtype=bool)
+            mask &= self.txn_province_codes == code
+        return mask
+
+    @staticmethod
+    def _group(codes: np.ndarray, amounts: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        counts = np.bincount(codes, minlength=size)
+        sums = np.zeros(size, dtype=np.int64)
+        np.add.at(sums, codes, amounts)
+        return counts, sums
+
+    def yearly(self) -> List[YearTotals]:
+        year_values = np.union1d(self.year_values, self.unattributed_years)
+        size = len(year_values)
+        year_codes = np.searchsorted(year_values, self.years)
+        counts, sums = self._group(
+            np.concatenate([year_codes, np.searchsorted(year_values, self.unattributed_years)]),
+            np.concatenate([self.amounts, self.unattributed_amounts]),
+            size
+        )
+        pairs = np.unique(year_codes.astype(np.int64) * len(self.lgu_ids) + self.lgu_positions)
+        lgus = np.bincount(pairs // max(len(self.lgu_ids), 1), minlength=size)
+
+        return [
+            YearTotals(
+                year=int(year_values[i]),
+                total_amount=_to_decimal(sums[i]),
+                # Half a centavo rounds away from zero, as SQL ROUND does on NUMERIC
+                avg_amount=(Decimal(int(sums[i])) / counts[i] * CENTS).quantize(CENTS, rounding=ROUND_HALF_UP),
+                transaction_count=int(counts[i]),
+                lgus_count=int(lgus[i])
+            )
+            for i in range(size) if counts[i]
+        ]
+
+    def province_totals(self, year: Optional[int] = None) -> List[dict]:
+        mask = self._mask(year)
+        counts, sums = self._group(self.txn_province_codes[mask], self.amounts[mask], len(self.provinces))
+        order = np.argsort(-sums, kind="stable")
+
+        return [
+            {
+                "province": self.provinces[code],
+                "total_amount": float(_to_decimal(sums[code])),
+                "count": int(counts[code])
+            }
+            for code in order if counts[code]
+        ]
+
+    def top_lgus(self, limit: int, year: Optional[int] = None) -> List[dict]:
+        mask = self._mask(year)
+        counts, sums = self._group(self.lgu_positions[mask], self.amounts[mask], len(self.lgu_ids))
+        present = np.flatnonzero(counts)
+        if len(present) > limit:
+            present = present[np.argpartition(-sums[present], limit - 1)[:limit]]
+        present = present[np.argsort(-sums[present], kind="stable")]
+
+        return [
+            {
+                "lgu_id": int(self.lgu_ids[pos]),
+                "lgu_name": self.lgu_names[pos],
+                "province": self.provinces[self.lgu_province_codes[pos]],
+                "total_amount": float(_to_decimal(sums[pos])),
+                "transaction_count": int(counts[pos])
+            }
+            for pos in present
+        ]
+
+    def province_year_heatmap(self) -> List[dict]:
+        years = len(self.year_values)
+        cells = self.txn_province_codes.astype(np.int64) * years + self.year_codes
+        counts, sums = self._group(cells, self.amounts, len(self.provinces) * years)
+
+        return [
+            {
+                "province": self.provinces[cell // years],
+                "year": int(self.year_values[cell % years]),
+                "total_amount": float(_to_decimal(sums[cell]))
+            }
+            for cell in np.flatnonzero(counts)
+        ]
+
+    def amount_bounds(self) -> Tuple[Optional[Decimal], Optional[Decimal]]:
+        positive = self.amounts[self.amounts > 0]
+        if not len(positive):
+            return None, None
+        return _to_decimal(positive.min()), _to_decimal(self.amounts.max())
+
+    def amount_histogram(
+        self,
+        edges: List[float],
+        group_by: Optional[str] = None,
+        year: Optional[int] = None,
+        province: Optional[str] = None
+    ) -> Dict[tuple, Tuple[int, Decimal]]:
+        """Bucket counts and sums keyed like the SQL histogram: (group key, bucket)."""
+        mask = self._mask(year, province)
+        amounts = self.amounts[mask]
+        edge_centavos = np.rint(np.array(edges, dtype=np.float64) * 100).astype(np.int64)
+        buckets = np.searchsorted(edge_centavos, amounts, side="right") - 1
+        in_range = buckets >= 0
+        amounts, buckets = amounts[in_range], buckets[in_range]
+
+        if group_by == "year":
+            group_codes, group_labels = self.year_codes[mask][in_range], [int(y) for y in self.year_values]
+        elif group_by == "province":
+            group_codes, group_labels = self.txn_province_codes[mask][in_range], self.provinces
+        else:
+            group_codes, group_labels = np.zeros(len(amounts), dtype=np.int64), [None]
+
+        cells = group_codes.astype(np.int64) * len(edges) + buckets
+        counts, sums = self._group(cells, amounts, len(group_labels) * len(edges))
+
+        return {
+            (group_labels[cell // len(edges)], int(cell % len(edges))): (int(counts[cell]), _to_decimal(sums[cell]))
+            for cell in np.flatnonzero(counts)
+        }
+
+
+class ColumnarEngine:
+    """Keeps a TransactionColumns snapshot in step with the data version."""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._snapshot: Optional[TransactionColumns] = None
+        self._lock = asyncio.Lock()
+
+    async def snapshot(self, db: AsyncSession) -> TransactionColumns:
+        version = await data_version_tracker.current()
+        if self._snapshot is None or self._snapshot.version != version:
+            async with self._lock:
+                if self._snapshot is None or self._snapshot.version != version:
+                    self._snapshot = await TransactionColumns.load(db, version)
+        return self._snapshot
+
+
+engine = ColumnarEngine(settings.columnar_engine_enabled)
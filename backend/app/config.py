@@ -9,13 +9,39 @@ class Settings(BaseSettings):
     postgres_db: str
     postgres_host: str = "localhost"
     postgres_port: int = 5432
+    db_pool_size: int = 20
+    db_max_overflow: int = 30
 
     openai_api_key: str = ""
     anthropic_api_key: str = ""
+    llm_provider: str = "placeholder"
+    llm_base_url: str = "https://api.anthropic.com"
+    llm_timeout_seconds: float = 60.0
+    llm_max_tokens: int = 1024
+    llm_max_concurrency: int = 8
+    llm_requests_per_second: float = 5.0
+    llm_burst: int = 10
+    llm_max_retries: int = 4
+    llm_job_workers: int = 2
+    llm_batch_insert_size: int = 50
+    llm_progress_interval_seconds: float = 1.0
+    llm_mock_latency_seconds: float = 0.05
+    llm_context_token_budget: int = 6000
+    llm_context_chunk_tokens: int = 800
+    llm_context_summarize: bool = True
 
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     debug: bool = True
+    sql_echo_sample_rate: float = 0.0
+    n_plus_one_threshold: int = 10
+    metrics_enabled: bool = True
+    response_cache_enabled: bool = True
+    response_cache_max_entries: int = 1024
+    response_cache_ttl_seconds: int = 300
+    data_version_poll_seconds: float = 1.0
+    columnar_engine_enabled: bool = False
+    topic_model_path: str = "models/topic_model.joblib"
     cors_origins: str = "http://localhost:3000,http://localhost:5173"
 
     class Config:
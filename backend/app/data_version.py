@@ -0,0 +1,50 @@
+import asyncio
+import time
+from typing import Union
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from . import models
+from .config import settings
+from .database import AsyncSessionLocal
+
+DATA_VERSION_ID = 1
+
+
+def bump_data_version(db: Union[Session, Connection]) -> None:
+    """Mark the loaded data as changed; call inside the transaction that wrote it."""
+    updated = db.execute(
+        update(models.DataVersion)
+        .where(models.DataVersion.id == DATA_VERSION_ID)
+        .values(version=models.DataVersion.version + 1)
+    ).rowcount
+    if not updated:
+        db.execute(insert(models.DataVersion).values(id=DATA_VERSION_ID, version=1))
+
+
+class DataVersionTracker:
+    """Reads the global data version at most once per poll interval."""
+
+    def __init__(self, poll_seconds: float):
+        self.poll_seconds = poll_seconds
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _stale(self) -> bool:
+        return self._version is None or time.monotonic() - self._checked_at >= self.poll_seconds
+
+    async def current(self) -> int:
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    async with AsyncSessionLocal() as db:
+                        self._version = await db.scalar(
+                            select(models.DataVersion.version)
+                            .where(models.DataVersion.id == DATA_VERSION_ID)
+                        ) or 0
+                    self._checked_at = time.monotonic()
+        return self._version
+
+
+data_version_tracker = DataVersionTracker(settings.data_version_poll_seconds)
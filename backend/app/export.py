@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Iterable, List, Sequence
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Select
+from .database import AsyncSessionLocal
+
+EXPORT_BATCH_SIZE = 5000
+EXPORT_COLUMNS = ["id", "lgu_id", "lgu_name", "province", "year", "amount"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+async def _stream_batches(stmt: Select, batch_size: int) -> AsyncIterator[Sequence]:
+    # The session lives inside the generator: it must outlast the request
+    # handler and is only closed once the last batch has been sent.
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=batch_size))
+        async for batch in result.partitions():
+            yield batch
+
+
+def _csv_chunk(rows: Iterable) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(rows: Iterable) -> str:
+    return "".join(
+        json.dumps(
+            {**row._asdict(), "amount": float(row.amount)},
+            separators=(",", ":")
+        ) + "\n"
+        for row in rows
+    )
+
+
+class _ParquetSink(io.RawIOBase):
+    """Write-only file that hands bytes back as they are produced.
+
+    ParquetWriter records column chunk offsets with tell(), so the position
+    keeps counting even though drained bytes are no longer held.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def stream_export(stmt: Select, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator:
+    """Encode the rows of stmt batch by batch; at most one batch is held in memory."""
+    if fmt == "csv":
+        yield _csv_chunk([EXPORT_COLUMNS])
+        async for batch in _stream_batches(stmt, batch_size):
+            yield _csv_chunk(batch)
+
+    elif fmt == "ndjson":
+        async for batch in _stream_batches(stmt, batch_size):
+            yield _ndjson_chunk(batch)
+
+    elif fmt == "parquet":
+        schema = pa.schema([
+            ("id", pa.int64()),
+            ("lgu_id", pa.int64()),
+            ("lgu_name", pa.string()),
+            ("province", pa.string()),
+            ("year", pa.int32()),
+            ("amount", pa.decimal128(15, 2)),
+        ])
+        sink = _ParquetSink()
+        writer = pq.ParquetWriter(sink, schema)
+        try:
+            async for batch in _stream_batches(stmt, batch_size):
+                columns = list(zip(*batch))
+                writer.write_batch(pa.RecordBatch.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema
+                ))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
@@ -0,0 +1,217 @@
+"""PDF text extraction and keyword-in-context amount parsing for audit reports.
+
+A port of extraction1.R: filenames are parsed the same way and amounts are
+read from a 40-token window on each side of "unliquidated". The functions at
+module level are picklable so the ingestion script can run them in a process pool.
+"""
+import hashlib
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import List, Optional
+
+KWIC_KEYWORD = "unliquidated"
+KWIC_WINDOW = 40
+HASH_CHUNK_BYTES = 1 << 20
+
+# Filename parsing, in the order extraction1.R applies it
+_YEAR = re.compile(r"\d+")
+_LGU_PREFIX = re.compile(r"^.+[_|-]")
+_EXECUTIVE_SUMMARY = re.compile(r"-Executive-Summary|-executive-summary|-executive|-Executive")
+_ES_SUFFIX = re.compile(r"_ES\d+")
+_PROVINCE = re.compile(r"_(\D+)")
+_PROVINCE_SUFFIX = re.compile(r"_\D+$")
+_PROVINCE_PREFIX = re.compile(r"^\D+_")
+
+# Name clean-up (the systemic rules; the R script's row-index fixes do not carry over)
+_CAMEL_CASE = re.compile(r"([a-z])([A-Z])")
+_HYPHEN_WORD = re.compile(r"-([A-Z])")
+_SAN_JOSE_DE = re.compile(r"(San Jose)(de)")
+_SAINT_ABBREVIATION = re.compile(r"\b(Sto|Sta) ")
+_CITY = re.compile(r"\s*-?\s*City\b")
+_SPACES = re.compile(r"\s+")
+_NAME_KEY = re.compile(r"[^a-z0-9]")
+
+PROVINCE_ABBREVIATIONS = {
+    "NV": "Nueva Vizcaya",
+    "OccMIn": "Occidental Mindoro", "OccMdo": "Occidental Mindoro", "OccMin": "Occidental Mindoro",
+    "IN": "Ilocos Norte", "IlocosNorte": "Ilocos Norte",
+    "LaUnion": "La Union", "LU": "La Union",
+    "SDN": "Surigao del Norte",
+    "NE": "Nueva Ecija",
+    "ZS": "Zamboanga Sibugay",
+    "NoSamar": "Northern Samar",
+    "MisOr": "Misamis Oriental", "MisOR": "Misamis Oriental",
+    "NegOr": "Negros Oriental", "NegrOr": "Negros Oriental", "NegrosOr": "Negros Oriental",
+    "SoLeyte": "Southern Leyte",
+    "EaSamar": "Eastern Samar", "ESamar": "Eastern Samar",
+    "DDN": "Davao del Norte",
+    "ZDS": "Zamboanga del Sur",
+    "CamSur": "Camarines Sur",
+    "LDN": "Lanao del Norte",
+    "NegOcc": "Negros Occidental", "NeOcc": "Negros Occidental",
+    "DO": "Davao Oriental", "DavaoOr": "Davao Oriental",
+    "SK": "Sultan Kudarat",
+    "ZDN": "Zamboanga del Norte",
+    "IS": "Ilocos Sur",
+    "OrMdo": "Oriental Mindoro",
+    "SDS": "Surigao del Sur",
+    "DI": "Dinagat Islands",
+    "ADS": "Agusan del Sur",
+    "MtProv": "Mountain Province",
+    "ADN": "Agusan del Norte",
+    "LDS": "Lanao del Sur",
+    "MisOcc": "Misamis Occidental",
+    "SoCot": "South Cotabato", "SouthCot": "South Cotabato",
+    "DDS": "Davao del Sur",
+    "CamNorte": "Camarines Norte", "CN": "Camarines Norte",
+    "CV": "Compostela Valley",
+    "DavaoOcc": "Davao Occidental",
+    "Palalwan": "Palawan",
+    "TawiTawi": "Tawi-Tawi",
+}
+
+# Text analysis
+_TOKEN = re.compile(r"\S+")
+_KEYWORD = re.compile(rf"^\W*{KWIC_KEYWORD}\W*$", re.IGNORECASE)
+# A peso amount: "P1,234.56", "₱ 1234.5"; the lookbehind keeps words ending in P out
+_AMOUNT = re.compile(r"(?<![A-Za-z])[P₱]\s?(\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)(?![\d,]*\d)")
+_FINDINGS_START = re.compile(
+    r"^\s*(?:[IVX]+\.|[A-Z]\.|\d+\.)?\s*"
+    r"(?:SUMMARY\s+OF\s+SIGNIFICANT\s+AUDIT\s+OBSERVATIONS|AUDIT\s+OBSERVATIONS\s+AND\s+RECOMMENDATIONS"
+    r"|AUDIT\s+FINDINGS\s+AND\s+RECOMMENDATIONS|SIGNIFICANT\s+AUDIT\s+OBSERVATIONS)",
+    re.IGNORECASE | re.MULTILINE
+)
+_FINDINGS_END = re.compile(
+    r"^\s*(?:[IVX]+\.|[A-Z]\.|\d+\.)?\s*"
+    r"(?:STATUS\s+OF\s+IMPLEMENTATION\s+OF\s+PRIOR|SUMMARY\s+OF\s+TOTAL\s+SUSPENSIONS)",
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+@dataclass
+class FileInfo:
+    lgu: Optional[str]
+    province: Optional[str]
+    year: Optional[int]
+
+
+@dataclass
+class KeywordHit:
+    amount: Decimal
+    context_pre: str
+    context_post: str
+
+
+@dataclass
+class ExtractedDocument:
+    path: str
+    content_hash: str
+    raw_text: str = ""
+    findings_text: Optional[str] = None
+    hits: List[KeywordHit] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def name_key(name: str) -> str:
+    """Spelling-insensitive key, used to match parsed names against stored LGUs."""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return _NAME_KEY.sub("", ascii_name.lower())
+
+
+def clean_lgu_name(name: str) -> str:
+    name = name.replace("New", "New ", 1)
+    name = _CAMEL_CASE.sub(r"\1 \2", name)
+    name = _HYPHEN_WORD.sub(r" \1", name)
+    name = _SAN_JOSE_DE.sub(r"\1 \2", name)
+    name = _SAINT_ABBREVIATION.sub(r"\1. ", name)
+    name = _CITY.sub(" City", name)
+    return _SPACES.sub(" ", name).strip()
+
+
+def clean_province(province: str) -> str:
+    province = PROVINCE_ABBREVIATIONS.get(province, province)
+    return _SPACES.sub(" ", _CAMEL_CASE.sub(r"\1 \2", province)).strip()
+
+
+def parse_filename(filename: str) -> FileInfo:
+    year_match = _YEAR.search(filename)
+    year = int(year_match.group()) if year_match else None
+
+    prefix = _LGU_PREFIX.match(filename)
+    if not prefix:
+        return FileInfo(lgu=None, province=None, year=year)
+
+    lgu = _EXECUTIVE_SUMMARY.sub("", prefix.group()[:-1])
+    lgu = _ES_SUFFIX.sub("", lgu)
+
+    province_match = _PROVINCE.search(lgu)
+    province = _PROVINCE_PREFIX.sub("", province_match.group(1)) if province_match else None
+    lgu = _PROVINCE_SUFFIX.sub("", lgu)
+
+    return FileInfo(
+        lgu=clean_lgu_name(lgu) or None,
+        province=clean_province(province) if province else None,
+        year=year
+    )
+
+
+def parse_amount(text: str) -> Decimal:
+    """First peso amount in a context window, 0 when there is none (as extraction1.R)."""
+    match = _AMOUNT.search(text)
+    if not match:
+        return Decimal(0)
+    try:
+        return Decimal(match.group(1).replace(",", ""))
+    except InvalidOperation:
+        return Decimal(0)
+
+
+def keyword_in_context(text: str, window: int = KWIC_WINDOW) -> List[KeywordHit]:
+    tokens = _TOKEN.findall(text)
+    hits = []
+    for i, token in enumerate(tokens):
+        if not _KEYWORD.match(token):
+            continue
+        pre = " ".join(tokens[max(0, i - window):i])
+        post = " ".join(tokens[i + 1:i + 1 + window])
+        amount = parse_amount(pre) + parse_amount(post)
+        if amount:
+            hits.append(KeywordHit(amount=amount, context_pre=pre, context_post=post))
+    return hits
+
+
+def findings_section(text: str) -> Optional[str]:
+    start = _FINDINGS_START.search(text)
+    if not start:
+        return None
+    end = _FINDINGS_END.search(text, start.end())
+    return text[start.start():end.start() if end else len(text)].strip() or None
+
+
+def extract_document(path: str, content_hash: str) -> ExtractedDocument:
+    """Read one PDF and run the keyword analysis; runs in a worker process."""
+    from pypdf import PdfReader
+
+    document = ExtractedDocument(path=path, content_hash=content_hash)
+    try:
+        reader = PdfReader(path)
+        pages = [page.extract_text() or "" for page in reader.pages]
+    except Exception as e:
+        document.error = f"{type(e).__name__}: {e}"
+        return document
+
+    document.raw_text = "\n".join(pages).replace("\x00", "")
+    document.findings_text = findings_section(document.raw_text)
+    document.hits = keyword_in_context(document.raw_text)
+    return document
@@ -0,0 +1,126 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .columnar import engine as columnar_engine
+
+DEFAULT_EDGES = [0, 100000, 500000, 1000000, 5000000, 10000000]
+
+
+def format_amount(value: float) -> str:
+    for divisor, suffix in ((1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if value >= divisor:
+            return f"{value / divisor:g}{suffix}"
+    return f"{value:g}"
+
+
+def bucket_label(lower: float, upper: Optional[float]) -> str:
+    if upper is None:
+        return f"{format_amount(lower)}+"
+    return f"{format_amount(lower)}-{format_amount(upper)}"
+
+
+def _round_significant(value: float, digits: int = 2) -> float:
+    if value <= 0:
+        return 0
+    magnitude = 10 ** (math.floor(math.log10(value)) - digits + 1)
+    return round(value / magnitude) * magnitude
+
+
+async def log_scale_edges(db: AsyncSession, buckets: int) -> List[float]:
+    """Geometric bucket edges spanning the smallest positive and largest amounts."""
+    if columnar_engine.enabled:
+        low, high = (await columnar_engine.snapshot(db)).amount_bounds()
+    else:
+        amount = models.UnliquidatedTransaction.amount
+        low, high = (await db.execute(select(
+            func.min(amount).filter(amount > 0),
+            func.max(amount)
+        ))).one()
+
+    if low is None or high is None or float(high) <= float(low):
+        return list(DEFAULT_EDGES)
+
+    low, high = float(low), float(high)
+    ratio = (high / low) ** (1 / buckets)
+    edges = [0.0] + [_round_significant(low * ratio ** i) for i in range(1, buckets)]
+    return sorted(set(edges))
+
+
+async def amount_histogram(
+    db: AsyncSession,
+    edges: List[float],
+    group_by: Optional[str] = None,
+    year: Optional[int] = None,
+    province: Optional[str] = None
+) -> List[dict]:
+    """Count and sum transactions per amount bucket in a single grouped scan.
+
+    Buckets are [edges[i], edges[i + 1]) with the last one open-ended;
+    amounts below edges[0] are not counted.
+    """
+    if columnar_engine.enabled:
+        snapshot = await columnar_engine.snapshot(db)
+        return format_histogram(snapshot.amount_histogram(edges, group_by, year, province), edges, group_by)
+
+    txn = models.UnliquidatedTransaction
+    bucket = case(
+        *[(txn.amount < upper, index) for index, upper in enumerate(edges[1:])],
+        else_=len(edges) - 1
+    ).label("bucket")
+
+    group_column = None
+    if group_by == "year":
+        group_column = txn.year
+    elif group_by == "province":
+        group_column = txn.province
+
+    columns = [bucket, func.count(txn.id).label("count"), func.sum(txn.amount).label("total_amount")]
+    if group_column is not None:
+        columns.insert(0, group_column.label("group_key"))
+
+    stmt = select(*columns).where(txn.amount >= edges[0])
+    if year:
+        stmt = stmt.where(txn.year == year)
+    if province:
+        stmt = stmt.where(txn.province == province)
+
+    group_columns = [bucket] if group_column is None else [group_column, bucket]
+    rows = (await db.execute(stmt.group_by(*group_columns))).all()
+
+    counts = {}
+    for row in rows:
+        key = row.group_key if group_column is not None else None
+        counts[(key, row.bucket)] = (row.count, row.total_amount)
+
+    return format_histogram(counts, edges, group_by)
+
+
+def format_histogram(
+    counts: Dict[Tuple[Any, int], Tuple[int, Any]],
+    edges: List[float],
+    group_by: Optional[str] = None
+) -> List[dict]:
+    """Expand {(group key, bucket): (count, total)} into one entry per key and bucket."""
+    group_keys = [None] if group_by is None else sorted(
+        {key for key, _ in counts}, key=lambda k: (k is None, k)
+    )
+
+    results = []
+    for key in group_keys:
+        for index, lower in enumerate(edges):
+            upper = edges[index + 1] if index + 1 < len(edges) else None
+            count, total = counts.get((key, index), (0, None))
+            entry = {
+                "range": bucket_label(lower, upper),
+                "min": lower,
+                "max": upper,
+                "count": count,
+                "total_amount": float(total or 0)
+            }
+            if group_by is not None:
+                entry[group_by] = key
+            results.append(entry)
+
+    return results
@@ -0,0 +1,313 @@
+import asyncio
+import logging
+import random
+import re
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("openaudit.sql")
+
+SERVER_TIMING_HEADER = "Server-Timing"
+N_PLUS_ONE_HEADER = "X-N-Plus-One"
+
+# Literal values left in a statement (IN lists expanded by the driver, inline numbers) are
+# folded so that the same query shape with different ids counts as one statement
+_LITERALS = re.compile(r"\b\d+\b|'[^']*'|\(\s*(?:\?|%s|\$\d+)(?:\s*,\s*(?:\?|%s|\$\d+))*\s*\)")
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    rows: int = 0
+    sampled: bool = False
+    endpoint_done: Optional[float] = None
+    statements: Counter = field(default_factory=Counter)
+
+    def repeated_statements(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def normalize_statement(statement: str) -> str:
+    return _LITERALS.sub("?", " ".join(statement.split()))
+
+
+def _fetched_rows(cursor) -> int:
+    """Rows a statement returned, as far as the cursor can tell right after execute.
+
+    The asyncpg and aiosqlite adapters buffer the whole result set during execute in
+    their cursor's ``_rows``. That attribute is private to SQLAlchemy and may be
+    renamed, so anything other than a sized buffer falls back to rowcount, which DB-API
+    cursors report (affected rows for DML, -1 when unknown).
+    """
+    buffered = getattr(cursor, "_rows", None)
+    try:
+        return len(buffered)
+    except TypeError:
+        return max(getattr(cursor, "rowcount", 0) or 0, 0)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, not the connection: a statement that raises never
+    # reaches after_cursor_execute, and its context is dropped with it
+    if _current.get() is not None and context is not None:
+        context._openaudit_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_openaudit_started", None)
+    if stats is None or started is None:
+        return
+
+    elapsed = time.perf_counter() - started
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    stats.rows += _fetched_rows(cursor)
+    stats.statements[normalize_statement(statement)] += 1
+
+    if stats.sampled:
+        logger.info("%.2fms %s %r", elapsed * 1000, statement, parameters)
+
+
+def configure_echo_logging():
+    """Give the SQL logger a stderr handler unless logging is configured already.
+
+    uvicorn only configures its own loggers, and without a handler Python drops
+    records below WARNING, so the sampled statements would never be printed.
+    """
+    logger.setLevel(logging.INFO)
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+
+
+def instrument_engine(engine):
+    """Attach query timing to a sync Engine (use async_engine.sync_engine for the async one)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class InstrumentedRoute(APIRoute):
+    """Marks when the endpoint returns so the rest of the handler (response model
+    validation and JSON encoding) can be reported as serialization time."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        call = self.dependant.call
+
+        # The request handler captured whether the endpoint is a coroutine when it was
+        # built, so the wrapper must keep the same kind
+        if asyncio.iscoroutinefunction(call):
+            async def timed(*args, **kwargs):
+                try:
+                    return await call(*args, **kwargs)
+                finally:
+                    _mark_endpoint_done()
+        else:
+            def timed(*args, **kwargs):
+                try:
+                    return call(*args, **kwargs)
+                finally:
+                    _mark_endpoint_done()
+
+        self.dependant.call = timed
+
+
+def _mark_endpoint_done():
+    stats = _current.get()
+    if stats is not None:
+        stats.endpoint_done = time.perf_counter()
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series: Dict[Tuple, List] = defaultdict(lambda: [[0] * (len(buckets) + 1), 0.0])
+
+    def observe(self, labels: Tuple, value: float):
+        counts, _ = series = self._series[labels]
+        counts[bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self, label_names: Tuple[str, ...]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            base = _labels(label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound:g}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Counter = Counter()
+
+    def inc(self, labels: Tuple, amount: int = 1):
+        self._values[labels] += amount
+
+    def render(self, label_names: Tuple[str, ...]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{{{_labels(label_names, labels)}}} {value}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+_SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_ROUTE_LABELS = ("method", "route")
+
+
+class MetricsRegistry:
+    """Per-route request metrics in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.duration = Histogram("openaudit_request_duration_seconds", "Time to response start", _SECONDS)
+        self.db_time = Histogram("openaudit_request_db_seconds", "Time spent executing SQL per request", _SECONDS)
+        self.serialization = Histogram(
+            "openaudit_request_serialization_seconds", "Response model validation and encoding time", _SECONDS
+        )
+        self.queries = Histogram(
+            "openaudit_request_db_queries", "SQL statements per request", (0, 1, 2, 3, 5, 10, 20, 50, 100)
+        )
+        self.rows = Histogram(
+            "openaudit_request_db_rows", "Rows fetched or affected per request", (0, 10, 100, 1000, 10000, 100000, 1000000)
+        )
+        self.requests = CounterMetric("openaudit_requests_total", "Requests by route and status")
+        self.n_plus_one = CounterMetric("openaudit_n_plus_one_total", "Requests that repeated one statement past the threshold")
+
+    def record(self, method: str, route: str, status: int, stats: RequestStats,
+               duration: float, serialization: Optional[float], n_plus_one: bool):
+        labels = (method, route)
+        self.duration.observe(labels, duration)
+        self.db_time.observe(labels, stats.db_seconds)
+        self.queries.observe(labels, stats.queries)
+        self.rows.observe(labels, stats.rows)
+        if serialization is not None:
+            self.serialization.observe(labels, serialization)
+        self.requests.inc(labels + (status,))
+        if n_plus_one:
+            self.n_plus_one.inc(labels)
+
+    def render(self) -> str:
+        lines = []
+        for histogram in (self.duration, self.db_time, self.serialization, self.queries, self.rows):
+            lines.extend(histogram.render(_ROUTE_LABELS))
+        lines.extend(self.requests.render(_ROUTE_LABELS + ("status",)))
+        lines.extend(self.n_plus_one.render(_ROUTE_LABELS))
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class InstrumentationMiddleware:
+    """Tracks SQL count, DB time, rows and serialization time per request, reports them in a
+    Server-Timing header and feeds the per-route histograms served on /metrics."""
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = metrics, echo_sample_rate: float = 0.0,
+                 n_plus_one_threshold: int = 10):
+        self.app = app
+        self.registry = registry
+        self.echo_sample_rate = echo_sample_rate
+        self.n_plus_one_threshold = n_plus_one_threshold
+        if echo_sample_rate > 0:
+            configure_echo_logging()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(sampled=self.echo_sample_rate > 0 and random.random() < self.echo_sample_rate)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        timing = {"status": 500, "duration": None, "serialization": None, "repeated": []}
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                timing["status"] = message["status"]
+                timing["duration"] = now - started
+                if stats.endpoint_done is not None:
+                    timing["serialization"] = now - stats.endpoint_done
+                timing["repeated"] = stats.repeated_statements(self.n_plus_one_threshold)
+
+                headers = list(message.get("headers", []))
+                headers.append((SERVER_TIMING_HEADER.lower().encode(), self._server_timing(stats, timing).encode()))
+                if timing["repeated"]:
+                    headers.append((N_PLUS_ONE_HEADER.lower().encode(), str(timing["repeated"][0][1]).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route_path = self._route_path(scope)
+            repeated = timing["repeated"]
+            if repeated:
+                sql, count = repeated[0]
+                logger.warning("Possible N+1 on %s %s: statement ran %d times: %s",
+                               scope["method"], route_path, count, sql[:200])
+            self.registry.record(
+                scope["method"], route_path, timing["status"], stats,
+                timing["duration"] if timing["duration"] is not None else time.perf_counter() - started,
+                timing["serialization"], bool(repeated)
+            )
+
+    @staticmethod
+    def _route_path(scope: Scope) -> str:
+        """The route template, so /lgus/1 and /lgus/2 share one label."""
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        # Answered before routing (response cache hits): match the app's routes here
+        app = scope.get("app")
+        for candidate in getattr(getattr(app, "router", None), "routes", []):
+            match, _ = candidate.matches(scope)
+            if match is Match.FULL:
+                return candidate.path
+        return "unmatched"
+
+    @staticmethod
+    def _server_timing(stats: RequestStats, timing: Dict) -> str:
+        parts = [f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} queries, {stats.rows} rows"']
+        if timing["serialization"] is not None:
+            parts.append(f"serialize;dur={timing['serialization'] * 1000:.2f}")
+        parts.append(f"total;dur={timing['duration'] * 1000:.2f}")
+        return ", ".join(parts)
@@ -0,0 +1,263 @@
+import asyncio
+import bisect
+import functools
+import heapq
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import case, func, literal, or_, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .data_version import data_version_tracker
+
+# Also applied to pg_trgm's <% operator, whose own default threshold is 0.6
+SIMILARITY_THRESHOLD = 0.3
+PREFIX_BOOST = 1.0
+PROVINCE_WEIGHT = 0.5
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+@dataclass
+class SearchHit:
+    id: int
+    name: str
+    province: Optional[str]
+    score: float
+
+
+def positional_trigrams(text: str) -> List[str]:
+    """Trigrams in order, the way pg_trgm builds them: lowercased words padded with blanks."""
+    grams = []
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigrams(text: str) -> Set[str]:
+    return set(positional_trigrams(text))
+
+
+@functools.lru_cache(maxsize=None)
+def _similarity(count: int, query_len: int, extent_len: int) -> float:
+    # pg_trgm computes in float4; round the same way so thresholds and ties agree.
+    # Arguments are small trigram counts, so the cache stays small
+    return float(np.float32(count / (query_len + extent_len - count)))
+
+
+def word_similarity(query: Set[str], grams: List[str]) -> float:
+    """pg_trgm's word_similarity(query, text) given the text's positional trigrams.
+
+    A port of iterate_word_similarity in contrib/pg_trgm/trgm_op.c: the greatest
+    similarity between the query's trigrams and a contiguous extent of the text's,
+    found with the same greedy lower-bound search, so scores match exactly.
+    """
+    if not query:
+        return 0.0
+    last_position: Dict[str, int] = {}
+    extent_len = count = 0
+    lower = -1
+    best = 0.0
+
+    for i, gram in enumerate(grams):
+        found = gram in query
+        if lower >= 0 or found:
+            if gram not in last_position:
+                extent_len += 1
+                count += found
+            last_position[gram] = i
+        if not found:
+            continue
+
+        if lower == -1:
+            lower = i
+            extent_len = 1
+        current = _similarity(count, len(query), extent_len)
+
+        # Also try moving the lower bound up for a greater similarity
+        trial_count, trial_len, previous_lower = count, extent_len, lower
+        for trial_lower in range(lower, i + 1):
+            trial = _similarity(trial_count, len(query), trial_len)
+            if trial > current:
+                current, extent_len, lower, count = trial, trial_len, trial_lower, trial_count
+            dropped = grams[trial_lower]
+            if last_position.get(dropped) == trial_lower:
+                trial_len -= 1
+                trial_count -= dropped in query
+
+        best = max(best, current)
+        for dropped_at in range(previous_lower, lower):
+            if last_position.get(grams[dropped_at]) == dropped_at:
+                del last_position[grams[dropped_at]]
+    return best
+
+
+class TrigramIndex:
+    """In-process inverted trigram index over LGU names and provinces.
+
+    Posting lists are NumPy arrays of row positions, so bounding every row's score is
+    one bincount per field over the concatenated postings of the query's trigrams: the
+    share of the query's trigrams a field contains is an upper bound of its
+    word_similarity. Rows are then scored exactly, best bound first and in result order
+    among equal bounds, until none left can displace the limit-th hit, so results match
+    the PostgreSQL search.
+    """
+
+    def __init__(self, rows):
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.names = [row[1] for row in rows]
+        self.provinces = [row[2] for row in rows]
+        lowered = [name.lower() for name in self.names]
+        self.prefix_order = np.argsort(np.array(lowered, dtype=object), kind="stable")
+        self.sorted_names = [lowered[position] for position in self.prefix_order]
+        self.name_grams = [positional_trigrams(name) for name in self.names]
+        # Position of each row in the (name, id) order that breaks ties between scores
+        self.result_rank = np.empty(len(self.ids), dtype=np.int64)
+        self.result_rank[sorted(range(len(self.ids)), key=lambda i: (self.names[i], self.ids[i]))] = np.arange(len(self.ids))
+        self.name_postings = self._build_postings(self.names)
+        self.province_postings = self._build_postings(p or "" for p in self.provinces)
+
+    @staticmethod
+    def _build_postings(values) -> Dict[str, np.ndarray]:
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for position, value in enumerate(values):
+            for gram in trigrams(value):
+                postings[gram].append(position)
+        return {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+
+    def _overlap(self, grams: Set[str], postings: Dict[str, np.ndarray]) -> np.ndarray:
+        lists = [postings[gram] for gram in grams if gram in postings]
+        if not lists:
+            return np.zeros(len(self.ids), dtype=np.int64)
+        return np.bincount(np.concatenate(lists), minlength=len(self.ids))
+
+    def search(self, query: str, limit: int) -> List[SearchHit]:
+        grams = trigrams(query)
+        if not grams or not len(self.ids):
+            return []
+
+        # Rounded to float4 like the exact scores, so a bound never falls below its score
+        name_bound = np.float32(self._overlap(grams, self.name_postings) / len(grams)).astype(float)
+        province_bound = np.float32(self._overlap(grams, self.province_postings) / len(grams)).astype(float)
+        bounds = np.maximum(name_bound, PROVINCE_WEIGHT * province_bound)
+
+        # Names starting with the query form one contiguous run of the sorted names
+        prefix = query.strip().lower()
+        start = bisect.bisect_left(self.sorted_names, prefix)
+        end = bisect.bisect_left(self.sorted_names, prefix + "\uffff")
+        boost = np.zeros(len(self.ids))
+        boost[self.prefix_order[start:end]] = PREFIX_BOOST
+        bounds += boost
+
+        # Best bound first, then in result order, so rows tied on their bound stop early too
+        candidates = np.flatnonzero(bounds >= SIMILARITY_THRESHOLD)
+        candidates = candidates[np.lexsort((self.result_rank[candidates], -bounds[candidates]))]
+        province_scores: Dict[Optional[str], float] = {}
+        kept: List[Tuple[float, int, int]] = []
+        for pos in candidates:
+            rank = int(self.result_rank[pos])
+            # Stop once no remaining row can displace the worst of the rows kept
+            if len(kept) == limit and (bounds[pos], -rank) < kept[0][:2]:
+                break
+            province = self.provinces[pos]
+            if province not in province_scores:
+                province_scores[province] = PROVINCE_WEIGHT * word_similarity(grams, positional_trigrams(province or ""))
+            score = max(word_similarity(grams, self.name_grams[pos]), province_scores[province]) + boost[pos]
+            if score < SIMILARITY_THRESHOLD:
+                continue
+            if len(kept) < limit:
+                heapq.heappush(kept, (score, -rank, pos))
+            elif (score, -rank) > kept[0][:2]:
+                heapq.heapreplace(kept, (score, -rank, pos))
+
+        return [
+            SearchHit(int(self.ids[pos]), self.names[pos], self.provinces[pos], round(score, 4))
+            for score, _, pos in sorted(kept, key=lambda item: (-item[0], -item[1]))
+        ]
+
+
+_index: Optional[TrigramIndex] = None
+_index_version: Optional[int] = None
+_index_lock = asyncio.Lock()
+
+
+async def _get_index(db: AsyncSession) -> TrigramIndex:
+    global _index, _index_version
+    version = await data_version_tracker.current()
+    if _index is None or _index_version != version:
+        async with _index_lock:
+            if _index is None or _index_version != version:
+                rows = (await db.execute(select(
+                    models.LocalGovernment.id,
+                    models.LocalGovernment.name,
+                    models.LocalGovernment.province
+                ))).all()
+                _index = TrigramIndex(rows)
+                _index_version = version
+    return _index
+
+
+async def _search_postgresql(db: AsyncSession, query: str, limit: int) -> List[SearchHit]:
+    lgu = models.LocalGovernment
+    term = literal(query)
+    prefixed = lgu.name.istartswith(query.strip(), autoescape=True)
+    named = or_(term.op("<%")(lgu.name), prefixed)
+
+    # Each matching province is scored once rather than once per LGU in it
+    matching = select(lgu.province).where(term.op("<%")(lgu.province)).distinct().subquery()
+    provinces = select(
+        matching.c.province,
+        (PROVINCE_WEIGHT * func.word_similarity(term, matching.c.province)).label("score")
+    ).cte("provinces")
+
+    # <% and ILIKE 'query%' are both index-assisted by the gin_trgm_ops indexes. Rows
+    # matching neither score below the threshold on their name, so if they pass at all
+    # it is on their province's weighted score alone: the rows kept from those are the
+    # first of each province in (name, id) order, which the province B-tree index yields.
+    by_name = select(
+        lgu.id,
+        lgu.name,
+        lgu.province,
+        (
+            func.greatest(func.word_similarity(term, lgu.name), func.coalesce(provinces.c.score, 0))
+            + case((prefixed, PREFIX_BOOST), else_=0)
+        ).label("score")
+    ).outerjoin(provinces, provinces.c.province == lgu.province).where(named)
+    first_in_province = select(lgu.id, lgu.name, lgu.province).where(
+        lgu.province == provinces.c.province, ~named
+    ).order_by(lgu.name, lgu.id).limit(limit).lateral()
+    by_province = select(
+        first_in_province.c.id,
+        first_in_province.c.name,
+        first_in_province.c.province,
+        provinces.c.score
+    ).select_from(provinces).join(first_in_province, literal(True)).where(
+        provinces.c.score >= SIMILARITY_THRESHOLD
+    )
+
+    hits = union_all(by_name, by_province).subquery()
+    stmt = select(hits).where(hits.c.score >= SIMILARITY_THRESHOLD).order_by(
+        hits.c.score.desc(), hits.c.name, hits.c.id
+    ).limit(limit)
+
+    # Local to the current transaction, so pooled connections keep the default
+    await db.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+        {"threshold": str(SIMILARITY_THRESHOLD)}
+    )
+
+    return [
+        SearchHit(r.id, r.name, r.province, round(float(r.score), 4))
+        for r in await db.execute(stmt)
+    ]
+
+
+async def search_lgus(db: AsyncSession, query: str, limit: int) -> List[SearchHit]:
+    """Typo-tolerant LGU search ranked by trigram similarity with a prefix boost."""
+    if db.bind.dialect.name == "postgresql":
+        return await _search_postgresql(db, query, limit)
+    index = await _get_index(db)
+    return index.search(query, limit)
@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .llm_providers import provider_pool
+
+
+def analysis_key(
+    model: str,
+    analysis_type: str,
+    report_id: Optional[int],
+    lgu_id: Optional[int],
+    custom_prompt: Optional[str],
+    data_version: int
+) -> str:
+    """Cache key of one analysis, stored in LLMAnalysis.prompt_hash.
+
+    Built from the request rather than the prompt, so a hit costs no context building
+    (which may call the provider to summarize). The prompt is a function of these and of
+    the loaded data, so the data version stands in for the context. The target is part
+    of the key, since a custom prompt gives every target the same prompt.
+    """
+    digest = hashlib.sha256()
+    for part in (model, analysis_type, str(report_id or ""), str(lgu_id or ""),
+                 "custom:" + custom_prompt if custom_prompt else "", str(data_version)):
+        encoded = part.encode()
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") hash differently
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def storable_key(key: str) -> Optional[str]:
+    """The key to store with a new analysis, or None when it must never be served from cache.
+
+    Placeholder output stands in until a real provider is configured; caching it would
+    keep answering with the placeholder afterwards.
+    """
+    return key if provider_pool.generates_text() else None
+
+
+async def cached_analysis(db: AsyncSession, key: str) -> Optional[models.LLMAnalysis]:
+    return await db.scalar(
+        select(models.LLMAnalysis)
+        .where(models.LLMAnalysis.prompt_hash == key)
+        .order_by(models.LLMAnalysis.id.desc())
+        .limit(1)
+    )
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one running task.
+
+    The task is shielded, so a caller that goes away does not cancel the work
+    for the others still waiting on it.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+
+analysis_flights = SingleFlight()
@@ -0,0 +1,362 @@
+import asyncio
+import hashlib
+import re
+import statistics
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .config import settings
+from .llm_providers import LLMProviderError, provider_pool
+
+# Rough English average for Claude/GPT tokenizers; good enough for budgeting
+CHARS_PER_TOKEN = 4
+VERBATIM_SHARE = 0.7
+MAX_REDUCE_ROUNDS = 3
+SUMMARIES_HEADING = "Summaries of the remaining sections:"
+
+ANALYSIS_KEYWORDS = {
+    "summary": ["observation", "finding", "recommend", "deficien", "total", "amount", "balance"],
+    "risk_assessment": [
+        "unliquidated", "cash advance", "disallow", "suspen", "irregular", "deficien",
+        "not liquidated", "misstat", "unsupported", "overpay", "excess", "noncompliance",
+        "non-compliance", "delay", "unrecorded", "doubtful"
+    ],
+    "recommendations": ["recommend", "management", "should", "require", "comply", "implement", "agreed"],
+    "compliance": [
+        "circular", "compliance", "violat", "republic act", "r.a.", "p.d.", "regulation",
+        "procurement", "gaa", "manual", "requirement"
+    ],
+}
+ANALYSIS_KEYWORDS["risk"] = ANALYSIS_KEYWORDS["risk_assessment"]
+
+# Executive summary sections that are mostly boilerplate, and the ones that carry the findings
+LOW_VALUE_HEADINGS = ("INTRODUCTION", "SCOPE", "OBJECTIVE", "AUDITOR'S REPORT", "OPINION", "ACKNOWLEDG")
+HIGH_VALUE_HEADINGS = ("OBSERVATION", "FINDING", "RECOMMENDATION", "SUSPENSION", "DISALLOWANCE", "STATUS OF IMPLEMENTATION")
+
+_HEADING = re.compile(r"^\s*(?:[A-Z]\.|[IVX]+\.|\d+(?:\.\d+)*\.?)?\s*[A-Z][A-Z0-9 ,'&/().:-]{3,}$")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+SUMMARY_PROMPT = (
+    "Summarize this excerpt of a Philippine Commission on Audit report for a {analysis_type} analysis. "
+    "Keep every peso amount, year, COA circular or law cited, and audit observation. "
+    "Answer in at most {tokens} tokens.\n\n{text}"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class Chunk:
+    heading: str
+    text: str
+    position: int
+    score: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+@dataclass
+class ContextResult:
+    text: str
+    tokens: int
+    verbatim_chunks: int = 0
+    summarized_chunks: int = 0
+    omitted: List[str] = field(default_factory=list)
+
+
+def split_sections(text: str) -> List[tuple]:
+    """(heading, body) pairs; text before the first heading goes under an empty heading."""
+    sections, heading, body = [], "", []
+    for line in text.splitlines():
+        if _HEADING.match(line) and sum(c.isalpha() for c in line) >= 4:
+            if any(part.strip() for part in body):
+                sections.append((heading, "\n".join(body).strip()))
+            heading, body = line.strip(), []
+        else:
+            body.append(line)
+    if any(part.strip() for part in body):
+        sections.append((heading, "\n".join(body).strip()))
+    return sections
+
+
+def _split_long(text: str, max_tokens: int) -> List[str]:
+    """Pieces of at most max_tokens, broken at paragraphs, then sentences, then characters."""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    for separator, pattern in (("\n\n", _PARAGRAPH_BREAK), (" ", _SENTENCE_END)):
+        parts = [p for p in pattern.split(text) if p.strip()]
+        if len(parts) > 1:
+            pieces, current = [], ""
+            for part in parts:
+                candidate = f"{current}{separator}{part}" if current else part
+                if current and estimate_tokens(candidate) > max_tokens:
+                    pieces.append(current)
+                    current = part
+                else:
+                    current = candidate
+            pieces.append(current)
+            return [p for piece in pieces for p in _split_long(piece, max_tokens)]
+
+    step = max_tokens * CHARS_PER_TOKEN
+    return [text[i:i + step] for i in range(0, len(text), step)]
+
+
+def chunk_text(text: str, max_tokens: int) -> List[Chunk]:
+    chunks = []
+    for heading, body in split_sections(text):
+        for piece in _split_long(body, max_tokens):
+            chunks.append(Chunk(heading=heading, text=piece, position=len(chunks)))
+    return chunks
+
+
+def score_chunk(chunk: Chunk, analysis_type: str) -> float:
+    keywords = ANALYSIS_KEYWORDS.get(analysis_type, ANALYSIS_KEYWORDS["summary"])
+    lowered = chunk.text.lower()
+    hits = sum(lowered.count(keyword) for keyword in keywords)
+    # Peso amounts are what most analyses hinge on
+    hits += 0.5 * len(re.findall(r"(?:P|₱|PHP)\s?[\d,]+(?:\.\d{2})?", chunk.text))
+    score = 100 * hits / max(chunk.tokens, 1)
+
+    heading = chunk.heading.upper()
+    if any(marker in heading for marker in HIGH_VALUE_HEADINGS):
+        score = score * 1.5 + 1
+    elif any(marker in heading for marker in LOW_VALUE_HEADINGS):
+        score *= 0.3
+    return score
+
+
+def _render(chunks: List[Chunk]) -> str:
+    parts, heading = [], None
+    for chunk in sorted(chunks, key=lambda c: c.position):
+        if chunk.heading != heading and chunk.heading:
+            parts.append(chunk.heading)
+        heading = chunk.heading
+        parts.append(chunk.text)
+    return "\n\n".join(parts)
+
+
+def _rendered_tokens(chunk: Chunk) -> int:
+    """An upper bound on the chunk's share of _render's output, heading and separators included."""
+    return estimate_tokens(f"{chunk.heading}\n\n{chunk.text}\n\n")
+
+
+def _summary_key(model: str, analysis_type: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{analysis_type}\0{text}".encode()).hexdigest()
+
+
+async def summarize_chunks(
+    db: AsyncSession,
+    texts: List[str],
+    model: str,
+    analysis_type: str,
+    max_tokens: int
+) -> List[str]:
+    """Map step: one summary per text, in parallel, reusing summaries cached by content hash."""
+    keys = [_summary_key(model, analysis_type, text) for text in texts]
+    cached: Dict[str, str] = dict((await db.execute(
+        select(models.LLMChunkSummary.content_hash, models.LLMChunkSummary.summary)
+        .where(models.LLMChunkSummary.content_hash.in_(set(keys)))
+    )).all()) if keys else {}
+
+    missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+    if missing:
+        summaries = await asyncio.gather(*[
+            provider_pool.complete(model, analysis_type, SUMMARY_PROMPT.format(
+                analysis_type=analysis_type, tokens=max_tokens, text=text
+            ))
+            for text in missing.values()
+        ])
+        fresh = dict(zip(missing, summaries))
+        try:
+            await db.execute(insert(models.LLMChunkSummary), [
+                {"content_hash": key, "model_name": model, "summary": summary}
+                for key, summary in fresh.items()
+            ])
+            await db.commit()
+        except IntegrityError:
+            # A concurrent request stored the same summaries first
+            await db.rollback()
+        cached.update(fresh)
+
+    return [cached[key] for key in keys]
+
+
+async def _map_reduce(
+    db: AsyncSession,
+    chunks: List[Chunk],
+    model: str,
+    analysis_type: str,
+    budget: int
+) -> List[str]:
+    chunk_tokens = settings.llm_context_chunk_tokens
+    per_summary = max(50, min(chunk_tokens // 4, budget // max(len(chunks), 1)))
+    summaries = await summarize_chunks(
+        db, [f"{c.heading}\n{c.text}" if c.heading else c.text for c in chunks], model, analysis_type, per_summary
+    )
+
+    # Reduce: merge neighbouring summaries and summarize again until they fit
+    for _ in range(MAX_REDUCE_ROUNDS):
+        if sum(estimate_tokens(s) for s in summaries) <= budget or len(summaries) == 1:
+            break
+        groups, current = [], []
+        for summary in summaries:
+            if current and estimate_tokens("\n".join(current + [summary])) > chunk_tokens:
+                groups.append("\n".join(current))
+                current = []
+            current.append(summary)
+        groups.append("\n".join(current))
+        summaries = await summarize_chunks(
+            db, groups, model, analysis_type, max(50, budget // len(groups))
+        )
+    return summaries
+
+
+async def pack_text(
+    db: AsyncSession,
+    text: str,
+    analysis_type: str,
+    model: str,
+    budget: Optional[int] = None
+) -> ContextResult:
+    """Fit text into the token budget.
+
+    Everything is kept verbatim when it fits. Otherwise the most relevant
+    chunks for the analysis type are kept verbatim and the rest are
+    map-reduce summarized; whatever still cannot fit is listed by heading
+    rather than dropped silently.
+    """
+    budget = budget or settings.llm_context_token_budget
+    chunks = chunk_text(text, settings.llm_context_chunk_tokens)
+    rendered = _render(chunks)
+    if estimate_tokens(rendered) <= budget:
+        return ContextResult(text=rendered, tokens=estimate_tokens(rendered), verbatim_chunks=len(chunks))
+
+    for chunk in chunks:
+        chunk.score = score_chunk(chunk, analysis_type)
+    ranked = sorted(chunks, key=lambda c: (-c.score, c.position))
+
+    summarize = settings.llm_context_summarize and provider_pool.generates_text()
+    verbatim_budget = int(budget * VERBATIM_SHARE) if summarize else budget
+    kept, rest, used = [], [], 0
+    for chunk in ranked:
+        cost = _rendered_tokens(chunk)
+        if used + cost <= verbatim_budget:
+            kept.append(chunk)
+            used += cost
+        else:
+            rest.append(chunk)
+
+    result = ContextResult(text="", tokens=0)
+    summary_block = ""
+
+    if summarize and rest:
+        rest.sort(key=lambda c: c.position)
+        # Room for the summaries themselves, after their heading and a "- " per line
+        room = budget - used - estimate_tokens(SUMMARIES_HEADING) - len(rest)
+        try:
+            summaries = await _map_reduce(db, rest, model, analysis_type, room) if room > 0 else None
+        except LLMProviderError:
+            summaries = None
+        if summaries is not None:
+            block = SUMMARIES_HEADING + "\n" + "\n".join(f"- {s}" for s in summaries)
+            if estimate_tokens(f"{_render(kept)}\n\n{block}") <= budget:
+                summary_block = block
+                result.summarized_chunks = len(rest)
+                rest = []
+
+    # The note listing omitted sections needs room too; the least relevant verbatim chunks make way for it
+    while True:
+        parts = [_render(kept), summary_block]
+        if rest:
+            result.omitted = sorted({c.heading or "(untitled)" for c in rest})
+            parts.append(
+                f"[{len(rest)} of {len(chunks)} excerpts omitted to fit a {budget}-token budget; "
+                f"sections: {'; '.join(result.omitted)}]"
+            )
+        result.text = "\n\n".join(p for p in parts if p)
+        result.tokens = estimate_tokens(result.text)
+        if result.tokens <= budget or not kept:
+            break
+        rest.append(kept.pop())
+
+    result.verbatim_chunks = len(kept)
+    return result
+
+
+async def lgu_context(db: AsyncSession, lgu: models.LocalGovernment, top_n: int = 10) -> str:
+    """Yearly totals, largest transactions, standing within the province and report topics."""
+    txn = models.UnliquidatedTransaction
+    sections = [
+        f"LGU: {lgu.name}, Province: {lgu.province}, Region: {lgu.region or 'n/a'}, Type: {lgu.lgu_type or 'n/a'}"
+    ]
+
+    by_year = (await db.execute(
+        select(txn.year, func.count(txn.id), func.sum(txn.amount))
+        .where(txn.lgu_id == lgu.id).group_by(txn.year).order_by(txn.year)
+    )).all()
+    transaction_count = sum(row[1] for row in by_year)
+    total_amount = sum((row[2] for row in by_year), 0)
+    sections.append(
+        f"Total unliquidated transactions: {transaction_count}\nTotal amount: {total_amount}\n"
+        + "By year (year: count, amount):\n"
+        + "\n".join(f"{year}: {count}, {amount}" for year, count, amount in by_year)
+    )
+
+    largest = (await db.execute(
+        select(txn.year, txn.amount, txn.context_pre, txn.context_post)
+        .where(txn.lgu_id == lgu.id).order_by(txn.amount.desc()).limit(top_n)
+    )).all()
+    if largest:
+        lines = []
+        for year, amount, pre, post in largest:
+            excerpt = " ".join(part.strip() for part in (pre, post) if part)
+            lines.append(f"{year}: {amount}" + (f" - \"{excerpt[:300]}\"" if excerpt else ""))
+        sections.append("Largest transactions:\n" + "\n".join(lines))
+
+    if lgu.province:
+        province_totals = (await db.execute(
+            select(models.LocalGovernment.id, func.sum(txn.amount).label("total"))
+            .join(txn, txn.lgu_id == models.LocalGovernment.id)
+            .where(models.LocalGovernment.province == lgu.province)
+            .group_by(models.LocalGovernment.id)
+            .order_by(func.sum(txn.amount).desc())
+        )).all()
+        ranks = [row.id for row in province_totals]
+        if lgu.id in ranks:
+            median = statistics.median(float(row.total) for row in province_totals)
+            sections.append(
+                f"Rank in {lgu.province} by total unliquidated amount: {ranks.index(lgu.id) + 1} of {len(ranks)} "
+                f"(province median LGU total: {median:,.2f})"
+            )
+
+    topics = (await db.execute(
+        select(models.AuditTopic.description, func.avg(models.ReportTopic.topic_proportion).label("share"))
+        .join(models.ReportTopic, models.ReportTopic.topic_id == models.AuditTopic.id)
+        .join(models.AuditReport, models.AuditReport.id == models.ReportTopic.report_id)
+        .where(models.AuditReport.lgu_id == lgu.id)
+        .group_by(models.AuditTopic.description)
+        .order_by(func.avg(models.ReportTopic.topic_proportion).desc())
+        .limit(5)
+    )).all()
+    report_years = (await db.scalars(
+        select(models.AuditReport.year).where(models.AuditReport.lgu_id == lgu.id)
+        .distinct().order_by(models.AuditReport.year)
+    )).all()
+    if report_years:
+        sections.append(
+            f"Audit reports on file: {', '.join(str(y) for y in report_years)}"
+            + ("\nMost prominent audit topics:\n" + "\n".join(
+                f"- {description} ({float(share or 0):.1%})" for description, share in topics
+            ) if topics else "")
+        )
+
+    return "\n\n".join(sections)
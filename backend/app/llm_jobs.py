@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from . import llm_cache, llm_service, models
+from .config import settings
+from .data_version import data_version_tracker
+from .database import AsyncSessionLocal
+from .llm_providers import LLMProviderError, provider_pool
+
+logger = logging.getLogger(__name__)
+
+# Items loaded and dispatched at once; the provider pool bounds how many are in flight
+JOB_PAGE_SIZE = 500
+
+
+async def missing_targets(db, lgu_ids: List[int], report_ids: List[int]) -> Dict[str, List[int]]:
+    """The requested LGU and report ids that do not exist, by kind; empty when all do."""
+    missing = {}
+    for name, column, ids in (
+        ("lgu_ids", models.LocalGovernment.id, lgu_ids),
+        ("report_ids", models.AuditReport.id, report_ids),
+    ):
+        if not ids:
+            continue
+        found = set(await db.scalars(select(column).where(column.in_(ids))))
+        unknown = [target_id for target_id in ids if target_id not in found]
+        if unknown:
+            missing[name] = unknown
+    return missing
+
+
+async def create_job(
+    db,
+    analysis_type: str,
+    model: str,
+    custom_prompt: Optional[str],
+    lgu_ids: List[int],
+    report_ids: List[int]
+) -> models.LLMJob:
+    job = models.LLMJob(
+        analysis_type=analysis_type,
+        model_name=model,
+        custom_prompt=custom_prompt,
+        status="pending",
+        total_items=len(lgu_ids) + len(report_ids)
+    )
+    db.add(job)
+    await db.flush()
+
+    items = [{"job_id": job.id, "lgu_id": lgu_id, "status": "pending"} for lgu_id in lgu_ids]
+    items += [{"job_id": job.id, "report_id": report_id, "status": "pending"} for report_id in report_ids]
+    if items:
+        await db.execute(insert(models.LLMJobItem), items)
+
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+async def _prepare_item(job: models.LLMJob, item, key: str, limit: asyncio.Semaphore) -> Dict:
+    # A session per item, since contexts are built concurrently
+    async with limit, AsyncSessionLocal() as db:
+        try:
+            prompt = await llm_service.request_prompt(
+                db, item.report_id, item.lgu_id, job.analysis_type, job.model_name, job.custom_prompt
+            )
+        except LookupError as e:
+            return {"item": item, "error": str(e)}
+    return {"item": item, "prompt": prompt, "key": key}
+
+
+async def _prepare_items(job: models.LLMJob, items) -> List[Dict]:
+    """Resolve a page's cache hits in one query, then build the other prompts concurrently.
+
+    Long contexts are map-reduce summarized through the provider pool, so building
+    them one by one would serialize those calls. Builds are bounded like provider
+    calls, which keeps the sessions they hold within the connection pool.
+    """
+    version = await data_version_tracker.current()
+    keys = {
+        item.id: llm_cache.analysis_key(
+            job.model_name, job.analysis_type, item.report_id, item.lgu_id, job.custom_prompt, version
+        )
+        for item in items
+    }
+    async with AsyncSessionLocal() as db:
+        cached = dict((await db.execute(
+            select(models.LLMAnalysis.prompt_hash, func.max(models.LLMAnalysis.id))
+            .where(models.LLMAnalysis.prompt_hash.in_(set(keys.values())))
+            .group_by(models.LLMAnalysis.prompt_hash)
+        )).all()) if keys else {}
+
+    limit = asyncio.Semaphore(settings.llm_max_concurrency)
+    built = iter(await asyncio.gather(*[
+        _prepare_item(job, item, keys[item.id], limit) for item in items if keys[item.id] not in cached
+    ]))
+    return [
+        {"item": item, "key": keys[item.id], "analysis_id": cached[keys[item.id]]}
+        if keys[item.id] in cached else next(built)
+        for item in items
+    ]
+
+
+async def _analyze_item(job: models.LLMJob, prepared: Dict) -> Dict:
+    item = prepared["item"]
+    if "error" in prepared:
+        return {"id": item.id, "status": "failed", "analysis_id": None, "error": prepared["error"]}
+    if "analysis_id" in prepared:
+        return {"id": item.id, "status": "completed", "analysis_id": prepared["analysis_id"], "error": None}
+
+    try:
+        response_text = await provider_pool.complete(job.model_name, job.analysis_type, prepared["prompt"])
+    except Exception as e:
+        if not isinstance(e, LLMProviderError):
+            logger.exception("LLM job %s item %s failed", job.id, item.id)
+        return {"id": item.id, "status": "failed", "analysis_id": None, "error": str(e)}
+
+    return {
+        "id": item.id,
+        "status": "completed",
+        "error": None,
+        "analysis": {
+            "report_id": item.report_id,
+            "lgu_id": item.lgu_id,
+            "analysis_type": job.analysis_type,
+            "prompt": prepared["prompt"],
+            "response": response_text,
+            "model_name": job.model_name,
+            "prompt_hash": llm_cache.storable_key(prepared["key"]),
+        },
+    }
+
+
+async def _flush(job_id: int, results: List[Dict]):
+    """Write one batch: a multi-row insert of new analyses, then the item and job counters."""
+    if not results:
+        return
+
+    async with AsyncSessionLocal() as db:
+        new = [r for r in results if "analysis" in r]
+        if new:
+            ids = (await db.scalars(
+                insert(models.LLMAnalysis).returning(models.LLMAnalysis.id, sort_by_parameter_order=True),
+                [r.pop("analysis") for r in new]
+            )).all()
+            for result, analysis_id in zip(new, ids):
+                result["analysis_id"] = analysis_id
+
+        await db.execute(update(models.LLMJobItem), results)
+
+        completed = sum(1 for r in results if r["status"] == "completed")
+        await db.execute(
+            update(models.LLMJob).where(models.LLMJob.id == job_id).values(
+                completed_items=models.LLMJob.completed_items + completed,
+                failed_items=models.LLMJob.failed_items + len(results) - completed
+            )
+        )
+        await db.commit()
+
+
+async def run_job(job_id: int):
+    async with AsyncSessionLocal() as db:
+        job = await db.get(models.LLMJob, job_id)
+        if job is None or job.status in ("completed", "failed"):
+            return
+        job.status = "running"
+        job.started_at = job.started_at or func.now()
+        await db.commit()
+        await db.refresh(job)
+
+    try:
+        last_id = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                items = (await db.scalars(
+                    select(models.LLMJobItem).where(
+                        models.LLMJobItem.job_id == job_id,
+                        models.LLMJobItem.status == "pending",
+                        models.LLMJobItem.id > last_id
+                    ).order_by(models.LLMJobItem.id).limit(JOB_PAGE_SIZE)
+                )).all()
+            if not items:
+                break
+            last_id = items[-1].id
+
+            prepared = await _prepare_items(job, items)
+            batch = []
+            flushed_at = time.monotonic()
+            for finished in asyncio.as_completed([_analyze_item(job, p) for p in prepared]):
+                batch.append(await finished)
+                # Full batches keep inserts large; the interval keeps progress moving on small jobs
+                if (len(batch) >= settings.llm_batch_insert_size
+                        or time.monotonic() - flushed_at >= settings.llm_progress_interval_seconds):
+                    await _flush(job_id, batch)
+                    batch = []
+                    flushed_at = time.monotonic()
+            await _flush(job_id, batch)
+
+        status, error = "completed", None
+    except Exception as e:
+        logger.exception("LLM job %s failed", job_id)
+        status, error = "failed", str(e)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(models.LLMJob).where(models.LLMJob.id == job_id).values(
+                status=status, error=error, finished_at=func.now()
+            )
+        )
+        await db.commit()
+
+
+class JobRunner:
+    """A fixed set of worker tasks draining a queue of job ids."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: "asyncio.Queue[int]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    def submit(self, job_id: int):
+        self._queue.put_nowait(job_id)
+
+    async def start(self):
+        # Jobs interrupted by a restart pick up from their pending items
+        try:
+            async with AsyncSessionLocal() as db:
+                unfinished = (await db.scalars(
+                    select(models.LLMJob.id).where(models.LLMJob.status.in_(("pending", "running")))
+                    .order_by(models.LLMJob.id)
+                )).all()
+        except SQLAlchemyError:
+            logger.warning("Could not read llm_jobs; interrupted jobs were not resumed", exc_info=True)
+            unfinished = []
+        for job_id in unfinished:
+            self.submit(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await run_job(job_id)
+            finally:
+                self._queue.task_done()
+
+
+job_runner = JobRunner(settings.llm_job_workers)
@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from typing import AsyncIterator, Optional
+import httpx
+from .config import settings
+
+ANTHROPIC_VERSION = "2023-06-01"
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+_TOKEN = re.compile(r"\S+\s*|\s+")
+
+
+class LLMProviderError(Exception):
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+class PlaceholderProvider:
+    """The response returned before a real provider is configured."""
+
+    generates_text = False
+
+    def configured(self) -> bool:
+        return bool(settings.anthropic_api_key or settings.openai_api_key)
+
+    async def complete(self, model: str, analysis_type: str, prompt: str) -> str:
+        response_text = f"[LLM Analysis Placeholder - Integration ready for {model}]\n\n"
+        response_text += f"Analysis Type: {analysis_type}\n"
+        response_text += f"Prompt length: {len(prompt)} characters\n\n"
+        response_text += "To enable actual LLM analysis, configure API keys in .env file."
+        return response_text
+
+    async def stream(self, model: str, analysis_type: str, prompt: str) -> AsyncIterator[str]:
+        for token in _TOKEN.findall(await self.complete(model, analysis_type, prompt)):
+            yield token
+
+    async def aclose(self):
+        pass
+
+
+class MockProvider:
+    """In-process stand-in that answers deterministically after a fixed delay."""
+
+    generates_text = True
+
+    def configured(self) -> bool:
+        return True
+
+    async def complete(self, model: str, analysis_type: str, prompt: str) -> str:
+        await asyncio.sleep(settings.llm_mock_latency_seconds)
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+        return f"[mock {model}] {analysis_type} analysis of {len(prompt)} characters ({digest})"
+
+    async def stream(self, model: str, analysis_type: str, prompt: str) -> AsyncIterator[str]:
+        tokens = _TOKEN.findall(await self.complete(model, analysis_type, prompt))
+        for token in tokens:
+            yield token
+            await asyncio.sleep(settings.llm_mock_latency_seconds / len(tokens))
+
+    async def aclose(self):
+        pass
+
+
+class AnthropicProvider:
+    """Messages API over one pooled, keep-alive httpx client."""
+
+    generates_text = True
+
+    def __init__(self, base_url: str, api_key: str, timeout: float, max_connections: int):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                headers={"x-api-key": self.api_key, "anthropic-version": ANTHROPIC_VERSION}
+            )
+        return self._client
+
+    def _body(self, model: str, prompt: str, stream: bool = False) -> dict:
+        body = {
+            "model": model,
+            "max_tokens": settings.llm_max_tokens,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+        if stream:
+            body["stream"] = True
+        return body
+
+    @staticmethod
+    def _raise_for_status(response: httpx.Response, body: str):
+        if response.status_code != 200:
+            raise LLMProviderError(
+                f"Provider returned {response.status_code}: {body[:200]}",
+                retryable=response.status_code in RETRYABLE_STATUS,
+                retry_after=_retry_after(response)
+            )
+
+    async def complete(self, model: str, analysis_type: str, prompt: str) -> str:
+        try:
+            response = await self.client.post("/v1/messages", json=self._body(model, prompt))
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            raise LLMProviderError(f"{type(e).__name__}: {e}", retryable=True)
+
+        self._raise_for_status(response, response.text)
+        return "".join(
+            block.get("text", "") for block in response.json().get("content", [])
+            if block.get("type") == "text"
+        )
+
+    async def stream(self, model: str, analysis_type: str, prompt: str) -> AsyncIterator[str]:
+        try:
+            async with self.client.stream("POST", "/v1/messages", json=self._body(model, prompt, stream=True)) as response:
+                if response.status_code != 200:
+                    self._raise_for_status(response, (await response.aread()).decode(errors="replace"))
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[5:])
+                    if event.get("type") == "content_block_delta" and event["delta"].get("type") == "text_delta":
+                        yield event["delta"]["text"]
+                    elif event.get("type") == "error":
+                        raise LLMProviderError(event["error"].get("message", "Provider stream error"))
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            raise LLMProviderError(f"{type(e).__name__}: {e}", retryable=True)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ProviderPool:
+    """Every provider call goes through here: bounded concurrency, a shared
+    token bucket and exponential backoff with jitter on retryable errors."""
+
+    def __init__(self, provider, max_concurrency: int, rate: float, burst: int, max_retries: int):
+        self.provider = provider
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate, burst)
+
+    def configured(self) -> bool:
+        return self.provider.configured()
+
+    def generates_text(self) -> bool:
+        return self.provider.generates_text and self.provider.configured()
+
+    async def complete(self, model: str, analysis_type: str, prompt: str) -> str:
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                await self._bucket.acquire()
+                try:
+                    return await self.provider.complete(model, analysis_type, prompt)
+                except LLMProviderError as e:
+                    if not e.retryable or attempt >= self.max_retries:
+                        raise
+                    delay = e.retry_after or min(30.0, 0.5 * 2 ** attempt)
+            attempt += 1
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+
+    async def stream(self, model: str, analysis_type: str, prompt: str) -> AsyncIterator[str]:
+        """Like complete, but tokens are yielded as they arrive.
+
+        Only failures before the first token are retried; after that the
+        caller has already forwarded partial output.
+        """
+        attempt = 0
+        while True:
+            started = False
+            async with self._semaphore:
+                await self._bucket.acquire()
+                try:
+                    async for token in self.provider.stream(model, analysis_type, prompt):
+                        started = True
+                        yield token
+                    return
+                except LLMProviderError as e:
+                    if started or not e.retryable or attempt >= self.max_retries:
+                        raise
+                    delay = e.retry_after or min(30.0, 0.5 * 2 ** attempt)
+            attempt += 1
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+
+    async def aclose(self):
+        await self.provider.aclose()
+
+
+def _make_provider():
+    if settings.llm_provider == "anthropic":
+        return AnthropicProvider(
+            settings.llm_base_url,
+            settings.anthropic_api_key,
+            settings.llm_timeout_seconds,
+            settings.llm_max_concurrency
+        )
+    if settings.llm_provider == "mock":
+        return MockProvider()
+    return PlaceholderProvider()
+
+
+provider_pool = ProviderPool(
+    _make_provider(),
+    max_concurrency=settings.llm_max_concurrency,
+    rate=settings.llm_requests_per_second,
+    burst=settings.llm_burst,
+    max_retries=settings.llm_max_retries
+)
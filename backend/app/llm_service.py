@@ -0,0 +1,108 @@
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+from . import llm_cache, llm_context, models, schemas
+from .database import AsyncSessionLocal
+from .llm_providers import provider_pool
+
+
+async def build_context(
+    db: AsyncSession,
+    report_id: Optional[int],
+    lgu_id: Optional[int],
+    analysis_type: str,
+    model: str
+) -> llm_context.ContextResult:
+    """Budgeted context for a report or LGU; raises LookupError when it does not exist."""
+    if report_id:
+        report = await db.get(
+            models.AuditReport,
+            report_id,
+            options=[undefer(models.AuditReport.raw_text), undefer(models.AuditReport.findings_text)]
+        )
+        if not report:
+            raise LookupError("Report not found")
+        text = report.findings_text or report.raw_text or ""
+
+    elif lgu_id:
+        lgu = await db.get(models.LocalGovernment, lgu_id)
+        if not lgu:
+            raise LookupError("LGU not found")
+        text = await llm_context.lgu_context(db, lgu)
+
+    else:
+        text = ""
+
+    return await llm_context.pack_text(db, text, analysis_type, model)
+
+
+def build_prompt(analysis_type: str, context_text: str, custom_prompt: Optional[str] = None) -> str:
+    return custom_prompt or f"Analyze the following audit data for {analysis_type}:\n\n{context_text}"
+
+
+async def request_prompt(
+    db: AsyncSession,
+    report_id: Optional[int],
+    lgu_id: Optional[int],
+    analysis_type: str,
+    model: str,
+    custom_prompt: Optional[str] = None
+) -> str:
+    """The prompt to send; raises LookupError when the target does not exist.
+
+    A custom prompt replaces the context, so it is only checked that the target exists.
+    """
+    if not custom_prompt:
+        context = await build_context(db, report_id, lgu_id, analysis_type, model)
+        return build_prompt(analysis_type, context.text)
+
+    if report_id and not await db.get(models.AuditReport, report_id):
+        raise LookupError("Report not found")
+    if not report_id and lgu_id and not await db.get(models.LocalGovernment, lgu_id):
+        raise LookupError("LGU not found")
+    return custom_prompt
+
+
+async def save_analysis(
+    db: AsyncSession,
+    report_id: Optional[int],
+    lgu_id: Optional[int],
+    analysis_type: str,
+    model: str,
+    prompt: str,
+    key: str,
+    response_text: str
+) -> schemas.LLMAnalysis:
+    analysis = models.LLMAnalysis(
+        report_id=report_id,
+        lgu_id=lgu_id,
+        analysis_type=analysis_type,
+        prompt=prompt,
+        response=response_text,
+        model_name=model,
+        prompt_hash=llm_cache.storable_key(key)
+    )
+
+    db.add(analysis)
+    await db.commit()
+    await db.refresh(analysis)
+
+    return schemas.LLMAnalysis.model_validate(analysis)
+
+
+async def run_analysis(
+    report_id: Optional[int],
+    lgu_id: Optional[int],
+    analysis_type: str,
+    model: str,
+    prompt: str,
+    key: str
+) -> schemas.LLMAnalysis:
+    # Runs detached from the request that started it, so it owns its session
+    async with AsyncSessionLocal() as db:
+        analysis = await llm_cache.cached_analysis(db, key)
+        if analysis:
+            return schemas.LLMAnalysis.model_validate(analysis)
+
+        response_text = await provider_pool.complete(model, analysis_type, prompt)
+        return await save_analysis(db, report_id, lgu_id, analysis_type, model, prompt, key, response_text)
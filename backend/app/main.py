@@ -1,20 +1,65 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from .cache import ResponseCache, ResponseCacheMiddleware
+from .columnar import engine as columnar_engine
 from .config import settings
-from .routers import topics, lgus, transactions, analytics, llm
+from .database import AsyncSessionLocal, async_engine
+from .data_version import data_version_tracker
+from .instrumentation import SERVER_TIMING_HEADER, N_PLUS_ONE_HEADER, InstrumentationMiddleware, instrument_engine, metrics
+from .llm_jobs import job_runner
+from .llm_providers import provider_pool
+from .pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from .routers import topics, lgus, transactions, analytics, llm, search
+from .routers.llm import LLM_CACHE_HEADER
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if columnar_engine.enabled:
+        async with AsyncSessionLocal() as db:
+            await columnar_engine.snapshot(db)
+    await job_runner.start()
+    yield
+    await job_runner.stop()
+    await provider_pool.aclose()
+    await async_engine.dispose()
+
 
 app = FastAPI(
     title="OpenAudit API",
     description="API for Philippine audit reports data exploration and LLM integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+if settings.response_cache_enabled:
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        cache=ResponseCache(
+            max_entries=settings.response_cache_max_entries,
+            ttl_seconds=settings.response_cache_ttl_seconds
+        ),
+        version_source=data_version_tracker.current
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, LLM_CACHE_HEADER, SERVER_TIMING_HEADER, N_PLUS_ONE_HEADER],
+)
+
+# Outermost, so cache hits are measured too (and show zero queries)
+instrument_engine(async_engine.sync_engine)
+app.add_middleware(
+    InstrumentationMiddleware,
+    registry=metrics,
+    echo_sample_rate=settings.sql_echo_sample_rate,
+    n_plus_one_threshold=settings.n_plus_one_threshold
 )
 
 app.include_router(topics.router)
@@ -22,6 +67,7 @@ app.include_router(lgus.router)
 app.include_router(transactions.router)
 app.include_router(analytics.router)
 app.include_router(llm.router)
+app.include_router(search.router)
 
 
 @app.get("/")
@@ -36,3 +82,9 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
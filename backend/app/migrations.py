@@ -0,0 +1,34 @@
+import logging
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from .database import engine
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+# Schema of databases created by the old database/schema.sql or create_all, before migrations
+BASELINE_REVISION = "0001"
+
+
+def alembic_config() -> Config:
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    # Leave the caller's logging setup alone
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade_database(revision: str = "head"):
+    """Migrate the database to ``revision``, adopting unversioned databases at the baseline."""
+    config = alembic_config()
+    inspector = inspect(engine)
+    if inspector.has_table("local_governments") and not inspector.has_table("alembic_version"):
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    upgrade_database()
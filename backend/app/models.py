@@ -1,8 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, TIMESTAMP, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, Float, TIMESTAMP, ForeignKey, UniqueConstraint, Index, DDL, event
+from sqlalchemy.orm import deferred, relationship
+from sqlalchemy.sql import func, text
 from .database import Base
 
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 
 class AuditTopic(Base):
     __tablename__ = "audit_topics"
@@ -29,7 +35,19 @@ class LocalGovernment(Base):
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
-    __table_args__ = (UniqueConstraint('name', 'province', name='_name_province_uc'),)
+    __table_args__ = (
+        UniqueConstraint('name', 'province', name='_name_province_uc'),
+        Index('idx_local_governments_name_id', 'name', 'id'),
+        Index('idx_local_governments_province_name_id', 'province', 'name', 'id'),
+        Index(
+            'idx_local_governments_name_trgm', 'name',
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+        Index(
+            'idx_local_governments_province_trgm', 'province',
+            postgresql_using='gin', postgresql_ops={'province': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+    )
 
     audit_reports = relationship("AuditReport", back_populates="lgu")
     unliquidated_transactions = relationship("UnliquidatedTransaction", back_populates="lgu")
@@ -44,12 +62,16 @@ class AuditReport(Base):
     year = Column(Integer, nullable=False)
     report_type = Column(String(100), default="executive_summary")
     file_path = Column(Text)
-    raw_text = Column(Text)
-    findings_text = Column(Text)
+    raw_text = deferred(Column(Text))
+    findings_text = deferred(Column(Text))
+    content_hash = Column(String(64))
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
-    __table_args__ = (UniqueConstraint('lgu_id', 'year', 'report_type', name='_lgu_year_type_uc'),)
+    __table_args__ = (
+        UniqueConstraint('lgu_id', 'year', 'report_type', name='_lgu_year_type_uc'),
+        Index('idx_audit_reports_content_hash', 'content_hash'),
+    )
 
     lgu = relationship("LocalGovernment", back_populates="audit_reports")
     unliquidated_transactions = relationship("UnliquidatedTransaction", back_populates="report")
@@ -57,23 +79,66 @@ class AuditReport(Base):
     llm_analyses = relationship("LLMAnalysis", back_populates="report")
 
 
+# On PostgreSQL this table is range-partitioned by year, with primary key (id, year);
+# the partitions come from alembic migration 0003, so create_all alone does not build it
 class UnliquidatedTransaction(Base):
     __tablename__ = "unliquidated_transactions"
 
-    id = Column(Integer, primary_key=True, index=True)
-    lgu_id = Column(Integer, ForeignKey("local_governments.id", ondelete="CASCADE"), index=True)
+    id = Column(Integer, primary_key=True)
+    lgu_id = Column(Integer, ForeignKey("local_governments.id", ondelete="CASCADE"))
     report_id = Column(Integer, ForeignKey("audit_reports.id", ondelete="CASCADE"))
-    year = Column(Integer, nullable=False, index=True)
+    # Copy of the LGU's province so province filters need no join; an LGU is keyed by
+    # (name, province), so the copy never goes stale
+    province = Column(String(255))
+    year = Column(Integer, nullable=False)
     amount = Column(DECIMAL(15, 2), nullable=False)
     context_pre = Column(Text)
     context_post = Column(Text)
+    # CSV rows only: sha256 of the source row, and its position among rows with the same LGU and year
+    content_hash = Column(String(64))
+    source_seq = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        # Natural key of CSV-loaded rows; extracted rows are keyed by their report instead
+        Index(
+            'idx_unliquidated_natural_key', 'lgu_id', 'year', 'source_seq',
+            unique=True,
+            postgresql_where=text('report_id IS NULL'),
+            sqlite_where=text('report_id IS NULL')
+        ),
+        Index('idx_unliquidated_year_id', 'year', 'id'),
+        Index('idx_unliquidated_report_id', 'report_id'),
+        Index('idx_unliquidated_amount_id', 'amount', 'id'),
+        Index('idx_unliquidated_year_amount_id', 'year', 'amount', 'id'),
+        Index('idx_unliquidated_province_year_amount_id', 'province', 'year', 'amount', 'id'),
+        # Province-only listings in id order, so a rare province is not found by walking the primary key
+        Index('idx_unliquidated_province_id', 'province', 'id'),
+        # Covers the LGU detail sums and the LGU-year rollup refresh without heap reads
+        Index('idx_unliquidated_lgu_year_id', 'lgu_id', 'year', 'id', postgresql_include=['amount']),
+    )
+
     lgu = relationship("LocalGovernment", back_populates="unliquidated_transactions")
     report = relationship("AuditReport", back_populates="unliquidated_transactions")
 
 
+# Generated full-text columns exist on PostgreSQL only; SQLite searches through app.text_search's in-process index
+SEARCH_CONFIG = "english"
+
+for _table, _document in (
+    ("audit_reports", f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(findings_text, '')), 'A') || "
+                      f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(raw_text, '')), 'B')"),
+    ("unliquidated_transactions", f"to_tsvector('{SEARCH_CONFIG}', coalesce(context_pre, '') || ' ' || coalesce(context_post, ''))"),
+):
+    event.listen(Base.metadata.tables[_table], "after_create", DDL(
+        f"ALTER TABLE {_table} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ({_document}) STORED"
+    ).execute_if(dialect="postgresql"))
+    event.listen(Base.metadata.tables[_table], "after_create", DDL(
+        f"CREATE INDEX IF NOT EXISTS idx_{_table}_search ON {_table} USING gin (search_vector)"
+    ).execute_if(dialect="postgresql"))
+
+
 class ReportTopic(Base):
     __tablename__ = "report_topics"
 
@@ -99,8 +164,154 @@ class LLMAnalysis(Base):
     prompt = Column(Text)
     response = Column(Text, nullable=False)
     model_name = Column(String(100))
+    prompt_hash = Column(String(64))
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        Index('idx_llm_analysis_created_id', 'created_at', 'id'),
+        Index('idx_llm_analysis_prompt_hash', 'prompt_hash'),
+    )
+
     report = relationship("AuditReport", back_populates="llm_analyses")
     lgu = relationship("LocalGovernment", back_populates="llm_analyses")
+
+
+class LLMChunkSummary(Base):
+    __tablename__ = "llm_chunk_summaries"
+
+    content_hash = Column(String(64), primary_key=True)
+    model_name = Column(String(100))
+    summary = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class LLMJob(Base):
+    __tablename__ = "llm_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_type = Column(String(100), nullable=False)
+    model_name = Column(String(100), nullable=False)
+    custom_prompt = Column(Text)
+    status = Column(String(20), nullable=False, default="pending")
+    total_items = Column(Integer, nullable=False, default=0)
+    completed_items = Column(Integer, nullable=False, default=0)
+    failed_items = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    started_at = Column(TIMESTAMP)
+    finished_at = Column(TIMESTAMP)
+
+    items = relationship("LLMJobItem", back_populates="job")
+
+    @property
+    def progress(self) -> float:
+        if not self.total_items:
+            return 1.0
+        return round((self.completed_items + self.failed_items) / self.total_items, 4)
+
+
+class LLMJobItem(Base):
+    __tablename__ = "llm_job_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("llm_jobs.id", ondelete="CASCADE"), nullable=False)
+    report_id = Column(Integer, ForeignKey("audit_reports.id", ondelete="CASCADE"))
+    lgu_id = Column(Integer, ForeignKey("local_governments.id", ondelete="CASCADE"))
+    status = Column(String(20), nullable=False, default="pending")
+    analysis_id = Column(Integer, ForeignKey("llm_analysis.id", ondelete="SET NULL"))
+    error = Column(Text)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (Index('idx_llm_job_items_job_status_id', 'job_id', 'status', 'id'),)
+
+    job = relationship("LLMJob", back_populates="items")
+
+
+class YearlyRollup(Base):
+    __tablename__ = "yearly_rollups"
+
+    year = Column(Integer, primary_key=True)
+    total_amount = Column(DECIMAL(18, 2), nullable=False)
+    avg_amount = Column(DECIMAL(15, 2))
+    transaction_count = Column(Integer, nullable=False)
+    lgus_count = Column(Integer, nullable=False)
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class ProvinceYearRollup(Base):
+    __tablename__ = "province_year_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    province = Column(String(255))
+    year = Column(Integer, nullable=False, index=True)
+    total_amount = Column(DECIMAL(18, 2), nullable=False)
+    avg_amount = Column(DECIMAL(15, 2))
+    transaction_count = Column(Integer, nullable=False)
+    lgus_count = Column(Integer, nullable=False)
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
+
+    __table_args__ = (Index('idx_province_year_rollups_province_year', 'province', 'year'),)
+
+
+class LGUYearRollup(Base):
+    __tablename__ = "lgu_year_rollups"
+
+    lgu_id = Column(Integer, ForeignKey("local_governments.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True, index=True)
+    total_amount = Column(DECIMAL(18, 2), nullable=False)
+    avg_amount = Column(DECIMAL(15, 2))
+    transaction_count = Column(Integer, nullable=False)
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
+
+    lgu = relationship("LocalGovernment")
+
+
+class LGURiskScore(Base):
+    __tablename__ = "lgu_risk_scores"
+
+    id = Column(Integer, primary_key=True, index=True)
+    lgu_id = Column(Integer, ForeignKey("local_governments.id", ondelete="CASCADE"), nullable=False)
+    province = Column(String(255))
+    year = Column(Integer, nullable=False)
+    total_amount = Column(DECIMAL(18, 2), nullable=False)
+    previous_year = Column(Integer)
+    yoy_change = Column(DECIMAL(18, 2))
+    yoy_z = Column(Float, nullable=False)
+    amount_z = Column(Float, nullable=False)
+    peer_percentile = Column(Float, nullable=False)
+    province_share = Column(Float, nullable=False)
+    peer_count = Column(Integer, nullable=False)
+    risk_score = Column(Float, nullable=False)
+    scored_at = Column(TIMESTAMP, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('lgu_id', 'year', name='uq_lgu_risk_scores_lgu_year'),
+        Index('idx_lgu_risk_scores_score_id', 'risk_score', 'id'),
+        Index('idx_lgu_risk_scores_year_score_id', 'year', 'risk_score', 'id'),
+        Index('idx_lgu_risk_scores_province_year_score_id', 'province', 'year', 'risk_score', 'id'),
+    )
+
+    lgu = relationship("LocalGovernment")
+
+
+class TopicProvinceYearRollup(Base):
+    __tablename__ = "topic_province_year_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    topic_id = Column(Integer, ForeignKey("audit_topics.id", ondelete="CASCADE"))
+    province = Column(String(255))
+    year = Column(Integer, nullable=False, index=True)
+    report_count = Column(Integer, nullable=False)
+    proportion_sum = Column(DECIMAL(18, 4), nullable=False)
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
+
+    __table_args__ = (Index('idx_topic_province_year_rollups_topic_year', 'topic_id', 'year'),)
+
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,143 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import pyarrow as pa
+from fastapi import Request, Response
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.openaudit.columnar+json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+_FORMATS = {
+    JSON_MEDIA_TYPE: "json",
+    COLUMNAR_JSON_MEDIA_TYPE: "columnar",
+    ARROW_MEDIA_TYPE: "arrow",
+    "*/*": "json",
+    "application/*": "json",
+}
+
+
+def negotiate(request: Request) -> str:
+    """Pick json, columnar or arrow from the Accept header, honouring q-values."""
+    candidates = []
+    for position, part in enumerate(request.headers.get("accept", "").split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type.lower() in _FORMATS and quality > 0:
+            candidates.append((-quality, position, _FORMATS[media_type.lower()]))
+    return min(candidates)[2] if candidates else "json"
+
+
+def _json_value(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def columnar_json_response(payload: Dict[str, Any], headers: Optional[Iterable] = None) -> Response:
+    response = Response(
+        content=json.dumps(payload, separators=(",", ":"), default=_json_value),
+        media_type=COLUMNAR_JSON_MEDIA_TYPE
+    )
+    _copy_headers(response, headers)
+    return response
+
+
+def arrow_response(table: pa.Table, headers: Optional[Iterable] = None) -> Response:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+    _copy_headers(response, headers)
+    return response
+
+
+def _copy_headers(response: Response, headers: Optional[Iterable]):
+    # Headers set on the injected Response (cursors, totals) would otherwise be dropped
+    for name, value in headers or []:
+        if name.lower() not in ("content-length", "content-type"):
+            response.headers[name] = value
+    response.headers["Vary"] = "Accept"
+
+
+def transactions_columnar(transactions: Sequence) -> Dict[str, Any]:
+    """Parallel arrays per field, with each LGU listed once under "lgus"."""
+    lgus = {}
+    for t in transactions:
+        if t.lgu is not None:
+            lgus.setdefault(t.lgu.id, t.lgu)
+
+    return {
+        "id": [t.id for t in transactions],
+        "lgu_id": [t.lgu_id for t in transactions],
+        "report_id": [t.report_id for t in transactions],
+        "year": [t.year for t in transactions],
+        "amount": [float(t.amount) for t in transactions],
+        "context_pre": [t.context_pre for t in transactions],
+        "context_post": [t.context_post for t in transactions],
+        "created_at": [t.created_at for t in transactions],
+        "updated_at": [t.updated_at for t in transactions],
+        "lgus": {
+            "id": list(lgus),
+            "name": [lgu.name for lgu in lgus.values()],
+            "province": [lgu.province for lgu in lgus.values()],
+            "region": [lgu.region for lgu in lgus.values()],
+            "lgu_type": [lgu.lgu_type for lgu in lgus.values()],
+            "created_at": [lgu.created_at for lgu in lgus.values()],
+            "updated_at": [lgu.updated_at for lgu in lgus.values()],
+        },
+    }
+
+
+def transactions_arrow(transactions: Sequence) -> pa.Table:
+    """One record batch; LGU name, province, region and type are dictionary-encoded."""
+    def lgu_column(attribute: str) -> pa.DictionaryArray:
+        return pa.array(
+            [getattr(t.lgu, attribute) if t.lgu is not None else None for t in transactions],
+            type=pa.string()
+        ).dictionary_encode()
+
+    return pa.table({
+        "id": pa.array([t.id for t in transactions], type=pa.int64()),
+        "lgu_id": pa.array([t.lgu_id for t in transactions], type=pa.int64()),
+        "lgu_name": lgu_column("name"),
+        "province": lgu_column("province"),
+        "region": lgu_column("region"),
+        "lgu_type": lgu_column("lgu_type"),
+        "report_id": pa.array([t.report_id for t in transactions], type=pa.int64()),
+        "year": pa.array([t.year for t in transactions], type=pa.int32()),
+        "amount": pa.array([t.amount for t in transactions], type=pa.decimal128(15, 2)),
+        "context_pre": pa.array([t.context_pre for t in transactions], type=pa.string()),
+        "context_post": pa.array([t.context_post for t in transactions], type=pa.string()),
+        "created_at": pa.array([t.created_at for t in transactions], type=pa.timestamp("us")),
+        "updated_at": pa.array([t.updated_at for t in transactions], type=pa.timestamp("us")),
+    })
+
+
+def heatmap_matrix(cells: List[dict]) -> Dict[str, Any]:
+    """Dense province x year matrix of totals; cells without transactions are null."""
+    provinces = sorted({c["province"] for c in cells}, key=lambda p: (p is None, p or ""))
+    years = sorted({c["year"] for c in cells})
+    row_of = {province: i for i, province in enumerate(provinces)}
+    column_of = {year: j for j, year in enumerate(years)}
+
+    matrix: List[List[Optional[float]]] = [[None] * len(years) for _ in provinces]
+    for c in cells:
+        matrix[row_of[c["province"]]][column_of[c["year"]]] = c["total_amount"]
+
+    return {"provinces": provinces, "years": years, "total_amount": matrix}
+
+
+def heatmap_arrow(matrix: Dict[str, Any]) -> pa.Table:
+    """One row per province and one float64 column per year."""
+    columns = {"province": pa.array(matrix["provinces"], type=pa.string())}
+    for j, year in enumerate(matrix["years"]):
+        columns[str(year)] = pa.array([row[j] for row in matrix["total_amount"]], type=pa.float64())
+    return pa.table(columns)
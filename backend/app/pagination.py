@@ -0,0 +1,133 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_COUNT_MODES = "^(exact|approximate)$"
+
+
+def _to_json(value: Any):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _from_json(value: Any, column):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is Decimal:
+        return Decimal(value)
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    payload = json.dumps([_to_json(sort_value), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_column) -> Tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return _from_json(sort_value, sort_column), int(row_id)
+    except (ValueError, TypeError, ArithmeticError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def exact_count(db: AsyncSession, stmt: Select) -> int:
+    return await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+
+
+async def estimate_count(db: AsyncSession, stmt: Select) -> int:
+    """Row estimate from the planner on PostgreSQL, exact count elsewhere."""
+    if db.bind.dialect.name != "postgresql":
+        return await exact_count(db, stmt)
+
+    compiled = stmt.order_by(None).compile(
+        dialect=db.bind.dialect,
+        compile_kwargs={"literal_binds": True}
+    )
+    connection = await db.connection()
+    plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def fetch_keyset_page(
+    db: AsyncSession,
+    stmt: Select,
+    sort_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+    skip: int = 0,
+    scalars: bool = True
+) -> Tuple[List[Any], Optional[str]]:
+    """One page ordered by (sort_column, id_column) plus the cursor for the next one."""
+    key = tuple_(sort_column, id_column)
+    if cursor:
+        after = tuple_(*decode_cursor(cursor, sort_column))
+        stmt = stmt.where(key < after if descending else key > after)
+    elif skip:
+        stmt = stmt.offset(skip)
+
+    if descending:
+        stmt = stmt.order_by(sort_column.desc(), id_column.desc())
+    else:
+        stmt = stmt.order_by(sort_column.asc(), id_column.asc())
+
+    result = await db.execute(stmt.limit(limit + 1))
+    rows = result.scalars().all() if scalars else result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    return rows, next_cursor
+
+
+async def keyset_paginate(
+    db: AsyncSession,
+    stmt: Select,
+    response: Response,
+    sort_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+    skip: int = 0,
+    include_total: Optional[str] = None
+) -> List[Any]:
+    """Order by (sort_column, id_column) and return one page after the cursor.
+
+    The cursor for the following page is sent in the X-Next-Cursor header and
+    the total, when requested, in X-Total-Count.
+    """
+    if include_total == "exact":
+        response.headers[TOTAL_COUNT_HEADER] = str(await exact_count(db, stmt))
+    elif include_total == "approximate":
+        response.headers[TOTAL_COUNT_HEADER] = str(await estimate_count(db, stmt))
+
+    rows, next_cursor = await fetch_keyset_page(
+        db, stmt, sort_column, id_column, limit,
+        cursor=cursor, descending=descending, skip=skip
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    return rows
@@ -0,0 +1,145 @@
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Union
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from . import models
+
+# Scales the MAD to a standard deviation under normality
+MAD_SCALE = 1.4826
+# Smaller province-year peer groups get z = 0; their median and MAD say nothing
+MIN_PEERS = 3
+Z_LIMIT = 10.0
+INSERT_BATCH_SIZE = 10000
+
+SCORE_COLUMNS = [
+    "lgu_id", "province", "year", "total_amount", "previous_year", "yoy_change",
+    "yoy_z", "amount_z", "peer_percentile", "province_share", "peer_count", "risk_score",
+]
+
+
+def robust_z(values: pd.Series, keys) -> pd.Series:
+    """(x - median) / (1.4826 * MAD) within each group, 0 where the group cannot say."""
+    grouped = values.groupby(keys)
+    median = grouped.transform("median")
+    mad = (values - median).abs().groupby(keys).transform("median") * MAD_SCALE
+    usable = (mad > 0) & (grouped.transform("count") >= MIN_PEERS)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (values - median) / mad
+    return z.where(usable, 0.0).fillna(0.0).clip(-Z_LIMIT, Z_LIMIT)
+
+
+def score_lgu_years(frame: pd.DataFrame) -> pd.DataFrame:
+    """Score one row per LGU-year (lgu_id, province, year, total_amount) against its peers.
+
+    Peers are the LGUs of the same province in the same year. Amounts span six orders
+    of magnitude, so both z-scores work on log1p: amount_z on the amount and yoy_z on
+    the log change from the LGU's previous reported year. risk_score adds the positive
+    parts of the two, so an LGU ranks high for being large for its province, for a jump
+    from its own history, or both.
+    """
+    frame = frame.sort_values(["lgu_id", "year"], ignore_index=True)
+    amount = frame["total_amount"].astype(float)
+    log_amount = np.log1p(amount.clip(lower=0))
+
+    by_lgu = frame.groupby("lgu_id", sort=False)
+    previous_amount = by_lgu["total_amount"].shift().astype(float)
+    frame["previous_year"] = by_lgu["year"].shift()
+    frame["yoy_change"] = (amount - previous_amount).round(2)
+    growth = log_amount - np.log1p(previous_amount.clip(lower=0))
+
+    peers = [frame["province"].fillna(""), frame["year"]]
+    frame["amount_z"] = robust_z(log_amount, peers)
+    frame["yoy_z"] = robust_z(growth, peers)
+
+    grouped = amount.groupby(peers)
+    frame["peer_percentile"] = grouped.rank(pct=True)
+    province_total = grouped.transform("sum")
+    frame["province_share"] = (amount / province_total).where(province_total > 0, 0.0)
+    frame["peer_count"] = grouped.transform("size")
+    frame["risk_score"] = frame["amount_z"].clip(lower=0) + frame["yoy_z"].clip(lower=0)
+    return frame
+
+
+def _affected_groups(db, frame: pd.DataFrame, years, lgu_ids) -> Dict[str, List[int]]:
+    """Province-year peer groups whose scores a change to the given LGU-years can move.
+
+    Those are the changed province-years themselves and, through yoy_z, the province-year
+    of each changed LGU's next reported year.
+    """
+    lgu = models.LocalGovernment
+    provinces = db.execute(
+        select(lgu.id, lgu.province).where(lgu.id.in_(lgu_ids)) if lgu_ids is not None
+        else select(lgu.id, lgu.province)
+    ).all()
+    years = set(years) if years is not None else set(frame["year"])
+    lgu_years = frame.groupby("lgu_id")["year"].agg(list).to_dict()
+
+    groups: Dict[str, Set[int]] = defaultdict(set)
+    for lgu_id, province in provinces:
+        reported = sorted(lgu_years.get(lgu_id, []))
+        for year in years:
+            groups[province or ""].add(year)
+            later = reported[bisect_right(reported, year):]
+            if later:
+                groups[province or ""].add(later[0])
+    return {province: sorted(group_years) for province, group_years in groups.items()}
+
+
+def refresh_risk_scores(
+    db: Union[Session, Connection],
+    years: Optional[Iterable[int]] = None,
+    lgu_ids: Optional[Iterable[int]] = None
+) -> int:
+    """Rescore LGU-years from lgu_year_rollups in one vectorized pass.
+
+    Scores are relative to the province-year peer group and to each LGU's previous
+    year, so a change to some LGU-years moves scores outside them. Given the changed
+    years / LGUs, only their provinces are scored and only the peer groups the change
+    reaches are replaced; without them the whole table is rebuilt.
+    """
+    rollup = models.LGUYearRollup
+    lgu = models.LocalGovernment
+    stmt = select(rollup.lgu_id, lgu.province, rollup.year, rollup.total_amount).join(lgu, lgu.id == rollup.lgu_id)
+    stale = delete(models.LGURiskScore)
+
+    lgu_ids = sorted(set(lgu_ids)) if lgu_ids is not None else None
+    if lgu_ids is not None:
+        # Peers share a province, so scoring whole provinces gives the same scores as the full pass
+        in_scope = lgu.province.in_(select(lgu.province).where(lgu.id.in_(lgu_ids)))
+        if db.scalar(select(func.count()).where(lgu.id.in_(lgu_ids), lgu.province.is_(None))):
+            in_scope = or_(in_scope, lgu.province.is_(None))
+        stmt = stmt.where(in_scope)
+
+    rows = db.execute(stmt).all()
+    scores = pd.DataFrame(rows, columns=["lgu_id", "province", "year", "total_amount"])
+    if rows:
+        scores = score_lgu_years(scores)
+
+    if years is None and lgu_ids is None:
+        db.execute(stale)
+    else:
+        groups = _affected_groups(db, scores, years, lgu_ids)
+        score = models.LGURiskScore
+        for province, group_years in groups.items():
+            same_province = score.province.is_(None) | (score.province == "") if not province else score.province == province
+            db.execute(stale.where(same_province, score.year.in_(group_years)))
+        keys = set((province, year) for province, group_years in groups.items() for year in group_years)
+        scores = scores[[key in keys for key in zip(scores["province"].fillna(""), scores["year"])]]
+
+    if scores.empty:
+        return 0
+
+    records = scores[SCORE_COLUMNS].astype(object).where(scores[SCORE_COLUMNS].notna(), None)
+    # A plain list of ints and Nones would be coerced back to float64 with NaN
+    records["previous_year"] = pd.Series(
+        [None if y is None else int(y) for y in records["previous_year"]], index=records.index, dtype=object
+    )
+    records = records.to_dict("records")
+
+    for start in range(0, len(records), INSERT_BATCH_SIZE):
+        db.execute(insert(models.LGURiskScore.__table__), records[start:start + INSERT_BATCH_SIZE])
+    return len(records)
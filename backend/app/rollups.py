@@ -0,0 +1,152 @@
+from typing import Iterable, Optional, Union
+from sqlalchemy import delete, func, insert, literal, select, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from . import models
+
+
+def refresh_rollups(
+    db: Union[Session, Connection],
+    years: Optional[Iterable[int]] = None,
+    lgu_ids: Optional[Iterable[int]] = None
+):
+    """Rebuild the rollup tables, limited to the given years / LGUs when provided.
+
+    LGU x year rows are aggregated from the transactions, province x year rows
+    from the LGU rollup and yearly rows from the province rollup, so an
+    incremental refresh only scans the slices that changed. Transactions with no
+    LGU appear only in the yearly rows, which cover every transaction.
+    """
+    years = sorted(set(years)) if years is not None else None
+    lgu_ids = sorted(set(lgu_ids)) if lgu_ids is not None else None
+
+    _refresh_lgu_year(db, years, lgu_ids)
+    _refresh_province_year(db, years)
+    _refresh_yearly(db, years)
+
+
+def _refresh_lgu_year(db: Session, years, lgu_ids):
+    txn = models.UnliquidatedTransaction
+    rollup = models.LGUYearRollup
+
+    stale = delete(rollup)
+    source = select(
+        txn.lgu_id,
+        txn.year,
+        func.sum(txn.amount),
+        func.avg(txn.amount),
+        func.count(txn.id)
+    ).where(txn.lgu_id.isnot(None)).group_by(txn.lgu_id, txn.year)
+
+    if years is not None:
+        stale = stale.where(rollup.year.in_(years))
+        source = source.where(txn.year.in_(years))
+    if lgu_ids is not None:
+        stale = stale.where(rollup.lgu_id.in_(lgu_ids))
+        source = source.where(txn.lgu_id.in_(lgu_ids))
+
+    db.execute(stale)
+    db.execute(insert(rollup).from_select(
+        ["lgu_id", "year", "total_amount", "avg_amount", "transaction_count"],
+        source
+    ))
+
+
+def _refresh_province_year(db: Session, years):
+    lgu_year = models.LGUYearRollup
+    rollup = models.ProvinceYearRollup
+
+    stale = delete(rollup)
+    source = select(
+        models.LocalGovernment.province,
+        lgu_year.year,
+        func.sum(lgu_year.total_amount),
+        func.sum(lgu_year.total_amount) / func.sum(lgu_year.transaction_count),
+        func.sum(lgu_year.transaction_count),
+        func.count(lgu_year.lgu_id)
+    ).join(
+        models.LocalGovernment, models.LocalGovernment.id == lgu_year.lgu_id
+    ).group_by(models.LocalGovernment.province, lgu_year.year)
+
+    if years is not None:
+        stale = stale.where(rollup.year.in_(years))
+        source = source.where(lgu_year.year.in_(years))
+
+    db.execute(stale)
+    db.execute(insert(rollup).from_select(
+        ["province", "year", "total_amount", "avg_amount", "transaction_count", "lgus_count"],
+        source
+    ))
+
+
+def _refresh_yearly(db: Session, years):
+    province_year = models.ProvinceYearRollup
+    txn = models.UnliquidatedTransaction
+    rollup = models.YearlyRollup
+
+    # Every LGU belongs to exactly one province, so province LGU counts add up
+    attributed = select(
+        province_year.year.label("year"),
+        province_year.total_amount.label("total_amount"),
+        province_year.transaction_count.label("transaction_count"),
+        province_year.lgus_count.label("lgus_count")
+    )
+    # Transactions not matched to an LGU are in no province row but still count toward the year
+    unattributed = select(
+        txn.year,
+        func.sum(txn.amount),
+        func.count(txn.id),
+        literal(0)
+    ).where(txn.lgu_id.is_(None)).group_by(txn.year)
+
+    stale = delete(rollup)
+    if years is not None:
+        stale = stale.where(rollup.year.in_(years))
+        attributed = attributed.where(province_year.year.in_(years))
+        unattributed = unattributed.where(txn.year.in_(years))
+
+    parts = union_all(attributed, unattributed).subquery()
+    source = select(
+        parts.c.year,
+        func.sum(parts.c.total_amount),
+        func.sum(parts.c.total_amount) / func.sum(parts.c.transaction_count),
+        func.sum(parts.c.transaction_count),
+        func.sum(parts.c.lgus_count)
+    ).group_by(parts.c.year)
+
+    db.execute(stale)
+    db.execute(insert(rollup).from_select(
+        ["year", "total_amount", "avg_amount", "transaction_count", "lgus_count"],
+        source
+    ))
+
+
+def refresh_topic_rollups(db: Union[Session, Connection], years: Optional[Iterable[int]] = None):
+    """Rebuild topic x province x year aggregates of report_topics, limited to the given years."""
+    rollup = models.TopicProvinceYearRollup
+    report = models.AuditReport
+    report_topic = models.ReportTopic
+
+    stale = delete(rollup)
+    source = select(
+        report_topic.topic_id,
+        models.LocalGovernment.province,
+        report.year,
+        func.count(report_topic.id),
+        func.sum(report_topic.topic_proportion)
+    ).join(
+        report, report.id == report_topic.report_id
+    ).outerjoin(
+        models.LocalGovernment, models.LocalGovernment.id == report.lgu_id
+    ).group_by(report_topic.topic_id, models.LocalGovernment.province, report.year)
+
+    if years is not None:
+        years = sorted(set(years))
+        stale = stale.where(rollup.year.in_(years))
+        source = source.where(report.year.in_(years))
+
+    db.execute(stale)
+    db.execute(insert(rollup).from_select(
+        ["topic_id", "province", "year", "report_count", "proportion_sum"],
+        source
+    ))
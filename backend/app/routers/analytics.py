@@ -1,111 +1,146 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from .. import models, schemas
-from ..database import get_db
-
-router = APIRouter(prefix="/analytics", tags=["analytics"])
+import math
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from typing import List, Optional
+from .. import aggregates, histogram, models, negotiation, pagination, schemas
+from ..database import get_async_db
+from ..instrumentation import InstrumentedRoute
+
+router = APIRouter(prefix="/analytics", tags=["analytics"], route_class=InstrumentedRoute)
+
+RISK_SORT_COLUMNS = {
+    "risk_score": models.LGURiskScore.risk_score,
+    "amount_z": models.LGURiskScore.amount_z,
+    "yoy_z": models.LGURiskScore.yoy_z,
+    "peer_percentile": models.LGURiskScore.peer_percentile,
+    "province_share": models.LGURiskScore.province_share,
+    "total_amount": models.LGURiskScore.total_amount,
+}
 
 
 @router.get("/stats", response_model=schemas.StatsResponse)
-def get_overall_stats(db: Session = Depends(get_db)):
-    total_lgus = db.query(func.count(models.LocalGovernment.id)).scalar()
-    total_reports = db.query(func.count(models.AuditReport.id)).scalar()
-
-    total_unliquidated = db.query(
-        func.sum(models.UnliquidatedTransaction.amount)
-    ).scalar() or 0
-
-    years = db.query(models.UnliquidatedTransaction.year).distinct().all()
-    years_covered = sorted([y[0] for y in years])
-
-    provinces_count = db.query(
-        func.count(func.distinct(models.LocalGovernment.province))
-    ).scalar()
-
-    return schemas.StatsResponse(
-        total_lgus=total_lgus,
-        total_reports=total_reports,
-        total_unliquidated_amount=total_unliquidated,
-        years_covered=years_covered,
-        provinces_count=provinces_count
-    )
+async def get_overall_stats(db: AsyncSession = Depends(get_async_db)):
+    return await aggregates.overall_stats(db)
 
 
 @router.get("/trends/yearly")
-def get_yearly_trends(db: Session = Depends(get_db)):
-    results = db.query(
-        models.UnliquidatedTransaction.year,
-        func.sum(models.UnliquidatedTransaction.amount).label("total_amount"),
-        func.avg(models.UnliquidatedTransaction.amount).label("avg_amount"),
-        func.count(models.UnliquidatedTransaction.id).label("count"),
-        func.count(func.distinct(models.UnliquidatedTransaction.lgu_id)).label("lgus_count")
-    ).group_by(
-        models.UnliquidatedTransaction.year
-    ).order_by(
-        models.UnliquidatedTransaction.year
-    ).all()
-
-    return [
-        {
-            "year": r.year,
-            "total_amount": float(r.total_amount),
-            "avg_amount": float(r.avg_amount),
-            "transaction_count": r.count,
-            "lgus_count": r.lgus_count
-        }
-        for r in results
-    ]
+async def get_yearly_trends(db: AsyncSession = Depends(get_async_db)):
+    return aggregates.format_yearly_trends(await aggregates.yearly_rollups(db))
 
 
 @router.get("/distribution/amount-ranges")
-def get_amount_distribution(db: Session = Depends(get_db)):
-    ranges = [
-        (0, 100000, "0-100K"),
-        (100000, 500000, "100K-500K"),
-        (500000, 1000000, "500K-1M"),
-        (1000000, 5000000, "1M-5M"),
-        (5000000, 10000000, "5M-10M"),
-        (10000000, float('inf'), "10M+")
-    ]
-
-    results = []
-    for min_val, max_val, label in ranges:
-        query = db.query(func.count(models.UnliquidatedTransaction.id)).filter(
-            models.UnliquidatedTransaction.amount >= min_val
-        )
-        if max_val != float('inf'):
-            query = query.filter(models.UnliquidatedTransaction.amount < max_val)
-
-        count = query.scalar()
-        results.append({
-            "range": label,
-            "min": min_val,
-            "max": max_val if max_val != float('inf') else None,
-            "count": count
-        })
-
-    return results
+async def get_amount_distribution(
+    edges: Optional[str] = Query(default=None, description="Comma-separated bucket lower bounds"),
+    scale: str = Query(default="fixed", pattern="^(fixed|log)$"),
+    buckets: int = Query(default=6, ge=2, le=50),
+    group_by: Optional[str] = Query(default=None, pattern="^(year|province)$"),
+    year: Optional[int] = None,
+    province: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if edges:
+        try:
+            bucket_edges = [float(edge) for edge in edges.split(",")]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="edges must be comma-separated numbers")
+        if not all(math.isfinite(edge) for edge in bucket_edges):
+            raise HTTPException(status_code=400, detail="edges must be finite numbers")
+        if len(bucket_edges) < 2:
+            raise HTTPException(status_code=400, detail="edges must give at least two bounds")
+        if any(lower >= upper for lower, upper in zip(bucket_edges, bucket_edges[1:])):
+            raise HTTPException(status_code=400, detail="edges must be strictly increasing")
+    elif scale == "log":
+        bucket_edges = await histogram.log_scale_edges(db, buckets)
+    else:
+        bucket_edges = histogram.DEFAULT_EDGES
+
+    return await histogram.amount_histogram(
+        db,
+        bucket_edges,
+        group_by=group_by,
+        year=year,
+        province=province
+    )
 
 
 @router.get("/heatmap/province-year")
-def get_province_year_heatmap(db: Session = Depends(get_db)):
-    results = db.query(
-        models.LocalGovernment.province,
-        models.UnliquidatedTransaction.year,
-        func.sum(models.UnliquidatedTransaction.amount).label("total_amount")
-    ).join(
-        models.UnliquidatedTransaction
-    ).group_by(
-        models.LocalGovernment.province,
-        models.UnliquidatedTransaction.year
-    ).all()
-
-    return [
-        {
-            "province": r.province,
-            "year": r.year,
-            "total_amount": float(r.total_amount)
-        }
-        for r in results
-    ]
+async def get_province_year_heatmap(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    cells = await aggregates.province_year_heatmap(db)
+    response.headers["Vary"] = "Accept"
+
+    fmt = negotiation.negotiate(request)
+    if fmt == "columnar":
+        return negotiation.columnar_json_response(negotiation.heatmap_matrix(cells), response.headers.items())
+    if fmt == "arrow":
+        return negotiation.arrow_response(
+            negotiation.heatmap_arrow(negotiation.heatmap_matrix(cells)), response.headers.items()
+        )
+    return cells
+
+
+@router.get("/dashboard")
+async def get_dashboard(
+    top_lgus_limit: int = Query(default=10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if db.bind.dialect.name == "postgresql":
+        # One snapshot for every panel
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    # asyncpg cannot multiplex statements on one connection, so the panels run
+    # back to back inside the same transaction; all but the histogram read rollups
+    rollups = await aggregates.yearly_rollups(db)
+    stats = await aggregates.overall_stats(db, rollups)
+
+    return {
+        "stats": stats,
+        "yearly_trends": aggregates.format_yearly_trends(rollups),
+        "province_totals": await aggregates.province_totals(db),
+        "top_lgus": await aggregates.top_lgus(db, top_lgus_limit),
+        "amount_distribution": await histogram.amount_histogram(db, histogram.DEFAULT_EDGES),
+        "province_year_heatmap": await aggregates.province_year_heatmap(db),
+    }
+
+
+@router.get("/anomalies", response_model=List[schemas.LGURiskScore])
+async def get_anomalies(
+    response: Response,
+    sort: str = Query(default="risk_score", pattern="^(" + "|".join(RISK_SORT_COLUMNS) + ")$"),
+    order: str = Query(default="desc", pattern="^(asc|desc)$"),
+    year: Optional[int] = None,
+    province: Optional[str] = None,
+    min_score: Optional[float] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    include_total: Optional[str] = Query(default=None, pattern=pagination.TOTAL_COUNT_MODES),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Precomputed LGU-year risk scores (see app.risk_scores), ranked in one indexed read."""
+    score = models.LGURiskScore
+    stmt = select(score).join(models.LocalGovernment, models.LocalGovernment.id == score.lgu_id).options(
+        contains_eager(score.lgu)
+    )
+    if year is not None:
+        stmt = stmt.where(score.year == year)
+    if province:
+        stmt = stmt.where(score.province == province)
+    if min_score is not None:
+        stmt = stmt.where(score.risk_score >= min_score)
+
+    return await pagination.keyset_paginate(
+        db,
+        stmt,
+        response,
+        sort_column=RISK_SORT_COLUMNS[sort],
+        id_column=score.id,
+        limit=limit,
+        cursor=cursor,
+        descending=order == "desc",
+        include_total=include_total
+    )
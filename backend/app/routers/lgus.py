@@ -1,68 +1,173 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from typing import List, Optional
 from decimal import Decimal
-from .. import models, schemas
-from ..database import get_db
+from .. import lgu_search, models, pagination, schemas
+from ..database import get_async_db
+from ..instrumentation import InstrumentedRoute
 
-router = APIRouter(prefix="/lgus", tags=["local-governments"])
+router = APIRouter(prefix="/lgus", tags=["local-governments"], route_class=InstrumentedRoute)
+
+LGU_SORT_COLUMNS = {
+    "id": models.LocalGovernment.id,
+    "name": models.LocalGovernment.name,
+}
 
 
 @router.get("/", response_model=List[schemas.LocalGovernment])
-def get_lgus(
+async def get_lgus(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: str = Query(default="name", pattern="^(id|name)$"),
+    include_total: Optional[str] = Query(default=None, pattern=pagination.TOTAL_COUNT_MODES),
     province: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(models.LocalGovernment)
+    stmt = select(models.LocalGovernment)
     if province:
-        query = query.filter(models.LocalGovernment.province == province)
-    lgus = query.offset(skip).limit(limit).all()
+        stmt = stmt.where(models.LocalGovernment.province == province)
+    lgus = await pagination.keyset_paginate(
+        db,
+        stmt,
+        response,
+        sort_column=LGU_SORT_COLUMNS[sort],
+        id_column=models.LocalGovernment.id,
+        limit=limit,
+        cursor=cursor,
+        skip=skip,
+        include_total=include_total
+    )
     return lgus
 
 
 @router.get("/provinces", response_model=List[str])
-def get_provinces(db: Session = Depends(get_db)):
-    provinces = db.query(models.LocalGovernment.province).distinct().filter(
-        models.LocalGovernment.province.isnot(None)
-    ).all()
-    return [p[0] for p in provinces if p[0]]
+async def get_provinces(db: AsyncSession = Depends(get_async_db)):
+    provinces = await db.scalars(
+        select(models.LocalGovernment.province).distinct().where(
+            models.LocalGovernment.province.isnot(None)
+        )
+    )
+    return [p for p in provinces if p]
+
+
+LGU_DETAIL_INCLUDES = {"raw_text", "findings_text", "context"}
+
+
+def _parse_include(include: Optional[str]) -> set:
+    fields = {field.strip() for field in include.split(",") if field.strip()} if include else set()
+    unknown = fields - LGU_DETAIL_INCLUDES
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include fields: {', '.join(sorted(unknown))}"
+        )
+    return fields
 
 
 @router.get("/{lgu_id}", response_model=schemas.LGUDetailResponse)
-def get_lgu_detail(lgu_id: int, db: Session = Depends(get_db)):
-    lgu = db.query(models.LocalGovernment).filter(models.LocalGovernment.id == lgu_id).first()
+async def get_lgu_detail(
+    lgu_id: int,
+    include: Optional[str] = Query(
+        default=None,
+        description="Comma-separated heavy fields to return: raw_text, findings_text, context"
+    ),
+    transactions_limit: int = Query(default=100, ge=1, le=1000),
+    transactions_cursor: Optional[str] = None,
+    reports_limit: int = Query(default=20, ge=1, le=200),
+    reports_cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    fields = _parse_include(include)
+
+    lgu = await db.get(models.LocalGovernment, lgu_id)
     if lgu is None:
         raise HTTPException(status_code=404, detail="LGU not found")
 
-    transactions = db.query(models.UnliquidatedTransaction).filter(
-        models.UnliquidatedTransaction.lgu_id == lgu_id
-    ).all()
+    txn = models.UnliquidatedTransaction
+    by_year = (await db.execute(
+        select(
+            txn.year,
+            func.sum(txn.amount).label("total_amount"),
+            func.count(txn.id).label("transaction_count")
+        ).where(txn.lgu_id == lgu_id).group_by(txn.year).order_by(txn.year)
+    )).all()
 
-    reports = db.query(models.AuditReport).filter(
-        models.AuditReport.lgu_id == lgu_id
-    ).all()
+    report_count = await db.scalar(
+        select(func.count(models.AuditReport.id)).where(models.AuditReport.lgu_id == lgu_id)
+    )
 
-    total_unliquidated = sum(t.amount for t in transactions)
-    years_with_data = sorted(list(set(t.year for t in transactions)))
+    transaction_columns = [
+        txn.id, txn.lgu_id, txn.report_id, txn.year, txn.amount, txn.created_at, txn.updated_at
+    ]
+    if "context" in fields:
+        transaction_columns += [txn.context_pre, txn.context_post]
+
+    transactions, transactions_next_cursor = await pagination.fetch_keyset_page(
+        db,
+        select(*transaction_columns).where(txn.lgu_id == lgu_id),
+        sort_column=txn.year,
+        id_column=txn.id,
+        limit=transactions_limit,
+        cursor=transactions_cursor,
+        scalars=False
+    )
+
+    report = models.AuditReport
+    report_columns = [
+        report.id, report.lgu_id, report.year, report.report_type, report.file_path,
+        report.created_at, report.updated_at
+    ]
+    report_columns += [getattr(report, field) for field in ("raw_text", "findings_text") if field in fields]
+
+    reports, reports_next_cursor = await pagination.fetch_keyset_page(
+        db,
+        select(*report_columns).where(report.lgu_id == lgu_id),
+        sort_column=report.year,
+        id_column=report.id,
+        limit=reports_limit,
+        cursor=reports_cursor,
+        descending=True,
+        scalars=False
+    )
 
     return schemas.LGUDetailResponse(
         lgu=lgu,
-        total_unliquidated=total_unliquidated,
-        years_with_data=years_with_data,
-        transactions=transactions,
-        reports=reports
+        total_unliquidated=sum((r.total_amount for r in by_year), Decimal(0)),
+        years_with_data=[r.year for r in by_year],
+        by_year=[schemas.LGUYearTotal.model_validate(r._mapping) for r in by_year],
+        transaction_count=sum(r.transaction_count for r in by_year),
+        report_count=report_count,
+        transactions=[schemas.UnliquidatedTransaction.model_validate(t._mapping) for t in transactions],
+        transactions_next_cursor=transactions_next_cursor,
+        reports=[schemas.AuditReport.model_validate(r._mapping) for r in reports],
+        reports_next_cursor=reports_next_cursor
     )
 
 
-@router.get("/search/by-name")
-def search_lgus_by_name(
+@router.get("/search/by-name", response_model=List[schemas.LocalGovernment])
+async def search_lgus_by_name(
     name: str = Query(..., min_length=2),
-    db: Session = Depends(get_db)
+    limit: int = Query(default=50, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    lgus = db.query(models.LocalGovernment).filter(
-        models.LocalGovernment.name.ilike(f"%{name}%")
-    ).limit(50).all()
-    return lgus
+    hits = await lgu_search.search_lgus(db, name, limit)
+    if not hits:
+        return []
+
+    lgus = await db.scalars(
+        select(models.LocalGovernment).where(models.LocalGovernment.id.in_([h.id for h in hits]))
+    )
+    by_id = {lgu.id: lgu for lgu in lgus}
+    return [by_id[h.id] for h in hits if h.id in by_id]
+
+
+@router.get("/search/autocomplete", response_model=List[schemas.LGUSearchHit])
+async def autocomplete_lgus(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(default=10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await lgu_search.search_lgus(db, q, limit)
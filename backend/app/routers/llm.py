@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List, Optional
 from pydantic import BaseModel
-from .. import models, schemas
-from ..database import get_db
-from ..config import settings
+from .. import llm_cache, llm_jobs, llm_service, models, pagination, schemas
+from ..data_version import data_version_tracker
+from ..database import AsyncSessionLocal, get_async_db
+from ..instrumentation import InstrumentedRoute
+from ..llm_providers import LLMProviderError, provider_pool
 
-router = APIRouter(prefix="/llm", tags=["llm-integration"])
+router = APIRouter(prefix="/llm", tags=["llm-integration"], route_class=InstrumentedRoute)
 
 
 class LLMRequest(BaseModel):
@@ -17,98 +22,238 @@ class LLMRequest(BaseModel):
     model: str = "claude-sonnet-4"
 
 
+LLM_CACHE_HEADER = "X-LLM-Cache"
+
+
+async def _analysis_key(request: LLMRequest) -> str:
+    return llm_cache.analysis_key(
+        request.model, request.analysis_type, request.report_id, request.lgu_id,
+        request.custom_prompt, await data_version_tracker.current()
+    )
+
+
+async def _request_prompt(db: AsyncSession, request: LLMRequest) -> str:
+    try:
+        return await llm_service.request_prompt(
+            db, request.report_id, request.lgu_id, request.analysis_type, request.model, request.custom_prompt
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.post("/analyze", response_model=schemas.LLMAnalysis)
-async def analyze_with_llm(request: LLMRequest, db: Session = Depends(get_db)):
+async def analyze_with_llm(
+    request: LLMRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not request.report_id and not request.lgu_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Either report_id or lgu_id must be provided"
+        )
+
+    if not provider_pool.configured():
+        raise HTTPException(
+            status_code=503,
+            detail="LLM API keys not configured"
+        )
+
+    key = await _analysis_key(request)
+    cached = await llm_cache.cached_analysis(db, key)
+    if cached:
+        response.headers[LLM_CACHE_HEADER] = "hit"
+        return cached
+
+    prompt = await _request_prompt(db, request)
+
+    # Identical requests arriving while this one runs wait on the same call
+    response.headers[LLM_CACHE_HEADER] = "miss"
+    try:
+        return await llm_cache.analysis_flights.do(key, lambda: llm_service.run_analysis(
+            request.report_id, request.lgu_id, request.analysis_type, request.model, prompt, key
+        ))
+    except LLMProviderError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def _stream_analysis(request: LLMRequest, prompt: str, key: str):
+    # A client disconnect cancels this generator, which closes the upstream stream
+    parts = []
+    try:
+        async for token in provider_pool.stream(request.model, request.analysis_type, prompt):
+            parts.append(token)
+            yield _sse("token", {"text": token})
+    except LLMProviderError as e:
+        yield _sse("error", {"detail": str(e)})
+        return
+
+    async with AsyncSessionLocal() as db:
+        analysis = await llm_service.save_analysis(
+            db, request.report_id, request.lgu_id, request.analysis_type,
+            request.model, prompt, key, "".join(parts)
+        )
+    yield _sse("done", analysis.model_dump(mode="json"))
+
+
+async def _replay_analysis(analysis: schemas.LLMAnalysis):
+    yield _sse("token", {"text": analysis.response})
+    yield _sse("done", analysis.model_dump(mode="json"))
+
+
+@router.post("/analyze/stream")
+async def analyze_with_llm_stream(request: LLMRequest, db: AsyncSession = Depends(get_async_db)):
+    """Server-sent events: "token" events as text arrives, then "done" with the
+    stored analysis, or "error" if the provider fails midway."""
     if not request.report_id and not request.lgu_id:
         raise HTTPException(
             status_code=400,
             detail="Either report_id or lgu_id must be provided"
         )
 
-    if not settings.anthropic_api_key and not settings.openai_api_key:
+    if not provider_pool.configured():
         raise HTTPException(
             status_code=503,
             detail="LLM API keys not configured"
         )
 
-    context_text = ""
-
-    if request.report_id:
-        report = db.query(models.AuditReport).filter(
-            models.AuditReport.id == request.report_id
-        ).first()
-        if not report:
-            raise HTTPException(status_code=404, detail="Report not found")
-        context_text = report.findings_text or report.raw_text or ""
-
-    elif request.lgu_id:
-        lgu = db.query(models.LocalGovernment).filter(
-            models.LocalGovernment.id == request.lgu_id
-        ).first()
-        if not lgu:
-            raise HTTPException(status_code=404, detail="LGU not found")
-
-        transactions = db.query(models.UnliquidatedTransaction).filter(
-            models.UnliquidatedTransaction.lgu_id == request.lgu_id
-        ).all()
-
-        context_text = f"LGU: {lgu.name}, Province: {lgu.province}\n\n"
-        context_text += f"Total unliquidated transactions: {len(transactions)}\n"
-        context_text += f"Total amount: {sum(t.amount for t in transactions)}\n\n"
-
-    prompt = request.custom_prompt or f"Analyze the following audit data for {request.analysis_type}:\n\n{context_text}"
-
-    response_text = f"[LLM Analysis Placeholder - Integration ready for {request.model}]\n\n"
-    response_text += f"Analysis Type: {request.analysis_type}\n"
-    response_text += f"Context length: {len(context_text)} characters\n\n"
-    response_text += "To enable actual LLM analysis, configure API keys in .env file."
-
-    analysis = models.LLMAnalysis(
-        report_id=request.report_id,
-        lgu_id=request.lgu_id,
-        analysis_type=request.analysis_type,
-        prompt=prompt,
-        response=response_text,
-        model_name=request.model
+    key = await _analysis_key(request)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    cached = await llm_cache.cached_analysis(db, key)
+    if cached:
+        return StreamingResponse(
+            _replay_analysis(schemas.LLMAnalysis.model_validate(cached)),
+            media_type="text/event-stream",
+            headers={**headers, LLM_CACHE_HEADER: "hit"}
+        )
+
+    prompt = await _request_prompt(db, request)
+
+    return StreamingResponse(
+        _stream_analysis(request, prompt, key),
+        media_type="text/event-stream",
+        headers={**headers, LLM_CACHE_HEADER: "miss"}
     )
 
-    db.add(analysis)
-    db.commit()
-    db.refresh(analysis)
 
-    return analysis
+@router.post("/jobs", response_model=schemas.LLMJob, status_code=202)
+async def create_llm_job(request: schemas.LLMJobCreate, db: AsyncSession = Depends(get_async_db)):
+    lgu_ids = list(dict.fromkeys(request.lgu_ids))
+    if request.province:
+        province_lgu_ids = await db.scalars(
+            select(models.LocalGovernment.id)
+            .where(models.LocalGovernment.province == request.province)
+            .order_by(models.LocalGovernment.id)
+        )
+        lgu_ids = list(dict.fromkeys(lgu_ids + list(province_lgu_ids)))
+    report_ids = list(dict.fromkeys(request.report_ids))
+
+    if not lgu_ids and not report_ids:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide lgu_ids, report_ids or a province with LGUs"
+        )
+
+    # Checked up front: PostgreSQL's foreign keys would otherwise reject the items with a 500
+    missing = await llm_jobs.missing_targets(db, lgu_ids, report_ids)
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": "Unknown LGUs or reports", **missing}
+        )
+
+    if not provider_pool.configured():
+        raise HTTPException(
+            status_code=503,
+            detail="LLM API keys not configured"
+        )
+
+    job = await llm_jobs.create_job(
+        db, request.analysis_type, request.model, request.custom_prompt, lgu_ids, report_ids
+    )
+    llm_jobs.job_runner.submit(job.id)
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.LLMJob)
+async def get_llm_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(models.LLMJob, job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
+
+
+@router.get("/jobs/{job_id}/items", response_model=List[schemas.LLMJobItem])
+async def get_llm_job_items(
+    job_id: int,
+    response: Response,
+    status: Optional[str] = Query(default=None, pattern="^(pending|completed|failed)$"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    stmt = select(models.LLMJobItem).where(models.LLMJobItem.job_id == job_id)
+    if status:
+        stmt = stmt.where(models.LLMJobItem.status == status)
+
+    return await pagination.keyset_paginate(
+        db,
+        stmt,
+        response,
+        sort_column=models.LLMJobItem.id,
+        id_column=models.LLMJobItem.id,
+        limit=limit,
+        cursor=cursor
+    )
 
 
 @router.get("/analyses", response_model=List[schemas.LLMAnalysis])
-def get_llm_analyses(
+async def get_llm_analyses(
+    response: Response,
     lgu_id: Optional[int] = None,
     report_id: Optional[int] = None,
     analysis_type: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_total: Optional[str] = Query(default=None, pattern=pagination.TOTAL_COUNT_MODES),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(models.LLMAnalysis)
+    stmt = select(models.LLMAnalysis)
 
     if lgu_id:
-        query = query.filter(models.LLMAnalysis.lgu_id == lgu_id)
+        stmt = stmt.where(models.LLMAnalysis.lgu_id == lgu_id)
     if report_id:
-        query = query.filter(models.LLMAnalysis.report_id == report_id)
+        stmt = stmt.where(models.LLMAnalysis.report_id == report_id)
     if analysis_type:
-        query = query.filter(models.LLMAnalysis.analysis_type == analysis_type)
+        stmt = stmt.where(models.LLMAnalysis.analysis_type == analysis_type)
 
-    analyses = query.order_by(
-        models.LLMAnalysis.created_at.desc()
-    ).offset(skip).limit(limit).all()
+    analyses = await pagination.keyset_paginate(
+        db,
+        stmt,
+        response,
+        sort_column=models.LLMAnalysis.created_at,
+        id_column=models.LLMAnalysis.id,
+        limit=limit,
+        cursor=cursor,
+        descending=True,
+        skip=skip,
+        include_total=include_total
+    )
 
     return analyses
 
 
 @router.get("/analyses/{analysis_id}", response_model=schemas.LLMAnalysis)
-def get_llm_analysis(analysis_id: int, db: Session = Depends(get_db)):
-    analysis = db.query(models.LLMAnalysis).filter(
-        models.LLMAnalysis.id == analysis_id
-    ).first()
+async def get_llm_analysis(analysis_id: int, db: AsyncSession = Depends(get_async_db)):
+    analysis = await db.get(models.LLMAnalysis, analysis_id)
 
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
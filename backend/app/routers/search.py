@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from .. import schemas, text_search
+from ..database import get_async_db
+from ..instrumentation import InstrumentedRoute
+from ..pagination import NEXT_CURSOR_HEADER
+
+router = APIRouter(prefix="/search", tags=["search"], route_class=InstrumentedRoute)
+
+
+@router.get("/", response_model=schemas.TextSearchResponse)
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=2, description='Words, "quoted phrases" and -excluded words'),
+    scope: str = Query(default="reports", pattern="^(reports|transactions)$"),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    year: Optional[int] = None,
+    province: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    result = await text_search.search_text(db, scope, q, limit, cursor=cursor, year=year, province=province)
+    if result.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = result.next_cursor
+
+    return schemas.TextSearchResponse(
+        query=q,
+        total=result.total,
+        hits=result.hits,
+        facets=result.facets,
+        next_cursor=result.next_cursor
+    )
@@ -1,41 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional
+from .. import models, schemas, topic_analytics
+from ..database import get_async_db
+from ..instrumentation import InstrumentedRoute
 
-router = APIRouter(prefix="/topics", tags=["topics"])
+router = APIRouter(prefix="/topics", tags=["topics"], route_class=InstrumentedRoute)
 
 
 @router.get("/", response_model=List[schemas.AuditTopic])
-def get_all_topics(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    topics = db.query(models.AuditTopic).offset(skip).limit(limit).all()
-    return topics
+async def get_all_topics(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    topics = await db.scalars(select(models.AuditTopic).offset(skip).limit(limit))
+    return topics.all()
+
+
+@router.get("/overview", response_model=List[schemas.TopicAnalysisResponse])
+async def get_topics_overview(db: AsyncSession = Depends(get_async_db)):
+    return await topic_analytics.topic_overview(db)
+
+
+@router.get("/trends/by-year", response_model=List[schemas.TopicTrendPoint])
+async def get_topic_trends_by_year(
+    topic_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await topic_analytics.topic_trends(db, "year", topic_id=topic_id)
+
+
+@router.get("/trends/by-province", response_model=List[schemas.TopicTrendPoint])
+async def get_topic_trends_by_province(
+    topic_id: Optional[int] = None,
+    year: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await topic_analytics.topic_trends(db, "province", topic_id=topic_id, year=year)
+
+
+@router.get("/correlations", response_model=schemas.TopicMatrixResponse)
+async def get_topic_correlations(
+    decimals: int = Query(default=4, ge=1, le=8),
+    db: AsyncSession = Depends(get_async_db)
+):
+    matrix = await topic_analytics.topic_matrix(db)
+    return schemas.TopicMatrixResponse(
+        topic_ids=matrix.topic_ids,
+        topic_numbers=matrix.topic_numbers,
+        reports=matrix.reports,
+        cooccurrence_threshold=topic_analytics.COOCCURRENCE_THRESHOLD,
+        correlation=matrix.correlation.round(decimals).tolist(),
+        cooccurrence=matrix.cooccurrence.tolist()
+    )
 
 
 @router.get("/{topic_id}", response_model=schemas.AuditTopic)
-def get_topic(topic_id: int, db: Session = Depends(get_db)):
-    topic = db.query(models.AuditTopic).filter(models.AuditTopic.id == topic_id).first()
+async def get_topic(topic_id: int, db: AsyncSession = Depends(get_async_db)):
+    topic = await db.get(models.AuditTopic, topic_id)
     if topic is None:
         raise HTTPException(status_code=404, detail="Topic not found")
     return topic
 
 
 @router.get("/{topic_id}/analysis", response_model=schemas.TopicAnalysisResponse)
-def get_topic_analysis(topic_id: int, db: Session = Depends(get_db)):
-    topic = db.query(models.AuditTopic).filter(models.AuditTopic.id == topic_id).first()
+async def get_topic_analysis(topic_id: int, db: AsyncSession = Depends(get_async_db)):
+    topic = await db.get(models.AuditTopic, topic_id)
     if topic is None:
         raise HTTPException(status_code=404, detail="Topic not found")
 
-    report_topics = db.query(models.ReportTopic).filter(
-        models.ReportTopic.topic_id == topic_id
-    ).all()
-
-    report_count = len(report_topics)
-    avg_proportion = None
-    if report_count > 0:
-        total_proportion = sum(rt.topic_proportion or 0 for rt in report_topics)
-        avg_proportion = total_proportion / report_count
+    report_count, avg_proportion = await topic_analytics.topic_summary(db, topic_id)
 
     return schemas.TopicAnalysisResponse(
         topic=topic,
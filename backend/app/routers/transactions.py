@@ -1,126 +1,148 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from sqlalchemy import select
 from typing import List, Optional
-from .. import models, schemas
-from ..database import get_db
+from .. import aggregates, export, models, negotiation, pagination, schemas
+from ..database import get_async_db
+from ..instrumentation import InstrumentedRoute
 
-router = APIRouter(prefix="/transactions", tags=["transactions"])
+router = APIRouter(prefix="/transactions", tags=["transactions"], route_class=InstrumentedRoute)
 
+TRANSACTION_SORT_COLUMNS = {
+    "id": models.UnliquidatedTransaction.id,
+    "year": models.UnliquidatedTransaction.year,
+    "amount": models.UnliquidatedTransaction.amount,
+}
 
-@router.get("/", response_model=List[schemas.UnliquidatedTransactionWithLGU])
-def get_transactions(
-    skip: int = 0,
-    limit: int = 100,
+
+def _filter_transactions(
+    stmt,
     year: Optional[int] = None,
     province: Optional[str] = None,
     min_amount: Optional[float] = None,
-    max_amount: Optional[float] = None,
-    db: Session = Depends(get_db)
+    max_amount: Optional[float] = None
 ):
-    query = db.query(models.UnliquidatedTransaction).join(models.LocalGovernment)
-
     if year:
-        query = query.filter(models.UnliquidatedTransaction.year == year)
+        stmt = stmt.where(models.UnliquidatedTransaction.year == year)
     if province:
-        query = query.filter(models.LocalGovernment.province == province)
+        stmt = stmt.where(models.UnliquidatedTransaction.province == province)
     if min_amount is not None:
-        query = query.filter(models.UnliquidatedTransaction.amount >= min_amount)
+        stmt = stmt.where(models.UnliquidatedTransaction.amount >= min_amount)
     if max_amount is not None:
-        query = query.filter(models.UnliquidatedTransaction.amount <= max_amount)
+        stmt = stmt.where(models.UnliquidatedTransaction.amount <= max_amount)
+    return stmt
+
 
-    transactions = query.offset(skip).limit(limit).all()
+@router.get("/", response_model=List[schemas.UnliquidatedTransactionWithLGU])
+async def get_transactions(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: str = Query(default="id", pattern="^(id|year|amount)$"),
+    order: str = Query(default="asc", pattern="^(asc|desc)$"),
+    include_total: Optional[str] = Query(default=None, pattern=pagination.TOTAL_COUNT_MODES),
+    year: Optional[int] = None,
+    province: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    stmt = select(models.UnliquidatedTransaction).join(models.LocalGovernment).options(
+        contains_eager(models.UnliquidatedTransaction.lgu)
+    )
+    stmt = _filter_transactions(stmt, year, province, min_amount, max_amount)
+
+    transactions = await pagination.keyset_paginate(
+        db,
+        stmt,
+        response,
+        sort_column=TRANSACTION_SORT_COLUMNS[sort],
+        id_column=models.UnliquidatedTransaction.id,
+        limit=limit,
+        cursor=cursor,
+        descending=order == "desc",
+        skip=skip,
+        include_total=include_total
+    )
+    response.headers["Vary"] = "Accept"
+
+    fmt = negotiation.negotiate(request)
+    if fmt == "columnar":
+        return negotiation.columnar_json_response(
+            negotiation.transactions_columnar(transactions), response.headers.items()
+        )
+    if fmt == "arrow":
+        return negotiation.arrow_response(
+            negotiation.transactions_arrow(transactions), response.headers.items()
+        )
     return transactions
 
 
+@router.get("/export")
+async def export_transactions(
+    format: str = Query(default="csv", pattern="^(csv|ndjson|parquet)$"),
+    year: Optional[int] = None,
+    province: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None
+):
+    stmt = select(
+        models.UnliquidatedTransaction.id,
+        models.UnliquidatedTransaction.lgu_id,
+        models.LocalGovernment.name.label("lgu_name"),
+        models.UnliquidatedTransaction.province,
+        models.UnliquidatedTransaction.year,
+        models.UnliquidatedTransaction.amount
+    ).join(models.LocalGovernment).order_by(models.UnliquidatedTransaction.id)
+    stmt = _filter_transactions(stmt, year, province, min_amount, max_amount)
+
+    return StreamingResponse(
+        export.stream_export(stmt, format),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'}
+    )
+
+
 @router.get("/years", response_model=List[int])
-def get_available_years(db: Session = Depends(get_db)):
-    years = db.query(models.UnliquidatedTransaction.year).distinct().order_by(
-        models.UnliquidatedTransaction.year
-    ).all()
-    return [y[0] for y in years]
+async def get_available_years(db: AsyncSession = Depends(get_async_db)):
+    years = await db.scalars(
+        select(models.UnliquidatedTransaction.year).distinct().order_by(
+            models.UnliquidatedTransaction.year
+        )
+    )
+    return years.all()
 
 
 @router.get("/aggregate/by-year")
-def aggregate_by_year(db: Session = Depends(get_db)):
-    results = db.query(
-        models.UnliquidatedTransaction.year,
-        func.sum(models.UnliquidatedTransaction.amount).label("total_amount"),
-        func.count(models.UnliquidatedTransaction.id).label("count")
-    ).group_by(models.UnliquidatedTransaction.year).order_by(
-        models.UnliquidatedTransaction.year
-    ).all()
+async def aggregate_by_year(db: AsyncSession = Depends(get_async_db)):
+    results = await aggregates.yearly_rollups(db)
 
     return [
         {
             "year": r.year,
             "total_amount": float(r.total_amount),
-            "count": r.count
+            "count": r.transaction_count
         }
         for r in results
     ]
 
 
 @router.get("/aggregate/by-province")
-def aggregate_by_province(
+async def aggregate_by_province(
     year: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(
-        models.LocalGovernment.province,
-        func.sum(models.UnliquidatedTransaction.amount).label("total_amount"),
-        func.count(models.UnliquidatedTransaction.id).label("count")
-    ).join(models.UnliquidatedTransaction)
-
-    if year:
-        query = query.filter(models.UnliquidatedTransaction.year == year)
-
-    results = query.group_by(models.LocalGovernment.province).order_by(
-        func.sum(models.UnliquidatedTransaction.amount).desc()
-    ).all()
-
-    return [
-        {
-            "province": r.province,
-            "total_amount": float(r.total_amount),
-            "count": r.count
-        }
-        for r in results
-    ]
+    return await aggregates.province_totals(db, year)
 
 
 @router.get("/top-lgus")
-def get_top_lgus_by_amount(
+async def get_top_lgus_by_amount(
     limit: int = Query(default=20, le=100),
     year: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(
-        models.LocalGovernment.id,
-        models.LocalGovernment.name,
-        models.LocalGovernment.province,
-        func.sum(models.UnliquidatedTransaction.amount).label("total_amount"),
-        func.count(models.UnliquidatedTransaction.id).label("transaction_count")
-    ).join(models.UnliquidatedTransaction)
-
-    if year:
-        query = query.filter(models.UnliquidatedTransaction.year == year)
-
-    results = query.group_by(
-        models.LocalGovernment.id,
-        models.LocalGovernment.name,
-        models.LocalGovernment.province
-    ).order_by(
-        func.sum(models.UnliquidatedTransaction.amount).desc()
-    ).limit(limit).all()
-
-    return [
-        {
-            "lgu_id": r.id,
-            "lgu_name": r.name,
-            "province": r.province,
-            "total_amount": float(r.total_amount),
-            "transaction_count": r.transaction_count
-        }
-        for r in results
-    ]
+    return await aggregates.top_lgus(db, limit, year)
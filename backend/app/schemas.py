@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional, List
+from typing import Dict, Optional, List, Union
 from datetime import datetime
 from decimal import Decimal
 
@@ -42,6 +42,15 @@ class LocalGovernment(LocalGovernmentBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class LGUSearchHit(BaseModel):
+    id: int
+    name: str
+    province: Optional[str] = None
+    score: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class UnliquidatedTransactionBase(BaseModel):
     year: int
     amount: Decimal
@@ -132,6 +141,44 @@ class LLMAnalysis(LLMAnalysisBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class LLMJobCreate(BaseModel):
+    analysis_type: str
+    model: str = "claude-sonnet-4"
+    custom_prompt: Optional[str] = None
+    lgu_ids: List[int] = []
+    report_ids: List[int] = []
+    province: Optional[str] = None
+
+
+class LLMJob(BaseModel):
+    id: int
+    analysis_type: str
+    model_name: str
+    status: str
+    total_items: int
+    completed_items: int
+    failed_items: int
+    progress: float
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class LLMJobItem(BaseModel):
+    id: int
+    job_id: int
+    report_id: Optional[int] = None
+    lgu_id: Optional[int] = None
+    status: str
+    analysis_id: Optional[int] = None
+    error: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class StatsResponse(BaseModel):
     total_lgus: int
     total_reports: int
@@ -140,15 +187,92 @@ class StatsResponse(BaseModel):
     provinces_count: int
 
 
+class LGUYearTotal(BaseModel):
+    year: int
+    total_amount: Decimal
+    transaction_count: int
+
+
+class LGURiskScore(BaseModel):
+    id: int
+    lgu_id: int
+    province: Optional[str] = None
+    year: int
+    total_amount: Decimal
+    previous_year: Optional[int] = None
+    yoy_change: Optional[Decimal] = None
+    yoy_z: float
+    amount_z: float
+    peer_percentile: float
+    province_share: float
+    peer_count: int
+    risk_score: float
+    lgu: Optional[LocalGovernment] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class LGUDetailResponse(BaseModel):
     lgu: LocalGovernment
     total_unliquidated: Decimal
     years_with_data: List[int]
+    by_year: List[LGUYearTotal] = []
+    transaction_count: int = 0
+    report_count: int = 0
     transactions: List[UnliquidatedTransaction]
+    transactions_next_cursor: Optional[str] = None
     reports: List[AuditReport]
+    reports_next_cursor: Optional[str] = None
+
+
+class TextSearchHit(BaseModel):
+    kind: str
+    id: int
+    report_id: Optional[int] = None
+    lgu_id: Optional[int] = None
+    lgu_name: Optional[str] = None
+    province: Optional[str] = None
+    year: int
+    amount: Optional[Decimal] = None
+    score: float
+    snippet: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SearchFacet(BaseModel):
+    value: Optional[Union[int, str]] = None
+    count: int
+
+
+class TextSearchResponse(BaseModel):
+    query: str
+    total: int
+    hits: List[TextSearchHit]
+    facets: Dict[str, List[SearchFacet]]
+    next_cursor: Optional[str] = None
 
 
 class TopicAnalysisResponse(BaseModel):
     topic: AuditTopic
     report_count: int
     avg_proportion: Optional[Decimal] = None
+
+
+class TopicTrendPoint(BaseModel):
+    topic_id: int
+    topic_number: int
+    year: Optional[int] = None
+    province: Optional[str] = None
+    report_count: int
+    avg_proportion: float
+    share: Optional[float] = None
+
+
+class TopicMatrixResponse(BaseModel):
+    topic_ids: List[int]
+    topic_numbers: List[int]
+    reports: int
+    cooccurrence_threshold: float
+    correlation: List[List[float]]
+    cooccurrence: List[List[int]]
@@ -0,0 +1,311 @@
+import asyncio
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import Float, column, func, literal_column, null, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, pagination
+from .data_version import data_version_tracker
+
+MARK_START = "<mark>"
+MARK_END = "</mark>"
+SNIPPET_WORDS = 30
+HEADLINE_OPTIONS = (
+    f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=35, MinWords=15, "
+    "MaxFragments=2, FragmentDelimiter=\" … \""
+)
+# ts_rank_cd normalization 1: divide by 1 + log(document length)
+RANK_NORMALIZATION = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r"[^\W_]+")
+_QUERY_PART = re.compile(r'(-?)"([^"]*)"|(-?)(\S+)')
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can did do does doing down during each few for from further had has have having he her here hers
+him his how i if in into is it its itself just me more most my no nor not now of off on once only or other our
+out over own same she should so some such than that the their them then there these they this those through
+to too under until up very was we were what when where which while who whom why will with you your
+""".split())
+
+
+def stem(word: str) -> str:
+    """Plural folding, enough for "advances" to find "advance" without a stemmer dependency."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("xes", "ches", "shes", "sses", "zes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def terms(text: str) -> List[str]:
+    return [stem(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+@dataclass
+class ParsedQuery:
+    """websearch_to_tsquery's syntax minus OR: words, "quoted phrases" and -exclusions."""
+    required: Set[str] = field(default_factory=set)
+    bigrams: Set[str] = field(default_factory=set)
+    excluded: Set[str] = field(default_factory=set)
+
+    @classmethod
+    def parse(cls, query: str) -> "ParsedQuery":
+        parsed = cls()
+        for phrase_negated, phrase, word_negated, word in _QUERY_PART.findall(query):
+            words = terms(phrase if phrase else word)
+            if phrase_negated or word_negated:
+                parsed.excluded.update(words)
+                continue
+            parsed.required.update(words)
+            if phrase:
+                parsed.bigrams.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+        return parsed
+
+
+@dataclass
+class SearchResult:
+    hits: List[Dict]
+    total: int
+    facets: Dict[str, List[Dict]]
+    next_cursor: Optional[str]
+
+
+def highlight(text: str, stems: Set[str], words: int = SNIPPET_WORDS) -> str:
+    """The densest window of matching words, with matches wrapped like ts_headline does."""
+    tokens = list(_WORD.finditer(text))
+    if not tokens:
+        return ""
+    flags = np.array([stem(t.group().lower()) in stems for t in tokens], dtype=np.int32)
+    window = min(words, len(tokens))
+    sums = np.convolve(flags, np.ones(window, dtype=np.int32), mode="valid")
+    start = int(np.argmax(sums))
+    end = start + window
+
+    parts = []
+    cursor = tokens[start].start()
+    for token, flagged in zip(tokens[start:end], flags[start:end]):
+        if flagged:
+            parts.append(text[cursor:token.start()] + MARK_START + token.group() + MARK_END)
+            cursor = token.end()
+    parts.append(text[cursor:tokens[end - 1].end()])
+    snippet = " ".join("".join(parts).split())
+    return ("… " if start else "") + snippet + (" …" if end < len(tokens) else "")
+
+
+class TextIndex:
+    """In-process inverted index with BM25 ranking, for databases without full-text search.
+
+    Postings map each term (and each pair of adjacent terms, so quoted phrases can be
+    matched without storing positions) to NumPy arrays of document positions and
+    term frequencies.
+    """
+
+    def __init__(self, rows):
+        self.rows = [row._asdict() for row in rows]
+        self.ids = np.array([row["id"] for row in self.rows], dtype=np.int64)
+        self.years = np.array([row["year"] for row in self.rows], dtype=np.int64)
+        self.provinces = sorted({row["province"] for row in self.rows}, key=lambda p: (p is None, p or ""))
+        codes = {province: code for code, province in enumerate(self.provinces)}
+        self.province_codes = np.array([codes[row["province"]] for row in self.rows], dtype=np.int32)
+
+        postings: Dict[str, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+        lengths = []
+        for position, row in enumerate(self.rows):
+            document = terms(row.pop("text") or "")
+            lengths.append(len(document))
+            counts = Counter(document)
+            counts.update(f"{a} {b}" for a, b in zip(document, document[1:]))
+            for term, count in counts.items():
+                postings[term][0].append(position)
+                postings[term][1].append(count)
+
+        self.lengths = np.array(lengths, dtype=np.float64)
+        self.average_length = float(self.lengths.mean()) if len(lengths) else 0.0
+        self.postings = {
+            term: (np.array(positions, dtype=np.int32), np.array(counts, dtype=np.float64))
+            for term, (positions, counts) in postings.items()
+        }
+
+    def _bm25(self, positions: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        idf = np.log(1 + (len(self.ids) - len(positions) + 0.5) / (len(positions) + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[positions] / (self.average_length or 1))
+        return idf * counts * (BM25_K1 + 1) / (counts + norm)
+
+    def search(
+        self,
+        parsed: ParsedQuery,
+        limit: int,
+        after: Optional[Tuple[float, int]],
+        year: Optional[int],
+        province: Optional[str]
+    ):
+        size = len(self.ids)
+        # Like websearch_to_tsquery, exclusions alone match every document without them
+        # and a query with no terms at all (only stopwords) matches nothing
+        matched = np.full(size, bool(parsed.required or parsed.excluded))
+        scores = np.zeros(size, dtype=np.float64)
+
+        for term in parsed.required | parsed.bigrams:
+            positions, counts = self.postings.get(term, (np.zeros(0, dtype=np.int32), None))
+            present = np.zeros(size, dtype=bool)
+            present[positions] = True
+            matched &= present
+            if counts is not None and term in parsed.required:
+                scores[positions] += self._bm25(positions, counts)
+        for term in parsed.excluded:
+            if term in self.postings:
+                matched[self.postings[term][0]] = False
+
+        if year is not None:
+            matched &= self.years == year
+        if province is not None:
+            matched &= self.province_codes == (self.provinces.index(province) if province in self.provinces else -1)
+
+        candidates = np.flatnonzero(matched)
+        year_counts = Counter(self.years[candidates].tolist())
+        province_counts = np.bincount(self.province_codes[candidates], minlength=len(self.provinces))
+        facets = {
+            "year": [{"value": y, "count": c} for y, c in sorted(year_counts.items())],
+            "province": [
+                {"value": self.provinces[code], "count": int(count)}
+                for code, count in enumerate(province_counts) if count
+            ],
+        }
+
+        if after is not None:
+            score, row_id = after
+            page_scores = scores[candidates]
+            candidates = candidates[
+                (page_scores < score) | ((page_scores == score) & (self.ids[candidates] < row_id))
+            ]
+        order = np.lexsort((-self.ids[candidates], -scores[candidates]))[:limit + 1]
+        page = candidates[order]
+
+        return [(self.rows[p], float(scores[p])) for p in page], int(matched.sum()), facets
+
+
+_indexes: Dict[str, Tuple[int, TextIndex]] = {}
+_index_lock = asyncio.Lock()
+
+
+def _documents(kind: str):
+    """(id, report_id, lgu_id, lgu_name, province, year, amount) plus the searchable text."""
+    lgu = models.LocalGovernment
+    if kind == "reports":
+        report = models.AuditReport
+        return select(
+            report.id, report.id.label("report_id"), report.lgu_id, lgu.name.label("lgu_name"),
+            lgu.province, report.year, null().label("amount")
+        ).outerjoin(lgu, lgu.id == report.lgu_id), report, func.coalesce(report.raw_text, report.findings_text, "")
+
+    txn = models.UnliquidatedTransaction
+    return select(
+        txn.id, txn.report_id, txn.lgu_id, lgu.name.label("lgu_name"),
+        lgu.province, txn.year, txn.amount
+    ).outerjoin(lgu, lgu.id == txn.lgu_id), txn, (
+        func.coalesce(txn.context_pre, "") + " … " + func.coalesce(txn.context_post, "")
+    )
+
+
+async def _get_index(db: AsyncSession, kind: str) -> TextIndex:
+    version = await data_version_tracker.current()
+    if kind not in _indexes or _indexes[kind][0] != version:
+        async with _index_lock:
+            if kind not in _indexes or _indexes[kind][0] != version:
+                stmt, _, text = _documents(kind)
+                rows = (await db.execute(stmt.add_columns(text.label("text")))).all()
+                # Tokenizing a corpus is CPU-bound; keep it off the event loop
+                _indexes[kind] = (version, await asyncio.to_thread(TextIndex, rows))
+    return _indexes[kind][1]
+
+
+async def _search_in_process(db, kind, query, limit, after, year, province):
+    parsed = ParsedQuery.parse(query)
+    index = await _get_index(db, kind)
+    page, total, facets = index.search(parsed, limit, after, year, province)
+
+    _, table, text = _documents(kind)
+    ids = [row["id"] for row, _ in page[:limit]]
+    texts = dict((await db.execute(select(table.id, text).where(table.id.in_(ids)))).all()) if ids else {}
+    stems = parsed.required
+    hits = [
+        {**row, "score": score, "snippet": highlight(texts.get(row["id"], ""), stems)}
+        for row, score in page
+    ]
+    return hits, total, facets
+
+
+async def _search_postgresql(db, kind, query, limit, after, year, province):
+    stmt, table, text = _documents(kind)
+    config = literal_column(f"'{models.SEARCH_CONFIG}'::regconfig")
+    tsquery = func.websearch_to_tsquery(config, query)
+    vector = literal_column(f"{table.__tablename__}.search_vector")
+
+    # @@ on the generated column is answered from its GIN index
+    matches = stmt.add_columns(
+        func.ts_rank_cd(vector, tsquery, RANK_NORMALIZATION).label("score")
+    ).where(vector.op("@@")(tsquery))
+    if year is not None:
+        matches = matches.where(table.year == year)
+    if province is not None:
+        matches = matches.where(models.LocalGovernment.province == province)
+    matches = matches.subquery()
+
+    facet_rows = (await db.execute(
+        select(matches.c.year, matches.c.province, func.grouping(matches.c.year).label("by_province"), func.count())
+        .group_by(func.grouping_sets(tuple_(matches.c.year), tuple_(matches.c.province)))
+    )).all()
+    year_facets = sorted((row[0], row[3]) for row in facet_rows if not row.by_province)
+    province_facets = sorted(
+        ((row[1], row[3]) for row in facet_rows if row.by_province),
+        key=lambda facet: (facet[0] is None, facet[0] or "")
+    )
+    facets = {
+        "year": [{"value": value, "count": count} for value, count in year_facets],
+        "province": [{"value": value, "count": count} for value, count in province_facets],
+    }
+
+    page = select(matches)
+    if after is not None:
+        page = page.where(tuple_(matches.c.score, matches.c.id) < tuple_(*after))
+    page = page.order_by(matches.c.score.desc(), matches.c.id.desc()).limit(limit + 1).subquery()
+
+    # Headlines are the expensive part, so they are only built for the page
+    rows = (await db.execute(
+        select(page, func.ts_headline(config, text, tsquery, HEADLINE_OPTIONS).label("snippet"))
+        .join(table, table.id == page.c.id)
+        .order_by(page.c.score.desc(), page.c.id.desc())
+    )).all()
+
+    hits = [row._asdict() for row in rows]
+    return hits, sum(count for _, count in year_facets), facets
+
+
+async def search_text(
+    db: AsyncSession,
+    kind: str,
+    query: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    year: Optional[int] = None,
+    province: Optional[str] = None
+) -> SearchResult:
+    """Ranked full-text hits with snippets, year/province facets and a (score, id) cursor."""
+    after = pagination.decode_cursor(cursor, column("score", Float)) if cursor else None
+    search = _search_postgresql if db.bind.dialect.name == "postgresql" else _search_in_process
+    hits, total, facets = await search(db, kind, query, limit, after, year, province)
+
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = pagination.encode_cursor(hits[-1]["score"], hits[-1]["id"])
+
+    for hit in hits:
+        hit["kind"] = kind[:-1]
+    return SearchResult(hits=hits, total=total, facets=facets, next_cursor=next_cursor)
@@ -0,0 +1,148 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .data_version import data_version_tracker
+
+# A report "contains" a topic for co-occurrence counts when its proportion reaches this
+COOCCURRENCE_THRESHOLD = 0.1
+
+
+async def topic_overview(db: AsyncSession):
+    """Every topic with its report count and mean proportion, in one query over the rollup."""
+    rollup = models.TopicProvinceYearRollup
+    totals = select(
+        rollup.topic_id,
+        func.sum(rollup.report_count).label("report_count"),
+        func.sum(rollup.proportion_sum).label("proportion_sum")
+    ).group_by(rollup.topic_id).subquery()
+
+    rows = (await db.execute(
+        select(models.AuditTopic, totals.c.report_count, totals.c.proportion_sum)
+        .outerjoin(totals, totals.c.topic_id == models.AuditTopic.id)
+        .order_by(models.AuditTopic.topic_number)
+    )).all()
+    return [
+        {
+            "topic": topic,
+            "report_count": report_count or 0,
+            "avg_proportion": round(proportion_sum / report_count, 4) if report_count else None,
+        }
+        for topic, report_count, proportion_sum in rows
+    ]
+
+
+async def topic_summary(db: AsyncSession, topic_id: int):
+    rollup = models.TopicProvinceYearRollup
+    report_count, proportion_sum = (await db.execute(
+        select(func.sum(rollup.report_count), func.sum(rollup.proportion_sum))
+        .where(rollup.topic_id == topic_id)
+    )).one()
+    return report_count or 0, (round(proportion_sum / report_count, 4) if report_count else None)
+
+
+async def topic_trends(
+    db: AsyncSession,
+    by: str,
+    topic_id: Optional[int] = None,
+    year: Optional[int] = None
+) -> List[Dict]:
+    """Per-topic totals by year or by province; share is relative to all topics in that year/province."""
+    rollup = models.TopicProvinceYearRollup
+    dimension = rollup.year if by == "year" else rollup.province
+    report_count = func.sum(rollup.report_count)
+    proportion_sum = func.sum(rollup.proportion_sum)
+    stmt = select(
+        rollup.topic_id,
+        dimension,
+        report_count.label("report_count"),
+        (proportion_sum / report_count).label("avg_proportion"),
+        (proportion_sum / func.sum(proportion_sum).over(partition_by=dimension)).label("share")
+    ).group_by(rollup.topic_id, dimension)
+    if year is not None:
+        stmt = stmt.where(rollup.year == year)
+
+    # The window needs every topic in the group, so the topic filter is applied outside it
+    ranked = stmt.subquery()
+    outer = select(ranked, models.AuditTopic.topic_number).join(
+        models.AuditTopic, models.AuditTopic.id == ranked.c.topic_id
+    )
+    if topic_id is not None:
+        outer = outer.where(ranked.c.topic_id == topic_id)
+    outer = outer.order_by(models.AuditTopic.topic_number, ranked.c[dimension.key])
+
+    return [
+        {
+            "topic_id": row.topic_id,
+            "topic_number": row.topic_number,
+            by: row._mapping[dimension.key],
+            "report_count": row.report_count,
+            "avg_proportion": round(float(row.avg_proportion), 4),
+            "share": round(float(row.share), 4) if row.share is not None else None,
+        }
+        for row in await db.execute(outer)
+    ]
+
+
+@dataclass
+class TopicMatrix:
+    topic_ids: List[int]
+    topic_numbers: List[int]
+    reports: int
+    correlation: np.ndarray
+    cooccurrence: np.ndarray
+
+
+def build_topic_matrix(rows, topics) -> TopicMatrix:
+    """Correlation and co-occurrence from the report x topic proportion matrix."""
+    topic_ids = [topic_id for topic_id, _ in topics]
+    topic_numbers = [number for _, number in topics]
+    column = {topic_id: i for i, topic_id in enumerate(topic_ids)}
+    size = len(topic_ids)
+
+    if not rows:
+        return TopicMatrix(topic_ids, topic_numbers, 0, np.zeros((size, size)), np.zeros((size, size), dtype=np.int64))
+
+    report_ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    topic_columns = np.fromiter((column.get(r[1], -1) for r in rows), dtype=np.int64, count=len(rows))
+    proportions = np.fromiter((float(r[2] or 0) for r in rows), dtype=np.float64, count=len(rows))
+    known = topic_columns >= 0
+
+    reports, report_rows = np.unique(report_ids[known], return_inverse=True)
+    matrix = np.zeros((len(reports), size))
+    matrix[report_rows, topic_columns[known]] = proportions[known]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlation = np.corrcoef(matrix, rowvar=False) if len(reports) > 1 else np.zeros((size, size))
+    correlation = np.nan_to_num(correlation)
+
+    present = (matrix >= COOCCURRENCE_THRESHOLD).astype(np.int64)
+    cooccurrence = present.T @ present
+
+    return TopicMatrix(topic_ids, topic_numbers, len(reports), correlation, cooccurrence)
+
+
+_matrix: Optional[TopicMatrix] = None
+_matrix_version: Optional[int] = None
+_matrix_lock = asyncio.Lock()
+
+
+async def topic_matrix(db: AsyncSession) -> TopicMatrix:
+    """Cached until the data version moves; every writer of report_topics bumps it."""
+    global _matrix, _matrix_version
+    version = await data_version_tracker.current()
+    if _matrix is None or _matrix_version != version:
+        async with _matrix_lock:
+            if _matrix is None or _matrix_version != version:
+                topics = (await db.execute(
+                    select(models.AuditTopic.id, models.AuditTopic.topic_number).order_by(models.AuditTopic.topic_number)
+                )).all()
+                rows = (await db.execute(select(
+                    models.ReportTopic.report_id, models.ReportTopic.topic_id, models.ReportTopic.topic_proportion
+                ))).all()
+                _matrix = await asyncio.to_thread(build_topic_matrix, rows, topics)
+                _matrix_version = version
+    return _matrix
@@ -0,0 +1,179 @@
+"""LDA topic model over audit report findings, replacing Topicmodel1.R.
+
+The model is fitted once on a sparse document-term matrix and persisted; new or
+changed reports are then scored against it with a cheap transform instead of a refit.
+"""
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import joblib
+import numpy as np
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from . import models
+from .config import settings
+
+TOPIC_COUNT = 25
+TOP_TERMS = 10
+# Proportions below this are not stored, which keeps report_topics sparse
+MIN_TOPIC_PROPORTION = 0.01
+
+# Topicmodel1.R keeps each report from the first findings/auditor heading onwards
+_SECTION_START = re.compile(
+    r"^.*(?:Findings|Observations|FINDINGS|OBSERVATIONS|Auditor[^a-z]|AUDITOR|Auditors|AUIDITOR"
+    r"|SCOPE OF THE AUDIT|findings and recommendations|Scope of Audit|SCOPE OF AUDIT|observations)",
+    re.MULTILINE
+)
+
+
+def document_text(raw_text: Optional[str], findings_text: Optional[str]) -> str:
+    if findings_text:
+        return findings_text
+    if not raw_text:
+        return ""
+    start = _SECTION_START.search(raw_text)
+    return raw_text[start.start():] if start else raw_text
+
+
+@dataclass
+class TopicModel:
+    vectorizer: object
+    lda: object
+
+    @classmethod
+    def fit(cls, texts: Iterable[str], topics: int = TOPIC_COUNT, max_iter: int = 20, n_jobs: int = -1) -> "TopicModel":
+        from sklearn.decomposition import LatentDirichletAllocation
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        # Same clean-up as the quanteda dfm: lowercase words only, English stopwords, rare terms dropped
+        vectorizer = CountVectorizer(
+            lowercase=True,
+            stop_words="english",
+            token_pattern=r"(?u)\b[^\W\d_]{2,}\b",
+            min_df=2,
+            dtype=np.float32
+        )
+        dtm = vectorizer.fit_transform(texts)
+        lda = LatentDirichletAllocation(
+            n_components=topics,
+            learning_method="batch",
+            max_iter=max_iter,
+            n_jobs=n_jobs,
+            random_state=0
+        )
+        lda.fit(dtm)
+        return cls(vectorizer=vectorizer, lda=lda)
+
+    @property
+    def topics(self) -> int:
+        return self.lda.n_components
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        """Topic proportions, one row per text; rows for empty texts are all zero."""
+        dtm = self.vectorizer.transform(texts)
+        proportions = self.lda.transform(dtm)
+        proportions[np.asarray(dtm.sum(axis=1)).ravel() == 0] = 0
+        return proportions
+
+    def top_terms(self, n: int = TOP_TERMS) -> List[List[str]]:
+        vocabulary = self.vectorizer.get_feature_names_out()
+        return [list(vocabulary[np.argsort(weights)[::-1][:n]]) for weights in self.lda.components_]
+
+    def save(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump({"vectorizer": self.vectorizer, "lda": self.lda}, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["TopicModel"]:
+        if not Path(path).exists():
+            return None
+        return cls(**joblib.load(path))
+
+
+def ensure_topics(db: Session, model: TopicModel, relabel: bool = False) -> Dict[int, int]:
+    """Map model topic index -> audit_topics.id, adding rows for topics the table lacks.
+
+    Topic numbers are reused across fits, but a new fit describes different term
+    distributions than the seeded Topicmodel1.R labels or an earlier fit, so pass
+    ``relabel`` right after fitting to rewrite every description from this model's
+    top terms. Inference with a saved model keeps the labels as they are, including
+    ones curated after the fit.
+    """
+    terms = model.top_terms(3)
+    descriptions = {number: f"Topic {number}: {', '.join(terms[number - 1])}" for number in range(1, model.topics + 1)}
+
+    existing = dict(db.execute(select(models.AuditTopic.topic_number, models.AuditTopic.id)).all())
+    missing = [number for number in descriptions if number not in existing]
+    if missing:
+        db.execute(insert(models.AuditTopic), [
+            {"topic_number": number, "description": descriptions[number]} for number in missing
+        ])
+        existing = dict(db.execute(select(models.AuditTopic.topic_number, models.AuditTopic.id)).all())
+
+    if relabel:
+        db.execute(update(models.AuditTopic), [
+            {"id": existing[number], "description": description} for number, description in descriptions.items()
+        ])
+    return {number - 1: existing[number] for number in descriptions}
+
+
+def assign_topics(db: Session, model: TopicModel, texts: Dict[int, str], topic_ids: Dict[int, int]) -> int:
+    """Replace report_topics for the given reports with proportions inferred from their text."""
+    if not texts:
+        return 0
+
+    report_ids = list(texts)
+    proportions = model.transform([texts[report_id] for report_id in report_ids])
+    rows, columns = np.nonzero(proportions >= MIN_TOPIC_PROPORTION)
+
+    db.execute(delete(models.ReportTopic).where(models.ReportTopic.report_id.in_(report_ids)))
+    if len(rows):
+        db.execute(insert(models.ReportTopic), [
+            {
+                "report_id": report_ids[row],
+                "topic_id": topic_ids[column],
+                "topic_proportion": round(float(proportions[row, column]), 4),
+            }
+            for row, column in zip(rows.tolist(), columns.tolist())
+        ])
+    return len(rows)
+
+
+def refresh_topic_stats(db: Session, model: TopicModel, topic_ids: Dict[int, int]):
+    """Write top terms and prevalence (share of reports where the topic dominates) for every topic."""
+    ranked = select(
+        models.ReportTopic.topic_id,
+        func.row_number().over(
+            partition_by=models.ReportTopic.report_id,
+            order_by=(models.ReportTopic.topic_proportion.desc(), models.ReportTopic.topic_id)
+        ).label("rank")
+    ).subquery()
+    dominant = dict(db.execute(
+        select(ranked.c.topic_id, func.count()).where(ranked.c.rank == 1).group_by(ranked.c.topic_id)
+    ).all())
+    reports = sum(dominant.values())
+
+    terms = model.top_terms()
+    db.execute(update(models.AuditTopic), [
+        {
+            "id": topic_id,
+            "terms": ", ".join(terms[index]),
+            "prevalence": round(dominant.get(topic_id, 0) / reports, 4) if reports else None,
+        }
+        for index, topic_id in topic_ids.items()
+    ])
+
+
+_loaded: Dict[str, TopicModel] = {}
+
+
+def load_model(path: Optional[str] = None) -> Optional[TopicModel]:
+    path = path or settings.topic_model_path
+    if path not in _loaded:
+        model = TopicModel.load(path)
+        if model is None:
+            return None
+        _loaded[path] = model
+    return _loaded[path]
@@ -0,0 +1 @@
+# OpenAudit benchmarks
@@ -0,0 +1,135 @@
+"""Measure how many concurrent dashboard requests one uvicorn worker sustains.
+
+Run it against the tree before and after a change with the same worker count:
+
+    python -m benchmarks.concurrency --spawn --levels 10,50,100,200,400
+    python -m benchmarks.concurrency --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from itertools import cycle
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+DASHBOARD_PATHS = [
+    "/analytics/stats",
+    "/analytics/trends/yearly",
+    "/transactions/aggregate/by-province",
+    "/transactions/top-lgus?limit=10",
+    "/analytics/distribution/amount-ranges",
+    "/analytics/heatmap/province-year",
+]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_level(base_url: str, paths: List[str], concurrency: int, requests: int) -> dict:
+    latencies = []
+    errors = 0
+    in_flight = 0
+    peak_in_flight = 0
+    path_cycle = cycle(paths)
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(next(path_cycle))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker():
+            nonlocal errors, in_flight, peak_in_flight
+            while not queue.empty():
+                path = queue.get_nowait()
+                in_flight += 1
+                peak_in_flight = max(peak_in_flight, in_flight)
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                finally:
+                    in_flight -= 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "peak_in_flight": peak_in_flight,
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2),
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+        },
+    }
+
+
+def spawn_server(port: int, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--workers", "1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=Path(__file__).parent.parent,
+        env={**os.environ, **(env or {})}
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def main(args):
+    levels = [int(level) for level in args.levels.split(",")]
+    results = []
+    for concurrency in levels:
+        result = await run_level(args.url, args.paths or DASHBOARD_PATHS, concurrency,
+                                 max(args.requests, concurrency))
+        results.append(result)
+        print(json.dumps(result))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrency benchmark for the dashboard endpoints")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--path", dest="paths", action="append")
+    parser.add_argument("--levels", default="1,10,50,100,200,400")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--spawn", action="store_true", help="Start a single-worker uvicorn for the run")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    server = spawn_server(int(args.url.rsplit(":", 1)[1])) if args.spawn else None
+    try:
+        results = asyncio.run(main(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
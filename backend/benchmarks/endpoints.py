@@ -0,0 +1,249 @@
+"""Drive every API endpoint under concurrent load and compare against a saved baseline.
+
+Load a dataset first (see benchmarks.synthetic), then:
+
+    python -m benchmarks.endpoints --spawn --output benchmarks/baselines/sqlite_100k.json
+    python -m benchmarks.endpoints --spawn --baseline benchmarks/baselines/sqlite_100k.json
+
+With --baseline the run exits non-zero when an endpoint's p95 regresses by more than
+--tolerance. Peak RSS is read from /proc, so it is only reported on Linux with --spawn.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from .concurrency import percentile, spawn_server
+
+# Regressions smaller than this are noise on any machine, whatever the ratio
+MIN_REGRESSION_MS = 2.0
+
+
+@dataclass
+class Endpoint:
+    name: str
+    path: str
+    method: str = "GET"
+    body: Optional[Callable[[Dict], Dict]] = None
+    needs: Tuple[str, ...] = ()
+
+
+ENDPOINTS = [
+    Endpoint("topics.list", "/topics/"),
+    Endpoint("topics.overview", "/topics/overview"),
+    Endpoint("topics.trends_by_year", "/topics/trends/by-year"),
+    Endpoint("topics.trends_by_province", "/topics/trends/by-province?year={year}"),
+    Endpoint("topics.correlations", "/topics/correlations"),
+    Endpoint("topics.get", "/topics/{topic_id}", needs=("topic_id",)),
+    Endpoint("topics.analysis", "/topics/{topic_id}/analysis", needs=("topic_id",)),
+    Endpoint("lgus.list", "/lgus/?limit=100"),
+    Endpoint("lgus.list_province", "/lgus/?province={province}&include_total=exact"),
+    Endpoint("lgus.provinces", "/lgus/provinces"),
+    Endpoint("lgus.get", "/lgus/{lgu_id}"),
+    Endpoint("lgus.search_by_name", "/lgus/search/by-name?name={lgu_prefix}"),
+    Endpoint("lgus.autocomplete", "/lgus/search/autocomplete?q={lgu_prefix}"),
+    Endpoint("transactions.list", "/transactions/?limit=100&sort=amount&order=desc"),
+    Endpoint("transactions.list_year", "/transactions/?year={year}&limit=100"),
+    Endpoint("transactions.export", "/transactions/export?year={year}&province={province}"),
+    Endpoint("transactions.years", "/transactions/years"),
+    Endpoint("transactions.by_year", "/transactions/aggregate/by-year"),
+    Endpoint("transactions.by_province", "/transactions/aggregate/by-province?year={year}"),
+    Endpoint("transactions.top_lgus", "/transactions/top-lgus?limit=10"),
+    Endpoint("analytics.stats", "/analytics/stats"),
+    Endpoint("analytics.trends", "/analytics/trends/yearly"),
+    Endpoint("analytics.distribution", "/analytics/distribution/amount-ranges?scale=log&group_by=year"),
+    Endpoint("analytics.heatmap", "/analytics/heatmap/province-year"),
+    Endpoint("analytics.dashboard", "/analytics/dashboard"),
+    Endpoint("search.reports", "/search/?q=unliquidated+cash+advances"),
+    Endpoint("search.transactions", "/search/?q=liquidation&scope=transactions"),
+    Endpoint("llm.analyses", "/llm/analyses"),
+    Endpoint("llm.analysis", "/llm/analyses/{analysis_id}", needs=("analysis_id",)),
+    Endpoint("llm.job", "/llm/jobs/{job_id}", needs=("job_id",)),
+    Endpoint("llm.job_items", "/llm/jobs/{job_id}/items", needs=("job_id",)),
+    Endpoint("llm.analyze", "/llm/analyze", method="POST",
+             body=lambda f: {"analysis_type": "summary", "lgu_id": f["lgu_id"]}),
+]
+
+
+async def discover_fixtures(client: httpx.AsyncClient) -> Dict:
+    """Ids and filter values the parameterised endpoints need, taken from the loaded data."""
+    lgu = (await client.get("/lgus/", params={"limit": 1, "sort": "id"})).json()[0]
+    years = (await client.get("/transactions/aggregate/by-year")).json()
+    topics = (await client.get("/topics/", params={"limit": 1})).json()
+
+    fixtures = {
+        "lgu_id": lgu["id"],
+        "lgu_prefix": quote(lgu["name"][:3]),
+        "province": quote(lgu["province"] or ""),
+        # The busiest year, so the filtered endpoints see the largest slice
+        "year": max(years, key=lambda y: y["count"])["year"] if years else 2015,
+        "topic_id": topics[0]["id"] if topics else None,
+    }
+
+    analysis = await client.post("/llm/analyze", json={"analysis_type": "summary", "lgu_id": lgu["id"]})
+    fixtures["analysis_id"] = analysis.json()["id"] if analysis.status_code == 200 else None
+    job = await client.post("/llm/jobs", json={"analysis_type": "summary", "lgu_ids": [lgu["id"]]})
+    fixtures["job_id"] = job.json()["id"] if job.status_code == 202 else None
+    return fixtures
+
+
+def peak_rss_mb(pid: Optional[int]) -> Optional[float]:
+    if pid is None:
+        return None
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmHWM:"):
+            return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+async def run_endpoint(client: httpx.AsyncClient, endpoint: Endpoint, fixtures: Dict,
+                       concurrency: int, requests: int) -> dict:
+    path = endpoint.path.format(**fixtures)
+    body = endpoint.body(fixtures) if endpoint.body else None
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await client.request(endpoint.method, path, json=body)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "path": path,
+        "method": endpoint.method,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2),
+        },
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before is None:
+            continue
+        old, new = before["latency_ms"]["p95"], result["latency_ms"]["p95"]
+        if new > old * (1 + tolerance) and new - old > MIN_REGRESSION_MS:
+            regressions.append(f"{name}: p95 {old:.2f}ms -> {new:.2f}ms")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+async def main(args, server_pid: Optional[int]) -> dict:
+    selected = [e for e in ENDPOINTS if not args.only or any(e.name.startswith(p) for p in args.only)]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=120) as client:
+        fixtures = await discover_fixtures(client)
+        dataset = (await client.get("/analytics/stats")).json()
+        endpoints = {}
+
+        for endpoint in selected:
+            if any(fixtures.get(need) is None for need in endpoint.needs):
+                print(f"{endpoint.name:32} skipped (no {', '.join(endpoint.needs)} in the data)")
+                continue
+            for _ in range(args.warmup):
+                await client.request(endpoint.method, endpoint.path.format(**fixtures),
+                                     json=endpoint.body(fixtures) if endpoint.body else None)
+
+            result = await run_endpoint(client, endpoint, fixtures, args.concurrency, args.requests)
+            result["peak_rss_mb"] = peak_rss_mb(server_pid)
+            endpoints[endpoint.name] = result
+            latency = result["latency_ms"]
+            print(f"{endpoint.name:32} p50 {latency['p50']:8.2f}  p95 {latency['p95']:8.2f}  "
+                  f"p99 {latency['p99']:8.2f} ms  {result['throughput_rps']:8.1f} rps  "
+                  f"errors {result['errors']}")
+
+    return {
+        "meta": {
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "concurrency": args.concurrency,
+            "requests_per_endpoint": args.requests,
+            "dataset": {
+                "lgus": dataset["total_lgus"],
+                "reports": dataset["total_reports"],
+                "years": len(dataset["years_covered"]),
+                "provinces": dataset["provinces_count"],
+            },
+            "peak_rss_mb": peak_rss_mb(server_pid),
+        },
+        "endpoints": endpoints,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency and throughput benchmark for every endpoint")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed requests per endpoint")
+    parser.add_argument("--only", action="append", help="Endpoint name prefix, e.g. analytics or lgus.get")
+    parser.add_argument("--spawn", action="store_true", help="Start a single-worker uvicorn for the run")
+    parser.add_argument("--no-response-cache", action="store_true",
+                        help="Spawn the server with the response cache off to measure the handlers themselves")
+    parser.add_argument("--output", help="Write the results as a JSON baseline to this file")
+    parser.add_argument("--baseline", help="Compare against this JSON baseline and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 slowdown, as a fraction")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        # The mock provider keeps the LLM endpoints off the network
+        env = {"LLM_PROVIDER": "mock"}
+        if args.no_response_cache:
+            env["RESPONSE_CACHE_ENABLED"] = "false"
+        server = spawn_server(int(args.url.rsplit(":", 1)[1]), env=env)
+    try:
+        results = asyncio.run(main(args, server.pid if server else None))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if results["meta"]["peak_rss_mb"] is not None:
+        print(f"Server peak RSS: {results['meta']['peak_rss_mb']} MB")
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,82 @@
+"""Time LGU autocomplete against the loaded LGUs, one query at a time.
+
+Queries are drawn from the loaded names: short and longer prefixes, whole names with
+one character changed, and province names. Each is searched through the same code
+path as /lgus/search/autocomplete, so the figures exclude HTTP and serialization:
+
+    DATABASE_URL=postgresql://... python -m benchmarks.lgu_search --queries 2000
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.lgu_search
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import List
+
+from sqlalchemy import select
+
+from app import models
+from app.database import AsyncSessionLocal, async_engine
+from app.lgu_search import search_lgus
+
+from .concurrency import percentile
+
+
+def make_queries(names: List[str], provinces: List[str], count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        kind = rng.random()
+        name = rng.choice(names)
+        if kind < 0.4:
+            queries.append(name[:rng.randint(2, 4)])
+        elif kind < 0.6:
+            queries.append(name[:rng.randint(5, max(5, len(name)))])
+        elif kind < 0.85 and len(name) > 3:
+            i = rng.randrange(1, len(name))
+            queries.append(name[:i] + rng.choice("aeiouy") + name[i + 1:])
+        else:
+            queries.append(rng.choice(provinces) or name)
+    return queries
+
+
+async def main(args) -> dict:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(models.LocalGovernment.name, models.LocalGovernment.province))).all()
+        names = [row.name for row in rows]
+        provinces = sorted({row.province for row in rows if row.province})
+        queries = make_queries(names, provinces, args.queries, args.seed)
+
+        # The first search builds the in-process index on SQLite
+        for query in queries[:args.warmup]:
+            await search_lgus(db, query, args.limit)
+
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            await search_lgus(db, query, args.limit)
+            latencies.append((time.perf_counter() - started) * 1000)
+            # One request per transaction, as the endpoint has
+            await db.rollback()
+
+    await async_engine.dispose()
+    return {
+        "dialect": async_engine.dialect.name,
+        "lgus": len(rows),
+        "queries": len(queries),
+        "limit": args.limit,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(max(latencies), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=10, help="Hits per query, as the endpoint's default")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,89 @@
+"""Generate a synthetic unliquidated-cash CSV at national, multi-year scale.
+
+Every synthetic LGU is a copy of a real one from unliquidata1024.csv ("Aborlan",
+"Aborlan 2", "Aborlan 3", ...). A copy keeps the real LGU's province and its set of
+report years, and scales each amount by lognormal noise. The province, LGU-size, year
+and amount distributions of the source therefore carry over at any row count. The
+source's quirks carry over too: zero amounts, missing provinces and typo years.
+
+    python -m benchmarks.synthetic --rows 1000000 --output /tmp/synthetic_1m.csv --load
+"""
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SOURCE_CSV = Path(__file__).parent.parent.parent / "unliquidata1024.csv"
+CSV_COLUMNS = ["lgu", "province", "year", "unliquidated"]
+# Spread of the per-copy multiplier on amounts; median 1, roughly 0.6x-1.6x at 1.5 sigma
+AMOUNT_SIGMA = 0.3
+COPIES_PER_CHUNK = 50
+
+
+def generate(rows: int, output: Path, seed: int = 0, source: Path = SOURCE_CSV) -> int:
+    """Write ``rows`` synthetic rows to ``output`` in the source CSV's column layout."""
+    template = pd.read_csv(source, usecols=CSV_COLUMNS)
+    rng = np.random.default_rng(seed)
+
+    names = template["lgu"].to_numpy(dtype=object)
+    provinces = template["province"].to_numpy()
+    years = template["year"].to_numpy()
+    amounts = template["unliquidated"].to_numpy(dtype=np.float64)
+    per_copy = len(template)
+
+    written = 0
+    copy = 0
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("w", newline="") as handle:
+        handle.write(",".join(CSV_COLUMNS) + "\n")
+        while written < rows:
+            copies = min(COPIES_PER_CHUNK, -(-(rows - written) // per_copy))
+            numbers = np.arange(copy, copy + copies)
+            # Copy 0 keeps the real names and amounts so the real rows are part of every dataset
+            suffixes = pd.Series(np.repeat([f" {n + 1}" if n else "" for n in numbers], per_copy), dtype="string")
+            noise = np.where(np.repeat(numbers, per_copy) == 0, 1.0, rng.lognormal(0.0, AMOUNT_SIGMA, copies * per_copy))
+
+            chunk = pd.DataFrame({
+                "lgu": pd.Series(np.tile(names, copies), dtype="string") + suffixes,
+                "province": np.tile(provinces, copies),
+                "year": pd.array(np.tile(years, copies), dtype="Int64"),
+                "unliquidated": np.round(np.tile(amounts, copies) * noise, 2),
+            }).head(rows - written)
+
+            chunk.to_csv(handle, header=False, index=False)
+            written += len(chunk)
+            copy += copies
+
+    return written
+
+
+def load(csv_path: Path, chunksize: int = 100000):
+    """Load through the regular bulk loader, exactly as a real extraction would be."""
+    subprocess.run(
+        [sys.executable, "scripts/load_data.py", str(csv_path), "--bulk", "--chunksize", str(chunksize)],
+        cwd=Path(__file__).parent.parent,
+        check=True
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic unliquidated-cash CSV")
+    parser.add_argument("--rows", type=int, default=100000, help="Row count, e.g. 10000 up to 10000000")
+    parser.add_argument("--output", default="/tmp/openaudit_synthetic.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source", default=str(SOURCE_CSV))
+    parser.add_argument("--load", action="store_true", help="Load the file with scripts/load_data.py --bulk")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    output = Path(args.output)
+    written = generate(args.rows, output, seed=args.seed, source=Path(args.source))
+    print(f"Wrote {written} rows to {output} ({time.perf_counter() - started:.1f}s)")
+
+    if args.load:
+        load(output, chunksize=args.chunksize)
@@ -0,0 +1,213 @@
+"""Assert that every transaction query the API runs is answered by an index or partition pruning.
+
+Each endpoint below is called in-process; the SELECTs it sends against
+unliquidated_transactions are captured and re-run under EXPLAIN. A query passes when
+it finds its rows through an index condition, or, on PostgreSQL, when partition
+pruning left a single year partition to read. Endpoints that list the whole
+table in sort order may instead walk an index from end to end.
+
+On PostgreSQL sequential scans are disabled while explaining, so the check means "an
+index can answer this" on any dataset size; pass --planner-costs to check the plans
+the planner really chooses, against a realistic dataset (e.g. from benchmarks.synthetic).
+
+    python scripts/check_query_plans.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+
+# Cached responses and the in-memory columnar engine would answer without SQL
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["COLUMNAR_ENGINE_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.database import SessionLocal, async_database_url, async_engine
+from app.main import app
+from app import models
+
+TRANSACTIONS = "unliquidated_transactions"
+# (name, path, walks): endpoints that list the whole table in sort order may read an index
+# from end to end; every other query must look its rows up through an index condition
+ENDPOINTS = [
+    ("transactions.list", "/transactions/?limit=100", True),
+    ("transactions.list_amount", "/transactions/?limit=100&sort=amount&order=desc", True),
+    ("transactions.list_year", "/transactions/?year={year}&limit=100&sort=year", False),
+    ("transactions.list_filtered",
+     "/transactions/?year={year}&province={province}&min_amount=1000&limit=100&sort=amount", False),
+    ("transactions.list_province", "/transactions/?province={province}&limit=100", False),
+    ("transactions.export", "/transactions/export?year={year}&province={province}", False),
+    ("transactions.years", "/transactions/years", True),
+    ("lgus.get", "/lgus/{lgu_id}", False),
+    ("analytics.distribution", "/analytics/distribution/amount-ranges?year={year}&province={province}", False),
+    ("analytics.distribution_year", "/analytics/distribution/amount-ranges?year={year}&group_by=province", False),
+]
+# The in-process search index reads the whole table by design; only PostgreSQL searches in SQL
+POSTGRESQL_ENDPOINTS = [
+    ("search.transactions", "/search/?q=liquidation&scope=transactions&year={year}", False),
+]
+INDEX_SCANS = ("Index Scan", "Index Only Scan")
+
+
+@dataclass
+class PlanCheck:
+    endpoint: str
+    statement: str
+    ok: bool
+    summary: str
+    plan: str
+
+
+def discover_fixtures() -> dict:
+    txn = models.UnliquidatedTransaction
+    db = SessionLocal()
+    try:
+        year = db.scalar(select(txn.year).group_by(txn.year).order_by(func.count().desc()).limit(1))
+        # The rarest province is where a filtered walk of another index would cost the most
+        province = db.scalar(
+            select(txn.province).where(txn.year == year, txn.province.isnot(None))
+            .group_by(txn.province).order_by(func.count(), txn.province).limit(1)
+        )
+        lgu_id = db.scalar(select(txn.lgu_id).where(txn.year == year, txn.province == province).limit(1))
+    finally:
+        db.close()
+    return {"year": year, "province": quote(province), "lgu_id": lgu_id}
+
+
+def capture_statements(endpoints, fixtures: dict) -> List[Tuple[str, bool, str, tuple]]:
+    captured = []
+    current = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if TRANSACTIONS in statement and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((current["endpoint"], current["walks"], statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        with TestClient(app) as client:
+            for name, path, walks in endpoints:
+                current.update(endpoint=name, walks=walks)
+                response = client.get(path.format(**fixtures))
+                if response.status_code >= 400:
+                    raise SystemExit(f"{name}: {path.format(**fixtures)} returned {response.status_code}")
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+    return captured
+
+
+def _plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def check_postgresql_plan(plan: dict, partitions: int, walks: bool, empty=frozenset()) -> Tuple[bool, str]:
+    scans = [node for node in _plan_nodes(plan["Plan"]) if node.get("Relation Name", "").startswith(TRANSACTIONS)]
+    scanned = {node["Relation Name"] for node in scans}
+
+    # Bitmap heap scans always come from an index condition; plain index scans without
+    # one read the whole index. Any scan of a partition with no rows yet costs nothing.
+    unbounded = [
+        node for node in scans
+        if node["Relation Name"] not in empty
+        and (node["Node Type"] == "Seq Scan" or (node["Node Type"] in INDEX_SCANS and "Index Cond" not in node and not walks))
+    ]
+    # Every filtered endpoint here asks for at most one year, which pruning maps to one partition
+    pruned = partitions > 1 and len(scanned) == 1
+
+    by_type = defaultdict(set)
+    for node in scans:
+        by_type[node["Node Type"]].add(node["Relation Name"])
+    summary = ", ".join(
+        f"{node_type} on {next(iter(relations)) if len(relations) == 1 else f'{len(relations)} partitions'}"
+        for node_type, relations in sorted(by_type.items())
+    )
+    return not unbounded or pruned, summary + (f" (pruned to 1 of {partitions} partitions)" if pruned else "")
+
+
+def check_sqlite_plan(rows, walks: bool) -> Tuple[bool, str]:
+    # SEARCH is a lookup through an index condition; SCAN reads a whole table or index,
+    # which for "SCAN unliquidated_transactions" alone is the rowid (id) B-tree
+    details = [row[-1] for row in rows if TRANSACTIONS in row[-1]]
+    scans = [detail for detail in details if detail.startswith("SCAN ")]
+    sorted_in_memory = any("TEMP B-TREE" in row[-1] for row in rows)
+    return not scans or (walks and not sorted_in_memory), "; ".join(details)
+
+
+async def explain(captured, planner_costs: bool) -> List[PlanCheck]:
+    engine = create_async_engine(async_database_url(settings.database_url))
+    checks = []
+    try:
+        async with engine.connect() as conn:
+            postgresql = conn.dialect.name == "postgresql"
+            partitions, empty = 1, frozenset()
+            if postgresql:
+                sizes = (await conn.exec_driver_sql(
+                    "SELECT inhrelid::regclass::text, pg_relation_size(inhrelid) FROM pg_inherits "
+                    f"WHERE inhparent = '{TRANSACTIONS}'::regclass"
+                )).all()
+                partitions = len(sizes) or 1
+                empty = frozenset(name for name, size in sizes if not size)
+                if not planner_costs:
+                    await conn.exec_driver_sql("SET enable_seqscan = off")
+
+            for endpoint, walks, statement, parameters in captured:
+                if postgresql:
+                    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                    plan = result.scalar()
+                    plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]
+                    ok, summary = check_postgresql_plan(plan, partitions, walks, empty)
+                    rendered = json.dumps(plan["Plan"], indent=2)
+                else:
+                    rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+                    ok, summary = check_sqlite_plan(rows, walks)
+                    rendered = "\n".join(row[-1] for row in rows)
+                checks.append(PlanCheck(endpoint, " ".join(statement.split()), ok, summary, rendered))
+    finally:
+        await engine.dispose()
+    return checks
+
+
+def main(only: Optional[List[str]], planner_costs: bool, verbose: bool) -> int:
+    endpoints = ENDPOINTS + (POSTGRESQL_ENDPOINTS if settings.database_url.startswith("postgres") else [])
+    endpoints = [e for e in endpoints if not only or any(e[0].startswith(prefix) for prefix in only)]
+
+    fixtures = discover_fixtures()
+    captured = capture_statements(endpoints, fixtures)
+    checks = asyncio.run(explain(captured, planner_costs))
+
+    failures = 0
+    for check in checks:
+        failures += not check.ok
+        print(f"{'ok  ' if check.ok else 'FAIL'} {check.endpoint:30} {check.summary}")
+        if verbose or not check.ok:
+            print(f"     {check.statement[:300]}")
+            print("     " + check.plan.replace("\n", "\n     "))
+
+    missing = {name for name, _, _ in endpoints} - {check.endpoint for check in checks}
+    for name in sorted(missing):
+        print(f"note {name:30} ran no transaction query")
+    print(f"\n{len(checks) - failures} of {len(checks)} transaction queries use an index or partition pruning")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN the transaction queries behind each endpoint")
+    parser.add_argument("--only", action="append", help="Endpoint name prefix, e.g. transactions or lgus.get")
+    parser.add_argument("--planner-costs", action="store_true",
+                        help="Keep sequential scans enabled (PostgreSQL), checking the plans actually chosen")
+    parser.add_argument("--verbose", action="store_true", help="Print every statement and plan")
+    args = parser.parse_args()
+    sys.exit(main(args.only, args.planner_costs, args.verbose))
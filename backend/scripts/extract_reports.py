@@ -0,0 +1,242 @@
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+from sqlalchemy import delete, insert, select
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import SessionLocal
+from app import models
+from app.data_version import bump_data_version
+from app.extraction import extract_document, file_hash, name_key, parse_filename
+from app.migrations import upgrade_database
+from app.risk_scores import refresh_risk_scores
+from app.rollups import refresh_rollups, refresh_topic_rollups
+from app.topic_model import assign_topics, document_text, ensure_topics, load_model, refresh_topic_stats
+
+REPORT_TYPE = "executive_summary"
+# Extractions submitted ahead per worker; finished ones hold their text until written
+IN_FLIGHT_PER_WORKER = 4
+
+
+class LGUResolver:
+    """Maps names parsed from filenames onto stored LGUs, creating the ones that are new."""
+
+    def __init__(self, db):
+        self.by_key = {}
+        self.by_name = defaultdict(set)
+        self.provinces = {}
+        self.lgu_provinces = {}
+        for lgu_id, name, province in db.execute(
+            select(models.LocalGovernment.id, models.LocalGovernment.name, models.LocalGovernment.province)
+        ):
+            self._remember(lgu_id, name, province)
+
+    def _remember(self, lgu_id, name, province):
+        self.by_key[(name_key(name), province)] = lgu_id
+        self.by_name[name_key(name)].add((province, lgu_id))
+        self.lgu_provinces[lgu_id] = province
+        if province:
+            self.provinces.setdefault(name_key(province), province)
+
+    def resolve(self, db, name, province):
+        key = name_key(name)
+        if province:
+            province = self.provinces.get(name_key(province), province)
+        else:
+            # Filenames without a province: like extraction1.R, borrow it from the one LGU by that name
+            candidates = self.by_name.get(key, set())
+            if len(candidates) == 1:
+                return next(iter(candidates))[1]
+
+        lgu_id = self.by_key.get((key, province))
+        if lgu_id is None:
+            lgu = models.LocalGovernment(name=name, province=province)
+            db.add(lgu)
+            db.flush()
+            lgu_id = lgu.id
+            self._remember(lgu_id, name, province)
+        return lgu_id
+
+
+def find_pdfs(pdf_dir: Path):
+    return sorted(p for p in pdf_dir.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf")
+
+
+def find_pending(pdf_dir: Path, processed: Set[str], force: bool) -> Tuple[Dict[str, Path], int, int]:
+    """PDFs to extract by content hash, and how many were already processed or unrecognized."""
+    pending = {}
+    skipped = unnamed = 0
+    for path in find_pdfs(pdf_dir):
+        # Checked before hashing: no report can be stored for such a file, so it would
+        # otherwise be hashed and extracted again on every run
+        info = parse_filename(path.name)
+        if not info.lgu or not info.year:
+            print(f"Skipping {path}: could not parse LGU and year from the filename")
+            unnamed += 1
+            continue
+
+        digest = file_hash(path)
+        if (digest in processed and not force) or digest in pending:
+            skipped += 1
+            continue
+        pending[digest] = path
+    return pending, skipped, unnamed
+
+
+def _write_batch(db, documents, resolver, years, lgu_ids, topics):
+    txn = models.UnliquidatedTransaction
+    texts = {}
+
+    for document in documents:
+        info = parse_filename(Path(document.path).name)
+        lgu_id = resolver.resolve(db, info.lgu, info.province)
+        report = db.scalar(select(models.AuditReport).where(
+            models.AuditReport.lgu_id == lgu_id,
+            models.AuditReport.year == info.year,
+            models.AuditReport.report_type == REPORT_TYPE
+        ))
+        if report is None:
+            report = models.AuditReport(lgu_id=lgu_id, year=info.year, report_type=REPORT_TYPE)
+            db.add(report)
+        else:
+            # A changed file for an existing report replaces its transactions
+            db.execute(delete(txn).where(txn.report_id == report.id))
+
+        report.file_path = document.path
+        report.raw_text = document.raw_text
+        report.findings_text = document.findings_text
+        report.content_hash = document.content_hash
+        db.flush()
+
+        # Rows loaded from the R pipeline's CSV came from the same report and are superseded
+        db.execute(delete(txn).where(txn.lgu_id == lgu_id, txn.year == info.year, txn.report_id.is_(None)))
+        if document.hits:
+            db.execute(insert(txn), [
+                {
+                    "lgu_id": lgu_id,
+                    "report_id": report.id,
+                    "province": resolver.lgu_provinces[lgu_id],
+                    "year": info.year,
+                    "amount": hit.amount,
+                    "context_pre": hit.context_pre,
+                    "context_post": hit.context_post,
+                }
+                for hit in document.hits
+            ])
+
+        years.add(info.year)
+        lgu_ids.add(lgu_id)
+        texts[report.id] = document_text(document.raw_text, document.findings_text)
+
+    if topics:
+        # Score new and changed reports against the saved model as they are written
+        model, topic_ids = topics
+        assign_topics(db, model, texts, topic_ids)
+    db.commit()
+    return len(texts)
+
+
+def extract_reports(pdf_dir: Path, workers: int, batch_size: int, force: bool):
+    print("Migrating database schema...")
+    upgrade_database()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+
+    try:
+        processed = set(db.scalars(
+            select(models.AuditReport.content_hash).where(models.AuditReport.content_hash.isnot(None))
+        ))
+
+        pending, skipped, unnamed = find_pending(pdf_dir, processed, force)
+        print(f"{len(pending)} new or changed PDFs, {skipped} already processed, {unnamed} unrecognized filenames")
+
+        resolver = LGUResolver(db)
+        model = load_model()
+        topics = (model, ensure_topics(db, model)) if model else None
+        if topics is None:
+            print("No topic model found; run scripts/fit_topics.py to score these reports later")
+        years, lgu_ids = set(), set()
+        written = failed = 0
+        batch = []
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Submit in a bounded window so memory does not grow with the corpus
+            queued = iter(pending.items())
+            window = workers * IN_FLIGHT_PER_WORKER
+            in_flight = set()
+            done = 0
+            while True:
+                for digest, path in islice(queued, window - len(in_flight)):
+                    in_flight.add(pool.submit(extract_document, str(path), digest))
+                if not in_flight:
+                    break
+
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    document = future.result()
+                    done += 1
+                    if document.error:
+                        print(f"Failed to read {document.path}: {document.error}")
+                        failed += 1
+                    else:
+                        batch.append(document)
+
+                    if len(batch) >= batch_size:
+                        written += _write_batch(db, batch, resolver, years, lgu_ids, topics)
+                        batch = []
+                        print(f"Processed {done}/{len(pending)} PDFs...")
+
+            written += _write_batch(db, batch, resolver, years, lgu_ids, topics)
+
+        if years:
+            print("Refreshing rollup tables...")
+            refresh_rollups(db, years=years, lgu_ids=lgu_ids)
+            refresh_risk_scores(db, years=years, lgu_ids=lgu_ids)
+            if topics:
+                refresh_topic_stats(db, *topics)
+                refresh_topic_rollups(db, years=years)
+            bump_data_version(db)
+            db.commit()
+
+        elapsed = time.perf_counter() - started
+        print(f"\nExtraction complete!")
+        print(f"Reports written: {written}")
+        print(f"Unreadable PDFs: {failed}")
+        print(f"Elapsed: {elapsed:.2f}s")
+
+    except Exception as e:
+        print(f"Error extracting reports: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract audit reports and unliquidated transactions from PDFs")
+    parser.add_argument(
+        "pdf_dir",
+        nargs="?",
+        default=str(Path(__file__).parent.parent.parent / "Allfiles")
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Text extraction processes")
+    parser.add_argument("--batch-size", type=int, default=50, help="Reports written per transaction")
+    parser.add_argument("--force", action="store_true", help="Re-extract files that were already processed")
+    args = parser.parse_args()
+
+    pdf_dir = Path(args.pdf_dir)
+
+    if not pdf_dir.is_dir():
+        print(f"Error: PDF directory not found at {pdf_dir}")
+        sys.exit(1)
+
+    extract_reports(pdf_dir, args.workers, args.batch_size, args.force)
@@ -0,0 +1,101 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import func, select
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.database import SessionLocal
+from app import models
+from app.data_version import bump_data_version
+from app.migrations import upgrade_database
+from app.rollups import refresh_topic_rollups
+from app.topic_model import TOPIC_COUNT, TopicModel, assign_topics, document_text, ensure_topics, refresh_topic_stats
+
+
+def _report_texts(db, sample=None):
+    stmt = select(models.AuditReport.raw_text, models.AuditReport.findings_text)
+    if sample:
+        stmt = stmt.order_by(func.random()).limit(sample)
+    for raw_text, findings_text in db.execute(stmt.execution_options(yield_per=500)):
+        yield document_text(raw_text, findings_text)
+
+
+def _infer_all(db, model, topic_ids, batch_size, missing_only):
+    report = models.AuditReport
+    last_id = 0
+    inferred = 0
+
+    while True:
+        stmt = select(report.id, report.raw_text, report.findings_text).where(report.id > last_id)
+        if missing_only:
+            stmt = stmt.where(~select(models.ReportTopic.id).where(models.ReportTopic.report_id == report.id).exists())
+        rows = db.execute(stmt.order_by(report.id).limit(batch_size)).all()
+        if not rows:
+            return inferred
+
+        assign_topics(db, model, {row.id: document_text(row.raw_text, row.findings_text) for row in rows}, topic_ids)
+        db.commit()
+        last_id = rows[-1].id
+        inferred += len(rows)
+        print(f"Inferred topics for {inferred} reports...")
+
+
+def fit_topics(model_path, topics, max_iter, n_jobs, sample, infer_only, missing_only, batch_size):
+    upgrade_database()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+
+    try:
+        if infer_only:
+            model = TopicModel.load(model_path)
+            if model is None:
+                print(f"Error: no topic model at {model_path}; run without --infer-only first")
+                sys.exit(1)
+        else:
+            print(f"Fitting {topics} topics (max_iter={max_iter}, n_jobs={n_jobs})...")
+            model = TopicModel.fit(_report_texts(db, sample), topics=topics, max_iter=max_iter, n_jobs=n_jobs)
+            model.save(model_path)
+            print(f"Model saved to {model_path} ({time.perf_counter() - started:.1f}s)")
+
+        topic_ids = ensure_topics(db, model, relabel=not infer_only)
+        inferred = _infer_all(db, model, topic_ids, batch_size, missing_only)
+
+        print("Updating topic terms and prevalence...")
+        refresh_topic_stats(db, model, topic_ids)
+        refresh_topic_rollups(db)
+        bump_data_version(db)
+        db.commit()
+
+        print(f"\nTopic inference complete!")
+        print(f"Reports scored: {inferred}")
+        print(f"Elapsed: {time.perf_counter() - started:.2f}s")
+
+    except Exception as e:
+        print(f"Error fitting topics: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit the LDA topic model and populate report_topics")
+    parser.add_argument("--model-path", default=settings.topic_model_path)
+    parser.add_argument("--topics", type=int, default=TOPIC_COUNT)
+    parser.add_argument("--max-iter", type=int, default=20)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Processes for the fit (-1 uses every core)")
+    parser.add_argument("--sample", type=int, help="Fit on a random sample of reports, then score all of them")
+    parser.add_argument("--infer-only", action="store_true", help="Score reports against the saved model without refitting")
+    parser.add_argument("--missing-only", action="store_true", help="Only score reports that have no topics yet")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    fit_topics(
+        args.model_path, args.topics, args.max_iter, args.n_jobs, args.sample,
+        args.infer_only, args.missing_only, args.batch_size
+    )
@@ -1,26 +1,66 @@
+import argparse
+import hashlib
+import io
 import pandas as pd
 import sys
+import time
 from pathlib import Path
 
+from sqlalchemy import bindparam, text, update
+from sqlalchemy.exc import IntegrityError
+
 sys.path.append(str(Path(__file__).parent.parent))
 
 from app.database import SessionLocal, engine
 from app import models
+from app.data_version import bump_data_version
+from app.migrations import upgrade_database
+from app.risk_scores import refresh_risk_scores
+from app.rollups import refresh_rollups
+
+CSV_COLUMNS = ["lgu", "province", "year", "unliquidated"]
+STAGING_TABLE = "staging_unliquidated"
+KEYED_TABLE = "staging_keyed"
+DELTA_TABLE = "staging_delta"
+DELTA_SAMPLE_ROWS = 10
+
+
+def row_hash(lgu: str, province, year: int, amount: float) -> str:
+    return hashlib.sha256(f"{lgu}|{province or ''}|{year}|{amount:.2f}".encode()).hexdigest()
+
+
+def _next_source_seqs(db) -> dict:
+    """Next free source_seq of every LGU-year that already has CSV rows."""
+    return {
+        (lgu_id, year): next_seq
+        for lgu_id, year, next_seq in db.execute(text(
+            "SELECT lgu_id, year, MAX(source_seq) + 1 FROM unliquidated_transactions "
+            "WHERE report_id IS NULL AND lgu_id IS NOT NULL GROUP BY lgu_id, year"
+        ))
+    }
+
 
 def load_unliquidated_data(csv_path: str):
+    """Append every row of the CSV in one transaction.
+
+    Rows are numbered after those already loaded for their LGU-year, so loading a
+    file again adds its rows a second time; use --incremental to apply a changed file.
+    """
     db = SessionLocal()
 
     try:
-        print("Creating database tables...")
-        models.Base.metadata.create_all(bind=engine)
-        print("Tables created successfully")
+        print("Migrating database schema...")
+        upgrade_database()
+        print("Schema is up to date")
 
         print(f"Reading CSV file from {csv_path}...")
         df = pd.read_csv(csv_path)
         print(f"Loaded {len(df)} records from CSV")
 
         lgu_cache = {}
+        next_seqs = _next_source_seqs(db)
         transaction_count = 0
+        years_loaded = set()
 
         print("Processing records...")
         for idx, row in df.iterrows():
@@ -53,20 +93,35 @@ def load_unliquidated_data(csv_path: str):
                     lgu_cache[lgu_key] = existing_lgu.id
 
             lgu_id = lgu_cache[lgu_key]
+            source_seq = next_seqs.get((lgu_id, year), 0)
+            next_seqs[(lgu_id, year)] = source_seq + 1
 
             transaction = models.UnliquidatedTransaction(
                 lgu_id=lgu_id,
+                province=province,
                 year=year,
-                amount=amount
+                amount=amount,
+                content_hash=row_hash(lgu_name, province, year, round(amount, 2)),
+                source_seq=source_seq
             )
             db.add(transaction)
             transaction_count += 1
+            years_loaded.add(year)
 
             if (idx + 1) % 100 == 0:
                 print(f"Processed {idx + 1}/{len(df)} records...")
-                db.commit()
+                # Flushed rather than committed: a failure must not leave the file half loaded
+                db.flush()
 
+        # The rollups read the new rows through SQL, which does not autoflush them
+        db.flush()
+        print("Refreshing rollup tables...")
+        refresh_rollups(db, years=years_loaded)
+        print("Scoring LGU-years...")
+        refresh_risk_scores(db, years=years_loaded)
+        bump_data_version(db)
         db.commit()
+
         print(f"\nData loading complete!")
         print(f"Total LGUs: {len(lgu_cache)}")
         print(f"Total transactions: {transaction_count}")
@@ -79,11 +134,373 @@ def load_unliquidated_data(csv_path: str):
         db.close()
 
 
+def _clean_chunk(chunk: pd.DataFrame, first_line: int = 0) -> pd.DataFrame:
+    # Same rules as the row-by-row loader, applied column-wise
+    line_no = pd.RangeIndex(first_line, first_line + len(chunk))
+    keep = chunk[["lgu", "year", "unliquidated"]].notna().all(axis=1).to_numpy()
+    chunk = chunk[keep]
+    cleaned = pd.DataFrame({
+        "lgu": chunk["lgu"].astype(str),
+        "province": chunk["province"].astype(str).astype(object).where(chunk["province"].notna(), None),
+        "year": chunk["year"].astype(int),
+        "amount": chunk["unliquidated"].astype(float).round(2),
+        "line_no": line_no[keep],
+    })
+    cleaned["content_hash"] = [
+        row_hash(*row) for row in cleaned[["lgu", "province", "year", "amount"]].itertuples(index=False, name=None)
+    ]
+    return cleaned
+
+
+def _create_staging_table(conn):
+    conn.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+    conn.execute(text(
+        f"CREATE TEMPORARY TABLE {STAGING_TABLE} ("
+        "lgu VARCHAR(255) NOT NULL, "
+        "province VARCHAR(255), "
+        "year INTEGER NOT NULL, "
+        "amount DECIMAL(15, 2) NOT NULL, "
+        "line_no INTEGER NOT NULL, "
+        "content_hash VARCHAR(64) NOT NULL)"
+    ))
+
+
+def _stage_chunk(conn, chunk: pd.DataFrame):
+    if conn.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        chunk.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} (lgu, province, year, amount, line_no, content_hash) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+    else:
+        # SQLite fallback for local testing: executemany into the same staging table
+        conn.exec_driver_sql(
+            f"INSERT INTO {STAGING_TABLE} (lgu, province, year, amount, line_no, content_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            list(chunk.itertuples(index=False, name=None))
+        )
+
+
+def _insert_staged_lgus(conn) -> int:
+    # NULL provinces are matched through COALESCE so the join stays hashable
+    return conn.execute(text(
+        "INSERT INTO local_governments (name, province) "
+        f"SELECT DISTINCT s.lgu, s.province FROM {STAGING_TABLE} s "
+        "WHERE NOT EXISTS ("
+        "SELECT 1 FROM local_governments g "
+        "WHERE g.name = s.lgu AND COALESCE(g.province, '') = COALESCE(s.province, ''))"
+    )).rowcount
+
+
+def _keyed_staging_select() -> str:
+    # Natural key: LGU, year and the row's position among that LGU-year's rows in the file
+    return (
+        "SELECT g.id AS lgu_id, g.province AS province, s.year AS year, s.amount AS amount, "
+        "s.content_hash AS content_hash, "
+        "ROW_NUMBER() OVER (PARTITION BY g.id, s.year ORDER BY s.line_no) - 1 AS source_seq "
+        f"FROM {STAGING_TABLE} s "
+        "JOIN local_governments g "
+        "ON g.name = s.lgu AND COALESCE(g.province, '') = COALESCE(s.province, '')"
+    )
+
+
+def _merge_staging(conn):
+    lgus_inserted = _insert_staged_lgus(conn)
+
+    transactions_inserted = conn.execute(text(
+        "INSERT INTO unliquidated_transactions (lgu_id, province, year, amount, content_hash, source_seq) "
+        f"SELECT lgu_id, province, year, amount, content_hash, source_seq FROM ({_keyed_staging_select()}) k"
+    )).rowcount
+
+    years = conn.execute(text(f"SELECT DISTINCT year FROM {STAGING_TABLE}")).scalars().all()
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+    return lgus_inserted, transactions_inserted, years
+
+
+def _stage_csv(conn, csv_path: str, chunksize: int, started: float) -> int:
+    _create_staging_table(conn)
+    staged = 0
+    lines = 0
+    for chunk in pd.read_csv(csv_path, usecols=CSV_COLUMNS, chunksize=chunksize):
+        cleaned = _clean_chunk(chunk, first_line=lines)
+        lines += len(chunk)
+        _stage_chunk(conn, cleaned)
+        staged += len(cleaned)
+        elapsed = time.perf_counter() - started
+        print(f"Staged {staged} records ({staged / elapsed:,.0f} rows/sec)...")
+    return staged
+
+
+def bulk_load_unliquidated_data(csv_path: str, chunksize: int = 100000):
+    print("Migrating database schema...")
+    upgrade_database()
+
+    print(f"Streaming CSV file from {csv_path} in chunks of {chunksize}...")
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        _stage_csv(conn, csv_path, chunksize, started)
+
+        print("Merging staged records...")
+        lgus_inserted, transactions_inserted, years = _merge_staging(conn)
+
+        print("Refreshing rollup tables...")
+        refresh_rollups(conn, years=years)
+        print("Scoring LGU-years...")
+        refresh_risk_scores(conn, years=years)
+        bump_data_version(conn)
+
+    elapsed = time.perf_counter() - started
+    print(f"\nData loading complete!")
+    print(f"New LGUs: {lgus_inserted}")
+    print(f"Total transactions: {transactions_inserted}")
+    print(f"Elapsed: {elapsed:.2f}s ({transactions_inserted / elapsed:,.0f} rows/sec)")
+
+
+def _backfill_row_keys(conn) -> int:
+    """Key CSV rows loaded before rows carried a content hash, so they can be diffed."""
+    rows = conn.execute(text(
+        "SELECT t.id, t.lgu_id, t.year, t.amount, g.name, g.province "
+        "FROM unliquidated_transactions t JOIN local_governments g ON g.id = t.lgu_id "
+        "WHERE t.report_id IS NULL AND t.content_hash IS NULL ORDER BY t.id"
+    )).all()
+    if not rows:
+        return 0
+
+    frame = pd.DataFrame(rows, columns=["id", "lgu_id", "year", "amount", "name", "province"])
+    keyed = pd.DataFrame(conn.execute(text(
+        "SELECT lgu_id, year, MAX(source_seq) + 1 AS next_seq FROM unliquidated_transactions "
+        "WHERE report_id IS NULL AND content_hash IS NOT NULL GROUP BY lgu_id, year"
+    )).all(), columns=["lgu_id", "year", "next_seq"])
+    frame = frame.merge(keyed, on=["lgu_id", "year"], how="left")
+    frame["source_seq"] = frame.groupby(["lgu_id", "year"]).cumcount() + frame["next_seq"].fillna(0).astype(int)
+
+    txn = models.UnliquidatedTransaction.__table__
+    conn.execute(
+        update(txn).where(txn.c.id == bindparam("row_id")).values(
+            content_hash=bindparam("row_hash"), source_seq=bindparam("row_seq")
+        ),
+        [
+            {"row_id": int(row.id), "row_hash": row_hash(row.name, row.province, int(row.year), float(row.amount)),
+             "row_seq": int(row.source_seq)}
+            for row in frame.itertuples(index=False)
+        ]
+    )
+    return len(frame)
+
+
+def _build_delta(conn):
+    conn.execute(text(f"DROP TABLE IF EXISTS {KEYED_TABLE}"))
+    conn.execute(text(f"CREATE TEMPORARY TABLE {KEYED_TABLE} AS {_keyed_staging_select()}"))
+    conn.execute(text(f"CREATE INDEX idx_{KEYED_TABLE}_key ON {KEYED_TABLE} (lgu_id, year, source_seq)"))
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {DELTA_TABLE}"))
+    conn.execute(text(
+        f"CREATE TEMPORARY TABLE {DELTA_TABLE} ("
+        "change VARCHAR(8) NOT NULL, "
+        "transaction_id INTEGER, "
+        "lgu_id INTEGER NOT NULL, "
+        "province VARCHAR(255), "
+        "year INTEGER NOT NULL, "
+        "source_seq INTEGER NOT NULL, "
+        "amount DECIMAL(15, 2), "
+        "old_amount DECIMAL(15, 2), "
+        "content_hash VARCHAR(64))"
+    ))
+
+    same_key = (
+        "t.report_id IS NULL AND t.lgu_id = k.lgu_id AND t.year = k.year AND t.source_seq = k.source_seq"
+    )
+    # LGU-years with extracted report rows are owned by extract_reports, which drops their CSV rows
+    conn.execute(text(
+        f"INSERT INTO {DELTA_TABLE} (change, lgu_id, province, year, source_seq, amount, content_hash) "
+        f"SELECT 'insert', k.lgu_id, k.province, k.year, k.source_seq, k.amount, k.content_hash FROM {KEYED_TABLE} k "
+        f"WHERE NOT EXISTS (SELECT 1 FROM unliquidated_transactions t WHERE {same_key}) "
+        "AND NOT EXISTS (SELECT 1 FROM unliquidated_transactions t "
+        "WHERE t.report_id IS NOT NULL AND t.lgu_id = k.lgu_id AND t.year = k.year)"
+    ))
+    conn.execute(text(
+        f"INSERT INTO {DELTA_TABLE} (change, transaction_id, lgu_id, year, source_seq, amount, old_amount, content_hash) "
+        "SELECT 'update', t.id, k.lgu_id, k.year, k.source_seq, k.amount, t.amount, k.content_hash "
+        f"FROM {KEYED_TABLE} k JOIN unliquidated_transactions t ON {same_key} "
+        "WHERE t.content_hash IS NULL OR t.content_hash <> k.content_hash"
+    ))
+    conn.execute(text(
+        f"INSERT INTO {DELTA_TABLE} (change, transaction_id, lgu_id, year, source_seq, old_amount) "
+        "SELECT 'retire', t.id, t.lgu_id, t.year, t.source_seq, t.amount FROM unliquidated_transactions t "
+        f"WHERE t.report_id IS NULL AND NOT EXISTS (SELECT 1 FROM {KEYED_TABLE} k WHERE {same_key})"
+    ))
+
+
+def _format_amount(amount) -> str:
+    return "-" if amount is None else f"{float(amount):,.2f}"
+
+
+def _print_delta(conn, applied_changes):
+    counts = dict(conn.execute(text(f"SELECT change, COUNT(*) FROM {DELTA_TABLE} GROUP BY change")).all())
+    print(f"\n{'change':8} {'rows':>10}")
+    for change in ("insert", "update", "retire"):
+        note = "" if change in applied_changes else "  (kept; pass --retire-missing to delete)"
+        print(f"{change:8} {counts.get(change, 0):>10}{note}")
+
+    for change in ("insert", "update", "retire"):
+        sample = conn.execute(text(
+            "SELECT g.name, g.province, d.year, d.source_seq, d.old_amount, d.amount "
+            f"FROM {DELTA_TABLE} d JOIN local_governments g ON g.id = d.lgu_id "
+            "WHERE d.change = :change ORDER BY g.name, d.year, d.source_seq LIMIT :limit"
+        ), {"change": change, "limit": DELTA_SAMPLE_ROWS}).all()
+        if sample:
+            print(f"\n{change} (first {len(sample)}):")
+        for name, province, year, seq, old_amount, amount in sample:
+            print(f"  {name} ({province or '-'}) {year} #{seq}: {_format_amount(old_amount)} -> {_format_amount(amount)}")
+    return counts
+
+
+def _apply_delta(conn, changes):
+    placeholders = ", ".join(f"'{change}'" for change in changes)
+    slices = conn.execute(text(
+        f"SELECT DISTINCT lgu_id, year FROM {DELTA_TABLE} WHERE change IN ({placeholders})"
+    )).all()
+
+    if "retire" in changes:
+        conn.execute(text(
+            "DELETE FROM unliquidated_transactions WHERE id IN "
+            f"(SELECT transaction_id FROM {DELTA_TABLE} WHERE change = 'retire')"
+        ))
+    # Correlated subqueries rather than UPDATE ... FROM, which older SQLite lacks
+    conn.execute(text(
+        "UPDATE unliquidated_transactions SET "
+        f"amount = (SELECT d.amount FROM {DELTA_TABLE} d "
+        "WHERE d.change = 'update' AND d.transaction_id = unliquidated_transactions.id), "
+        f"content_hash = (SELECT d.content_hash FROM {DELTA_TABLE} d "
+        "WHERE d.change = 'update' AND d.transaction_id = unliquidated_transactions.id), "
+        "updated_at = CURRENT_TIMESTAMP "
+        f"WHERE id IN (SELECT transaction_id FROM {DELTA_TABLE} WHERE change = 'update')"
+    ))
+    conn.execute(text(
+        "INSERT INTO unliquidated_transactions (lgu_id, province, year, amount, content_hash, source_seq) "
+        f"SELECT lgu_id, province, year, amount, content_hash, source_seq FROM {DELTA_TABLE} WHERE change = 'insert'"
+    ))
+    return slices
+
+
+def incremental_load_unliquidated_data(
+    csv_path: str,
+    chunksize: int = 100000,
+    retire_missing: bool = False,
+    dry_run: bool = False
+):
+    """Diff the CSV against the loaded CSV rows and apply only the changes.
+
+    Rows are matched on (LGU, year, position among that LGU-year's rows) and
+    compared by content hash. Only the changed LGU-year slices are re-rolled up.
+    A dry run computes and prints the delta inside a transaction that is rolled back.
+    """
+    print("Migrating database schema...")
+    upgrade_database()
+
+    print(f"Streaming CSV file from {csv_path} in chunks of {chunksize}...")
+    started = time.perf_counter()
+    changes = ("insert", "update", "retire") if retire_missing else ("insert", "update")
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            backfilled = _backfill_row_keys(conn)
+            if backfilled:
+                print(f"Keyed {backfilled} previously loaded rows")
+
+            _stage_csv(conn, csv_path, chunksize, started)
+            lgus_inserted = _insert_staged_lgus(conn)
+
+            print("Diffing against loaded rows...")
+            _build_delta(conn)
+            counts = _print_delta(conn, changes)
+
+            if dry_run:
+                transaction.rollback()
+                print("\nDry run: nothing was written")
+                return
+
+            slices = _apply_delta(conn, changes)
+            if slices:
+                print(f"\nRefreshing rollups for {len(slices)} LGU-year slices...")
+                changed = {"years": {year for _, year in slices}, "lgu_ids": {lgu_id for lgu_id, _ in slices}}
+                refresh_rollups(conn, **changed)
+                print("Scoring LGU-years...")
+                refresh_risk_scores(conn, **changed)
+                bump_data_version(conn)
+
+            for table in (DELTA_TABLE, KEYED_TABLE, STAGING_TABLE):
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+            transaction.commit()
+        except Exception:
+            transaction.rollback()
+            raise
+
+    elapsed = time.perf_counter() - started
+    print(f"\nIncremental load complete!")
+    print(f"New LGUs: {lgus_inserted}")
+    print(f"Inserted: {counts.get('insert', 0)}, updated: {counts.get('update', 0)}, "
+          f"retired: {counts.get('retire', 0) if retire_missing else 0}")
+    print(f"Elapsed: {elapsed:.2f}s")
+
+
 if __name__ == "__main__":
-    csv_file = Path(__file__).parent.parent.parent / "unliquidata1024.csv"
+    parser = argparse.ArgumentParser(description="Load unliquidated transactions from CSV")
+    parser.add_argument(
+        "csv_path",
+        nargs="?",
+        default=str(Path(__file__).parent.parent.parent / "unliquidata1024.csv")
+    )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Stream the CSV in chunks and load through a staging table (COPY on PostgreSQL)"
+    )
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Diff the CSV against the loaded rows; insert new rows and update changed ones"
+    )
+    parser.add_argument(
+        "--retire-missing",
+        action="store_true",
+        help="With --incremental, delete loaded CSV rows that are no longer in the file"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Print the incremental delta without writing it")
+    args = parser.parse_args()
+
+    csv_file = Path(args.csv_path)
 
     if not csv_file.exists():
         print(f"Error: CSV file not found at {csv_file}")
         sys.exit(1)
 
-    load_unliquidated_data(str(csv_file))
+    if args.incremental or args.dry_run:
+        incremental_load_unliquidated_data(
+            str(csv_file),
+            chunksize=args.chunksize,
+            retire_missing=args.retire_missing,
+            dry_run=args.dry_run
+        )
+    else:
+        try:
+            if args.bulk:
+                bulk_load_unliquidated_data(str(csv_file), chunksize=args.chunksize)
+            else:
+                load_unliquidated_data(str(csv_file))
+        except IntegrityError:
+            print(
+                "Error: some rows of this file have the same LGU, year and position as loaded rows; "
+                "the load was rolled back. Rerun with --incremental to apply the file as changes"
+            )
+            sys.exit(1)
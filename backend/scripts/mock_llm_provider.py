@@ -0,0 +1,80 @@
+"""Local stand-in for the Anthropic Messages API.
+
+Point the backend at it with LLM_PROVIDER=anthropic, LLM_BASE_URL=http://127.0.0.1:8901
+and any ANTHROPIC_API_KEY to exercise the pooled client, rate limiting and
+retries without network access or cost.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def _event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_text(text: str, latency: float):
+    yield _event("message_start", {"type": "message_start", "message": {"role": "assistant", "content": []}})
+    yield _event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+    tokens = re.findall(r"\S+\s*|\s+", text)
+    for token in tokens:
+        await asyncio.sleep(latency / len(tokens))
+        yield _event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}})
+    yield _event("content_block_stop", {"type": "content_block_stop", "index": 0})
+    yield _event("message_stop", {"type": "message_stop"})
+
+
+def create_app(latency: float, error_rate: float) -> FastAPI:
+    app = FastAPI(title="Mock LLM provider")
+    app.state.requests = 0
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        # Streaming requests get their first token quickly and the rest spread over the latency
+        await asyncio.sleep(latency * random.uniform(0.5, 1.5) * (0.1 if body.get("stream") else 1))
+
+        if random.random() < error_rate:
+            return JSONResponse(
+                status_code=random.choice([429, 529]),
+                headers={"retry-after": "0.2"},
+                content={"type": "error", "error": {"type": "overloaded_error", "message": "Mock overload"}}
+            )
+
+        prompt = body["messages"][-1]["content"]
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+        text = f"[mock {body['model']}] analysis of {len(prompt)} characters ({digest})"
+        if body.get("stream"):
+            return StreamingResponse(_stream_text(text, latency), media_type="text/event-stream")
+        return {
+            "id": f"msg_{digest}",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock of the LLM provider API")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=0.5, help="Mean response latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Share of requests answered with 429/529")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency, args.error_rate), host="127.0.0.1", port=args.port, log_level="warning")
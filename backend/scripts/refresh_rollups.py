@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import SessionLocal
+from app.data_version import bump_data_version
+from app.migrations import upgrade_database
+from app.risk_scores import refresh_risk_scores
+from app.rollups import refresh_rollups, refresh_topic_rollups
+
+
+if __name__ == "__main__":
+    upgrade_database()
+
+    db = SessionLocal()
+    try:
+        print("Rebuilding rollup tables...")
+        refresh_rollups(db)
+        refresh_topic_rollups(db)
+        print("Scoring LGU-years...")
+        refresh_risk_scores(db)
+        bump_data_version(db)
+        db.commit()
+        print("Rollup tables rebuilt")
+    except Exception as e:
+        print(f"Error refreshing rollups: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,55 @@
+"""Point the app at a scratch database before any test imports it.
+
+Set TEST_DATABASE_URL to run against a throwaway PostgreSQL database (the only way
+partition pruning is exercised); it is migrated, and loaded with synthetic rows if empty.
+Without it the tests use a temporary SQLite file.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+SCRATCH_DIR = Path(tempfile.mkdtemp(prefix="openaudit-tests-"))
+SYNTHETIC_ROWS = 30000
+
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{SCRATCH_DIR / 'openaudit.db'}"
+for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB"):
+    os.environ.setdefault(name, "openaudit")
+# Responses come from the database: no response cache, no in-memory columnar engine
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["COLUMNAR_ENGINE_ENABLED"] = "false"
+
+
+@pytest.fixture(scope="session")
+def loaded_database():
+    """Migrate the scratch database and, if it has no transactions yet, load a synthetic dataset."""
+    from sqlalchemy import func, select, text
+
+    from app import models
+    from app.database import engine
+    from app.migrations import upgrade_database
+    from benchmarks import synthetic
+
+    upgrade_database()
+    with engine.connect() as conn:
+        loaded = conn.scalar(select(func.count()).select_from(models.UnliquidatedTransaction))
+    if not loaded:
+        csv_path = SCRATCH_DIR / "synthetic.csv"
+        synthetic.generate(SYNTHETIC_ROWS, csv_path)
+        synthetic.load(csv_path)
+    # Plans depend on statistics; the loader leaves refreshing them to autovacuum
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return engine
+
+
+@pytest.fixture(scope="module")
+def client(loaded_database):
+    """The app, started once per test module against the loaded database."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,44 @@
+"""The in-memory engine's totals must equal the SQL path's exact NUMERIC sums."""
+from decimal import Decimal
+
+from app.columnar import TransactionColumns
+
+LGUS = [(1, "Aborlan", "Palawan"), (2, "Abra de Ilog", "Occidental Mindoro")]
+
+
+def test_sums_are_exact_beyond_float64_precision():
+    # 2**53 centavos is about 9e13 PHP; these groups total far more
+    amounts = [Decimal("9999999999999.99"), Decimal("0.01"), Decimal("1234567890123.45")] * 400
+    transactions = [(2015, 1 + i % 2, amount) for i, amount in enumerate(amounts)]
+    columns = TransactionColumns(transactions, LGUS, version=0)
+
+    totals = {row["province"]: row["total_amount"] for row in columns.province_totals()}
+    (year,) = columns.yearly()
+
+    assert year.total_amount == sum(amounts)
+    for lgu_id, _, province in LGUS:
+        expected = sum(amount for _, txn_lgu, amount in transactions if txn_lgu == lgu_id)
+        assert totals[province] == float(expected)
+
+
+def test_transactions_without_an_lgu_count_only_toward_the_year():
+    transactions = [(2015, 1, Decimal("100.00")), (2015, None, Decimal("50.00")), (2016, None, Decimal("7.50"))]
+    columns = TransactionColumns(transactions, LGUS, version=0)
+
+    years = {row.year: row for row in columns.yearly()}
+
+    assert years[2015].total_amount == Decimal("150.00")
+    assert (years[2015].transaction_count, years[2015].lgus_count) == (2, 1)
+    assert (years[2016].total_amount, years[2016].lgus_count) == (Decimal("7.50"), 0)
+    assert [row["total_amount"] for row in columns.province_totals()] == [100.0]
+
+
+def test_average_rounds_half_a_centavo_up_like_sql():
+    # 66.665 and -0.005: ROUND_HALF_EVEN would give 66.66 and -0.00
+    transactions = [
+        (2015, 1, Decimal("100.00")), (2015, 2, Decimal("33.33")),
+        (2016, 1, Decimal("-0.01")), (2016, 2, Decimal("0.00")),
+    ]
+    columns = TransactionColumns(transactions, LGUS, version=0)
+
+    assert [row.avg_amount for row in columns.yearly()] == [Decimal("66.67"), Decimal("-0.01")]
@@ -0,0 +1,34 @@
+"""Each dashboard panel is the same answer its standalone endpoint gives."""
+import pytest
+
+from app import histogram
+
+PANELS = [
+    ("stats", "/analytics/stats", {}),
+    ("yearly_trends", "/analytics/trends/yearly", {}),
+    ("province_totals", "/transactions/aggregate/by-province", {}),
+    ("top_lgus", "/transactions/top-lgus", {"limit": 7}),
+    ("amount_distribution", "/analytics/distribution/amount-ranges", {}),
+    ("province_year_heatmap", "/analytics/heatmap/province-year", {}),
+]
+
+
+@pytest.fixture(scope="module")
+def dashboard(client):
+    response = client.get("/analytics/dashboard", params={"top_lgus_limit": 7})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.parametrize("panel, path, params", PANELS, ids=[panel for panel, _, _ in PANELS])
+def test_panel_matches_its_endpoint(client, dashboard, panel, path, params):
+    response = client.get(path, params=params)
+
+    assert response.status_code == 200
+    assert dashboard[panel] == response.json()
+
+
+def test_dashboard_has_every_panel(dashboard):
+    assert set(dashboard) == {panel for panel, _, _ in PANELS}
+    assert len(dashboard["top_lgus"]) == 7
+    assert [bucket["min"] for bucket in dashboard["amount_distribution"]] == histogram.DEFAULT_EDGES
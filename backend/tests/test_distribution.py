@@ -0,0 +1,36 @@
+"""The amount histogram counts every transaction once and rejects edges it cannot bucket."""
+import pytest
+from sqlalchemy import func, select
+
+from app import models
+
+
+def test_buckets_cover_every_transaction(client, loaded_database):
+    txn = models.UnliquidatedTransaction
+    with loaded_database.connect() as conn:
+        count, below = conn.execute(select(func.count(txn.id), func.count(txn.id).filter(txn.amount < 1000))).one()
+
+    response = client.get("/analytics/distribution/amount-ranges", params={"edges": "1000,50000,250000"})
+
+    assert response.status_code == 200
+    assert [bucket["min"] for bucket in response.json()] == [1000, 50000, 250000]
+    assert sum(bucket["count"] for bucket in response.json()) == count - below
+
+
+def test_log_scale_with_two_buckets(client):
+    response = client.get("/analytics/distribution/amount-ranges", params={"scale": "log", "buckets": 2})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert response.json()[-1]["max"] is None
+
+
+@pytest.mark.parametrize("edges", ["0", "nan", "0,inf", "0,100,100", "0,ten"])
+def test_edges_that_cannot_be_bucketed_are_rejected(client, edges):
+    response = client.get("/analytics/distribution/amount-ranges", params={"edges": edges})
+    assert response.status_code == 400
+
+
+def test_a_single_log_bucket_is_rejected(client):
+    response = client.get("/analytics/distribution/amount-ranges", params={"scale": "log", "buckets": 1})
+    assert response.status_code == 422
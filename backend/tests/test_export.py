@@ -0,0 +1,57 @@
+"""Every export format reads back to the rows /transactions/ lists for the same filters."""
+import csv
+import io
+import json
+from decimal import Decimal
+
+import pyarrow.parquet as pq
+import pytest
+
+from app.export import EXPORT_BATCH_SIZE, EXPORT_COLUMNS
+
+# Enough rows for several export batches
+FILTERS = {"min_amount": 50000}
+
+
+@pytest.fixture(scope="module")
+def listed(client):
+    """(id, amount) of every transaction /transactions/ returns for FILTERS, by id."""
+    rows, cursor = [], None
+    while True:
+        response = client.get("/transactions/", params={**FILTERS, "limit": 1000, **({"cursor": cursor} if cursor else {})})
+        rows += [(row["id"], Decimal(str(row["amount"]))) for row in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows
+
+
+def read_csv(content: bytes):
+    reader = csv.DictReader(io.StringIO(content.decode()))
+    assert reader.fieldnames == EXPORT_COLUMNS
+    return [(int(row["id"]), Decimal(row["amount"])) for row in reader]
+
+
+def read_ndjson(content: bytes):
+    records = [json.loads(line) for line in content.decode().splitlines()]
+    assert all(list(record) == EXPORT_COLUMNS for record in records)
+    return [(record["id"], Decimal(str(record["amount"]))) for record in records]
+
+
+def read_parquet(content: bytes):
+    table = pq.read_table(io.BytesIO(content))
+    assert table.column_names == EXPORT_COLUMNS
+    return list(zip(table.column("id").to_pylist(), table.column("amount").to_pylist()))
+
+
+@pytest.mark.parametrize("fmt, read", [("csv", read_csv), ("ndjson", read_ndjson), ("parquet", read_parquet)])
+def test_export_matches_the_listing(client, listed, fmt, read):
+    response = client.get("/transactions/export", params={**FILTERS, "format": fmt})
+
+    assert response.status_code == 200
+    assert f"transactions.{fmt}" in response.headers["content-disposition"]
+    assert len(listed) > EXPORT_BATCH_SIZE
+    assert read(response.content) == listed
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.get("/transactions/export", params={"format": "xlsx"}).status_code == 422
@@ -0,0 +1,135 @@
+"""Filenames, amounts and findings are read the way extraction1.R read them, and extracted
+reports replace the CSV rows of their LGU-year."""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.extraction import (
+    ExtractedDocument, FileInfo, findings_section, keyword_in_context, parse_amount, parse_filename
+)
+from scripts import extract_reports
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("Aborlan_Palawan_ES2015.pdf", FileInfo("Aborlan", "Palawan", 2015)),
+    ("NewLucena_Iloilo_ES2016.pdf", FileInfo("New Lucena", "Iloilo", 2016)),
+    ("SanJosede Buenavista-Executive-Summary_Antique_2017.pdf", FileInfo("San Jose de Buenavista", "Antique", 2017)),
+    ("Sta Cruz_LU_ES2014.pdf", FileInfo("Sta. Cruz", "La Union", 2014)),
+    ("Bacolod-City_NegOcc_ES2018.pdf", FileInfo("Bacolod City", "Negros Occidental", 2018)),
+    ("Gen-Santos-City-executive_SoCot_ES2013.pdf", FileInfo("Gen Santos City", "South Cotabato", 2013)),
+    ("QuezonCity-Executive-Summary2015.pdf", FileInfo("Quezon City", None, 2015)),
+])
+def test_filenames_follow_the_r_rules(filename, expected):
+    assert parse_filename(filename) == expected
+
+
+@pytest.mark.parametrize("filename", ["report.pdf", "Aborlan_Palawan.pdf", "2015.pdf"])
+def test_unrecognized_filenames_lack_an_lgu_or_year(filename):
+    info = parse_filename(filename)
+    assert not (info.lgu and info.year)
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("balance of P1,234.56 remains", Decimal("1234.56")),
+    ("₱ 1234.5 was granted", Decimal("1234.5")),
+    ("P 50 only", Decimal("50")),
+    ("totalling P1,000,000.00.", Decimal("1000000.00")),
+    ("first P10.00 then P20.00", Decimal("10.00")),
+    ("PHP 1,000", Decimal(0)),
+    ("UP100.00 is a code, not an amount", Decimal(0)),
+    ("broken P12,34 grouping", Decimal(0)),
+    ("no amount here", Decimal(0)),
+])
+def test_first_peso_amount_is_parsed(text, amount):
+    assert parse_amount(text) == amount
+
+
+def test_keyword_hits_sum_amounts_on_both_sides():
+    text = (
+        "Cash advances of P12,500.00 remained unliquidated, including P3,000.00 for travel. "
+        "Other UNLIQUIDATED: items were listed. "
+        "Any unliquidated balance without an amount is not a hit."
+    )
+
+    hits = keyword_in_context(text, window=5)
+
+    # The second keyword still sees P3,000.00 within five words; the third sees no amount
+    assert [hit.amount for hit in hits] == [Decimal("15500.00"), Decimal("3000.00")]
+    assert hits[0].context_pre == "Cash advances of P12,500.00 remained"
+    assert hits[0].context_post.startswith("including P3,000.00 for travel.")
+
+
+def test_findings_section_runs_to_the_next_heading():
+    text = (
+        "I. INTRODUCTION\nThe municipality...\n"
+        "II. Summary of Significant Audit Observations\nCash advances were not liquidated.\n"
+        "III. STATUS OF IMPLEMENTATION OF PRIOR YEAR'S RECOMMENDATIONS\nNone.\n"
+    )
+
+    assert findings_section(text) == "II. Summary of Significant Audit Observations\nCash advances were not liquidated."
+    assert findings_section("No headings at all") is None
+
+
+def test_unrecognized_files_are_never_hashed(tmp_path, monkeypatch):
+    for name in ("Aborlan_Palawan_ES2015.pdf", "scan0001.pdf", "notes.txt"):
+        (tmp_path / name).write_bytes(name.encode())
+    hashed = []
+    monkeypatch.setattr(extract_reports, "file_hash", lambda path: hashed.append(path.name) or path.name)
+
+    pending, skipped, unnamed = extract_reports.find_pending(tmp_path, processed=set(), force=False)
+    assert list(pending.values()) == [tmp_path / "Aborlan_Palawan_ES2015.pdf"]
+    assert (skipped, unnamed) == (0, 1)
+    assert hashed == ["Aborlan_Palawan_ES2015.pdf"]
+
+    pending, skipped, _ = extract_reports.find_pending(tmp_path, processed={"Aborlan_Palawan_ES2015.pdf"}, force=False)
+    assert (pending, skipped) == ({}, 1)
+
+
+@pytest.fixture
+def csv_loaded_lgu(loaded_database):
+    """An LGU whose 2015 and 2016 rows came from the CSV, removed with everything written for it."""
+    txn = models.UnliquidatedTransaction
+    with Session(loaded_database) as db:
+        lgu = models.LocalGovernment(name="Quillville", province="Palawan")
+        db.add(lgu)
+        db.flush()
+        db.add_all([
+            txn(lgu_id=lgu.id, province="Palawan", year=year, amount=Decimal("10.00"), source_seq=0)
+            for year in (2015, 2016)
+        ])
+        db.commit()
+        lgu_id = lgu.id
+
+    yield lgu_id
+
+    with Session(loaded_database) as db:
+        db.execute(delete(txn).where(txn.lgu_id == lgu_id))
+        db.execute(delete(models.AuditReport).where(models.AuditReport.lgu_id == lgu_id))
+        db.execute(delete(models.LocalGovernment).where(models.LocalGovernment.id == lgu_id))
+        db.commit()
+
+
+def test_extracted_report_replaces_its_lgu_years_csv_rows(loaded_database, csv_loaded_lgu):
+    txn = models.UnliquidatedTransaction
+    document = ExtractedDocument(
+        path="/reports/Quillville_Palawan_ES2015.pdf",
+        content_hash="0" * 64,
+        raw_text="Cash advances of P500.00 remained unliquidated.",
+        hits=keyword_in_context("Cash advances of P500.00 remained unliquidated."),
+    )
+    years, lgu_ids = set(), set()
+
+    with Session(loaded_database) as db:
+        written = extract_reports._write_batch(
+            db, [document], extract_reports.LGUResolver(db), years, lgu_ids, topics=None
+        )
+        rows = db.execute(
+            select(txn.year, txn.amount, txn.report_id.isnot(None)).where(txn.lgu_id == csv_loaded_lgu).order_by(txn.year)
+        ).all()
+
+    assert written == 1
+    assert (years, lgu_ids) == ({2015}, {csv_loaded_lgu})
+    assert rows == [(2015, Decimal("500.00"), True), (2016, Decimal("10.00"), False)]
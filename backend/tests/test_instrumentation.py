@@ -0,0 +1,87 @@
+"""Requests answered before routing are still labelled by their route template, and
+statements are timed and counted per request."""
+import asyncio
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.responses import JSONResponse
+
+from app.instrumentation import InstrumentationMiddleware, MetricsRegistry, RequestStats, _current, instrument_engine, logger
+
+
+class ShortCircuit:
+    """Answers /lgus/... itself, as the response cache does on a hit."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/lgus/"):
+            await JSONResponse({"cached": True})(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+def build_app(registry):
+    app = FastAPI()
+
+    @app.get("/lgus/{lgu_id}")
+    async def get_lgu(lgu_id: int):
+        return {"id": lgu_id}
+
+    app.add_middleware(ShortCircuit)
+    app.add_middleware(InstrumentationMiddleware, registry=registry)
+    return app
+
+
+def test_cache_hits_use_the_route_template():
+    registry = MetricsRegistry()
+    with TestClient(build_app(registry)) as client:
+        for lgu_id in (1, 2, 3):
+            assert client.get(f"/lgus/{lgu_id}").json() == {"cached": True}
+        assert client.get("/nowhere/7").status_code == 404
+
+    routes = {labels[1] for labels in registry.requests._values}
+    assert routes == {"/lgus/{lgu_id}", "unmatched"}
+
+
+def test_echo_sampling_configures_the_sql_logger(monkeypatch):
+    monkeypatch.setattr(logger, "handlers", [])
+    monkeypatch.setattr(logging.getLogger(), "handlers", [])
+    monkeypatch.setattr(logger, "level", logging.NOTSET)
+
+    InstrumentationMiddleware(FastAPI(), echo_sample_rate=0.5)
+
+    assert logger.isEnabledFor(logging.INFO)
+    assert logger.handlers
+
+
+def test_statements_are_counted_and_failures_leave_nothing_behind(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stats.db'}")
+    instrument_engine(engine.sync_engine)
+    stats = RequestStats()
+
+    async def run():
+        token = _current.set(stats)
+        try:
+            async with engine.connect() as conn:
+                for _ in range(3):
+                    with pytest.raises(OperationalError):
+                        await conn.execute(text("SELECT * FROM missing"))
+                result = await conn.execute(text("SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3"))
+                raw = await conn.get_raw_connection()
+                return result.all(), dict(raw.info)
+        finally:
+            _current.reset(token)
+            await engine.dispose()
+
+    rows, info = asyncio.run(run())
+
+    assert len(rows) == 3
+    assert (stats.queries, stats.rows) == (1, 3)
+    assert not info
@@ -0,0 +1,107 @@
+"""An LGU's detail page totals every transaction in SQL, pages its transactions and reports by
+keyset, and returns report text and context only when asked for."""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app import models
+
+TRANSACTIONS = [
+    # year, amount
+    (2015, Decimal("100.50")), (2015, Decimal("200.25")), (2015, Decimal("50.00")),
+    (2016, Decimal("1000.00")), (2016, Decimal("0.75")),
+    (2018, Decimal("42.00")),
+]
+REPORT_YEARS = [2015, 2016, 2018]
+
+
+@pytest.fixture(scope="module")
+def lgu(loaded_database):
+    txn = models.UnliquidatedTransaction
+    with Session(loaded_database) as db:
+        lgu = models.LocalGovernment(name="Quillville", province="Quillprov")
+        db.add(lgu)
+        db.flush()
+        db.add_all([
+            models.AuditReport(
+                lgu_id=lgu.id, year=year, raw_text=f"Full text {year}", findings_text=f"Findings {year}"
+            )
+            for year in REPORT_YEARS
+        ])
+        db.add_all([
+            txn(
+                lgu_id=lgu.id, province=lgu.province, year=year, amount=amount, source_seq=seq,
+                context_pre="Cash advances of", context_post="remained unliquidated"
+            )
+            for seq, (year, amount) in enumerate(TRANSACTIONS)
+        ])
+        db.commit()
+        lgu_id = lgu.id
+
+    yield lgu_id
+
+    with Session(loaded_database) as db:
+        db.execute(delete(txn).where(txn.lgu_id == lgu_id))
+        db.execute(delete(models.AuditReport).where(models.AuditReport.lgu_id == lgu_id))
+        db.execute(delete(models.LocalGovernment).where(models.LocalGovernment.id == lgu_id))
+        db.commit()
+
+
+def walk(client, lgu_id, collection, limit):
+    """Every page of one sub-collection, following its next cursor."""
+    rows, cursor = [], None
+    while True:
+        params = {f"{collection}_limit": limit, **({f"{collection}_cursor": cursor} if cursor else {})}
+        body = client.get(f"/lgus/{lgu_id}", params=params).json()
+        assert len(body[collection]) <= limit
+        rows += body[collection]
+        cursor = body[f"{collection}_next_cursor"]
+        if not cursor:
+            return rows
+
+
+def test_totals_cover_every_transaction(client, lgu):
+    body = client.get(f"/lgus/{lgu}", params={"transactions_limit": 1}).json()
+
+    assert [(row["year"], Decimal(str(row["total_amount"])), row["transaction_count"]) for row in body["by_year"]] == [
+        (2015, Decimal("350.75"), 3), (2016, Decimal("1000.75"), 2), (2018, Decimal("42.00"), 1)
+    ]
+    assert Decimal(str(body["total_unliquidated"])) == sum(amount for _, amount in TRANSACTIONS)
+    assert body["years_with_data"] == [2015, 2016, 2018]
+    assert (body["transaction_count"], body["report_count"]) == (len(TRANSACTIONS), len(REPORT_YEARS))
+    assert len(body["transactions"]) == 1
+
+
+def test_sub_collections_are_paged_by_keyset(client, lgu):
+    transactions = walk(client, lgu, "transactions", limit=4)
+    reports = walk(client, lgu, "reports", limit=2)
+
+    assert [row["year"] for row in transactions] == [year for year, _ in TRANSACTIONS]
+    assert len({row["id"] for row in transactions}) == len(TRANSACTIONS)
+    assert [row["year"] for row in reports] == sorted(REPORT_YEARS, reverse=True)
+    assert client.get(f"/lgus/{lgu}", params={"reports_cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_heavy_fields_are_left_out_by_default(client, lgu):
+    body = client.get(f"/lgus/{lgu}").json()
+
+    assert all(report["raw_text"] is None and report["findings_text"] is None for report in body["reports"])
+    assert all(row["context_pre"] is None and row["context_post"] is None for row in body["transactions"])
+
+
+def test_include_returns_only_the_named_fields(client, lgu):
+    body = client.get(f"/lgus/{lgu}", params={"include": "raw_text, context"}).json()
+
+    assert [report["raw_text"] for report in body["reports"]] == ["Full text 2018", "Full text 2016", "Full text 2015"]
+    assert all(report["findings_text"] is None for report in body["reports"])
+    assert all(row["context_post"] == "remained unliquidated" for row in body["transactions"])
+
+
+def test_unknown_include_fields_are_rejected(client, lgu):
+    response = client.get(f"/lgus/{lgu}", params={"include": "raw_text,amounts,files"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown include fields: amounts, files"
+    assert client.get("/lgus/999999999").status_code == 404
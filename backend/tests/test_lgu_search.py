@@ -0,0 +1,48 @@
+"""Autocomplete finds the same candidates on every backend."""
+import pytest
+from sqlalchemy import select
+
+from app import models
+from app.database import AsyncSessionLocal
+from app.lgu_search import TrigramIndex, search_lgus
+from app.main import app
+
+
+@pytest.mark.parametrize("query", ["Ab", "Za", "Ili", "Abor", "Quez", "Aborlan 2"])
+def test_prefix_matches_rank_first(query, client, loaded_database):
+    with loaded_database.connect() as conn:
+        prefixed = set(conn.scalars(
+            select(models.LocalGovernment.id).where(models.LocalGovernment.name.istartswith(query))
+        ))
+    assert 0 < len(prefixed) <= 50
+
+    response = client.get("/lgus/search/autocomplete", params={"q": query, "limit": 50})
+    assert {hit["id"] for hit in response.json()[:len(prefixed)]} == prefixed
+
+
+def test_typos_above_the_threshold_match(client):
+    # word_similarity 0.54: above SIMILARITY_THRESHOLD, below pg_trgm's default of 0.6
+    response = client.get("/lgus/search/autocomplete", params={"q": "Zambuanga", "limit": 10})
+    assert any(hit["name"].startswith("Zamboanga") for hit in response.json())
+
+
+@pytest.mark.parametrize("query", ["Ab", "Zambuanga", "Palawan", "Mindoro", "Quezon City", "San Jse", "Ilocos Sur"])
+def test_postgresql_matches_the_in_process_index(query, client, loaded_database):
+    if loaded_database.dialect.name != "postgresql":
+        pytest.skip("SQLite always searches through the in-process index")
+
+    with loaded_database.connect() as conn:
+        rows = conn.execute(select(
+            models.LocalGovernment.id, models.LocalGovernment.name, models.LocalGovernment.province
+        )).all()
+    index = TrigramIndex(rows)
+
+    async def search(limit):
+        async with AsyncSessionLocal() as db:
+            return await search_lgus(db, query, limit)
+
+    # On the app's event loop, which owns the pooled asyncpg connections
+    everything = client.portal.call(search, len(rows))
+    assert {hit.id for hit in everything} == {hit.id for hit in index.search(query, len(rows))}
+    # A short page is cut in the same order, ties included
+    assert client.portal.call(search, 10) == index.search(query, 10)
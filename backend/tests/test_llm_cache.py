@@ -0,0 +1,90 @@
+"""Stored analyses are served again only for the same target, and never as placeholder output;
+a hit is found before any context is built."""
+import uuid
+
+import pytest
+
+from app import llm_service
+from app.config import settings
+from app.llm_providers import MockProvider, PlaceholderProvider, provider_pool
+
+
+@pytest.fixture
+def request_body():
+    # A prompt no earlier run has cached, since TEST_DATABASE_URL may be reused
+    return {"analysis_type": "risk_assessment", "custom_prompt": f"Summarize the balances ({uuid.uuid4()})"}
+
+
+def test_same_prompt_for_another_lgu_is_a_miss(client, request_body, monkeypatch):
+    monkeypatch.setattr(provider_pool, "provider", MockProvider())
+
+    first = client.post("/llm/analyze", json={**request_body, "lgu_id": 1})
+    again = client.post("/llm/analyze", json={**request_body, "lgu_id": 1})
+    other = client.post("/llm/analyze", json={**request_body, "lgu_id": 2})
+
+    assert first.headers["X-LLM-Cache"] == "miss"
+    assert again.headers["X-LLM-Cache"] == "hit"
+    assert again.json()["id"] == first.json()["id"]
+    assert other.headers["X-LLM-Cache"] == "miss"
+    assert other.json()["lgu_id"] == 2
+
+
+def test_placeholder_output_is_not_cached(client, request_body, monkeypatch):
+    monkeypatch.setattr(settings, "anthropic_api_key", "test")
+    monkeypatch.setattr(provider_pool, "provider", PlaceholderProvider())
+
+    first = client.post("/llm/analyze", json={**request_body, "lgu_id": 1})
+    assert first.json()["response"].startswith("[LLM Analysis Placeholder")
+
+    monkeypatch.setattr(provider_pool, "provider", MockProvider())
+    real = client.post("/llm/analyze", json={**request_body, "lgu_id": 1})
+    assert real.headers["X-LLM-Cache"] == "miss"
+    assert real.json()["response"].startswith("[mock")
+
+
+@pytest.fixture
+def built_contexts(monkeypatch):
+    targets = []
+    build_context = llm_service.build_context
+
+    async def recording_build_context(db, report_id, lgu_id, analysis_type, model):
+        targets.append(lgu_id)
+        return await build_context(db, report_id, lgu_id, analysis_type, model)
+
+    monkeypatch.setattr(llm_service, "build_context", recording_build_context)
+    return targets
+
+
+def test_hits_build_no_context(client, built_contexts, monkeypatch):
+    monkeypatch.setattr(provider_pool, "provider", MockProvider())
+    # A model name no earlier run has cached analyses for
+    body = {"analysis_type": "risk_assessment", "model": f"mock-{uuid.uuid4()}", "lgu_id": 1}
+
+    first = client.post("/llm/analyze", json=body)
+    again = client.post("/llm/analyze", json=body)
+    streamed = client.post("/llm/analyze/stream", json=body)
+
+    assert first.headers["X-LLM-Cache"] == "miss"
+    assert again.headers["X-LLM-Cache"] == streamed.headers["X-LLM-Cache"] == "hit"
+    assert built_contexts == [1]
+
+
+def test_custom_prompts_build_no_context(client, request_body, built_contexts, monkeypatch):
+    monkeypatch.setattr(provider_pool, "provider", MockProvider())
+
+    analysis = client.post("/llm/analyze", json={**request_body, "lgu_id": 1})
+    missing = client.post("/llm/analyze", json={**request_body, "lgu_id": 10 ** 9})
+
+    assert analysis.json()["prompt"] == request_body["custom_prompt"]
+    assert missing.status_code == 404
+    assert built_contexts == []
+
+
+def test_unconfigured_provider_is_reported_first(client, request_body, built_contexts, monkeypatch):
+    monkeypatch.setattr(settings, "anthropic_api_key", None)
+    monkeypatch.setattr(settings, "openai_api_key", None)
+    monkeypatch.setattr(provider_pool, "provider", PlaceholderProvider())
+
+    for path in ("/llm/analyze", "/llm/analyze/stream"):
+        assert client.post(path, json={"analysis_type": "risk_assessment", "lgu_id": 10 ** 9}).status_code == 503
+    assert built_contexts == []
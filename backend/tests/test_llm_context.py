@@ -0,0 +1,141 @@
+"""Report text is chunked and packed into the token budget; what does not fit verbatim is
+summarized once per chunk, or listed as omitted when it cannot be summarized."""
+import asyncio
+import uuid
+
+import pytest
+
+from app import llm_context
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.llm_context import chunk_text, estimate_tokens, pack_text, summarize_chunks
+from app.llm_providers import MockProvider, TokenBucket, provider_pool
+
+SECTIONS = {
+    "I. INTRODUCTION": "The audit covered the accounts of the municipality for the year. " * 12,
+    "II. SCOPE AND OBJECTIVES": "The audit was conducted in accordance with applicable standards. " * 12,
+    "III. AUDIT OBSERVATIONS AND RECOMMENDATIONS": (
+        "Cash advances of P125,000.00 remained unliquidated beyond the period required by COA Circular 97-002. "
+        "We recommend that management require the officers to liquidate them. "
+    ) * 10,
+    "IV. STATUS OF IMPLEMENTATION OF PRIOR YEAR'S RECOMMENDATIONS": (
+        "Of the 12 recommendations, 5 were implemented and 7 were not implemented. "
+    ) * 10,
+    "V. ACKNOWLEDGMENT": "We thank the officials and staff for their cooperation. " * 12,
+}
+REPORT = "\n\n".join(f"{heading}\n{body.strip()}" for heading, body in SECTIONS.items())
+
+
+class CountingProvider(MockProvider):
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, model: str, analysis_type: str, prompt: str) -> str:
+        self.calls += 1
+        return await super().complete(model, analysis_type, prompt)
+
+
+@pytest.fixture
+def provider(loaded_database, monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(provider_pool, "provider", provider)
+    monkeypatch.setattr(provider_pool, "_bucket", TokenBucket(rate=1000, capacity=1000))
+    monkeypatch.setattr(settings, "llm_mock_latency_seconds", 0)
+    monkeypatch.setattr(settings, "llm_context_chunk_tokens", 60)
+    return provider
+
+
+@pytest.fixture
+def model():
+    # A model name no earlier run has cached summaries for, since TEST_DATABASE_URL may be reused
+    return f"mock-{uuid.uuid4()}"
+
+
+def run(call):
+    """Await call(db) on a fresh session and engine pool."""
+    async def main():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await call(db)
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_chunks_keep_their_heading_and_fit_the_chunk_size():
+    chunks = chunk_text(REPORT, max_tokens=60)
+
+    assert all(chunk.tokens <= 60 for chunk in chunks)
+    assert [chunk.position for chunk in chunks] == list(range(len(chunks)))
+    assert list(dict.fromkeys(chunk.heading for chunk in chunks)) == list(SECTIONS)
+    for heading, body in SECTIONS.items():
+        words = " ".join(chunk.text for chunk in chunks if chunk.heading == heading).split()
+        assert words == body.split()
+
+
+def test_text_that_fits_is_kept_verbatim(provider, model):
+    result = run(lambda db: pack_text(db, REPORT, "risk_assessment", model, budget=10000))
+
+    assert result.text.split() == REPORT.split()
+    assert (result.summarized_chunks, result.omitted, provider.calls) == (0, [], 0)
+
+
+def test_without_summaries_the_rest_is_listed_by_heading(provider, model, monkeypatch):
+    monkeypatch.setattr(settings, "llm_context_summarize", False)
+    budget = 300
+
+    result = run(lambda db: pack_text(db, REPORT, "risk_assessment", model, budget=budget))
+
+    assert result.tokens <= budget
+    assert provider.calls == 0
+    # Observations rank first for a risk assessment; boilerplate is what gets left out
+    assert "Cash advances of P125,000.00" in result.text
+    assert "I. INTRODUCTION" in result.omitted and "V. ACKNOWLEDGMENT" in result.omitted
+    assert f"sections: {'; '.join(result.omitted)}]" in result.text
+
+
+def test_summaries_fit_the_budget_and_are_reused(provider, model):
+    budget = 300
+
+    first = run(lambda db: pack_text(db, REPORT, "risk_assessment", model, budget=budget))
+    calls = provider.calls
+    again = run(lambda db: pack_text(db, REPORT, "risk_assessment", model, budget=budget))
+
+    assert first.tokens <= budget
+    assert first.summarized_chunks > 0 and first.omitted == []
+    assert "Summaries of the remaining sections:" in first.text
+    assert calls >= first.summarized_chunks
+    assert again.text == first.text
+    assert provider.calls == calls
+
+
+def test_stored_summaries_are_not_requested_again(provider, model):
+    texts = ["First excerpt.", "Second excerpt.", "First excerpt."]
+
+    first = run(lambda db: summarize_chunks(db, texts[:2], model, "summary", 50))
+    assert provider.calls == 2
+    again = run(lambda db: summarize_chunks(db, texts, model, "summary", 50))
+
+    assert provider.calls == 2
+    assert again == first + first[:1]
+
+
+def test_reduce_merges_summaries_until_they_fit(provider, model):
+    chunks = chunk_text(REPORT, max_tokens=60)
+    # Mock summaries have one length whatever is asked, so only merging can fit them
+    size = estimate_tokens(run(lambda db: summarize_chunks(db, ["x"], model, "summary", 50))[0])
+    budget = size * len(chunks) // 3
+    provider.calls = 0
+
+    summaries = run(lambda db: llm_context._map_reduce(db, chunks, model, "risk_assessment", budget))
+    calls = provider.calls
+    again = run(lambda db: llm_context._map_reduce(db, chunks, model, "risk_assessment", budget))
+
+    assert sum(estimate_tokens(summary) for summary in summaries) <= budget
+    assert len(summaries) < len(chunks)
+    # One call per distinct chunk, then more for each reduce round
+    assert calls > len({(chunk.heading, chunk.text) for chunk in chunks})
+    # Every round's summaries were stored, so the same chunks cost no provider calls
+    assert again == summaries
+    assert provider.calls == calls
@@ -0,0 +1,108 @@
+"""Job progress is written while a job runs, and a page's contexts are built concurrently."""
+import asyncio
+import uuid
+
+from sqlalchemy import func, select
+
+from app import llm_jobs, llm_service, models
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.llm_providers import MockProvider, TokenBucket, provider_pool
+
+
+class StaggeredProvider(MockProvider):
+    """Answers the n-th call after n * 50 ms, so items finish one by one."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, model: str, analysis_type: str, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.calls * 0.05)
+        return f"analysis {self.calls}"
+
+
+def test_small_job_reports_progress_before_it_finishes(loaded_database, monkeypatch):
+    monkeypatch.setattr(provider_pool, "provider", StaggeredProvider())
+    monkeypatch.setattr(settings, "llm_progress_interval_seconds", 0.1)
+    flushed = []
+    flush = llm_jobs._flush
+
+    async def recording_flush(job_id, results):
+        flushed.append(len(results))
+        await flush(job_id, results)
+
+    monkeypatch.setattr(llm_jobs, "_flush", recording_flush)
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            # A prompt no earlier run has cached, since TEST_DATABASE_URL may be reused
+            prompt = f"Summarize the balances ({uuid.uuid4()})"
+            job = await llm_jobs.create_job(db, "risk_assessment", "mock", prompt, list(range(1, 9)), [])
+        await llm_jobs.run_job(job.id)
+        async with AsyncSessionLocal() as db:
+            job = await db.get(models.LLMJob, job.id)
+        await async_engine.dispose()
+        return job
+
+    job = asyncio.run(run())
+
+    assert job.status == "completed"
+    assert job.completed_items == 8
+    assert len([size for size in flushed if size]) > 1
+    assert max(flushed) < settings.llm_batch_insert_size
+
+
+def test_contexts_for_a_page_are_built_concurrently(loaded_database, monkeypatch):
+    monkeypatch.setattr(provider_pool, "provider", MockProvider())
+    # Dozens of summaries; the point is their overlap, not the rate limit
+    monkeypatch.setattr(provider_pool, "_bucket", TokenBucket(rate=1000, capacity=1000))
+    # Small enough that every LGU's context is map-reduce summarized through the provider
+    monkeypatch.setattr(settings, "llm_context_token_budget", 60)
+    monkeypatch.setattr(settings, "llm_context_chunk_tokens", 40)
+    building = []
+    peak = 0
+    build_context = llm_service.build_context
+
+    async def recording_build_context(db, report_id, lgu_id, analysis_type, model):
+        nonlocal peak
+        building.append(lgu_id)
+        peak = max(peak, len(building))
+        try:
+            return await build_context(db, report_id, lgu_id, analysis_type, model)
+        finally:
+            building.remove(lgu_id)
+
+    monkeypatch.setattr(llm_service, "build_context", recording_build_context)
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            # A model name no earlier run has cached summaries for
+            job = await llm_jobs.create_job(db, "risk_assessment", f"mock-{uuid.uuid4()}", None, list(range(1, 9)), [])
+        await llm_jobs.run_job(job.id)
+        async with AsyncSessionLocal() as db:
+            job = await db.get(models.LLMJob, job.id)
+        await async_engine.dispose()
+        return job
+
+    job = asyncio.run(run())
+
+    assert job.completed_items == 8
+    assert 1 < peak <= settings.llm_max_concurrency
+
+
+def test_unknown_targets_are_rejected_before_the_job_exists(client, loaded_database):
+    with loaded_database.connect() as conn:
+        jobs = conn.scalar(select(func.count()).select_from(models.LLMJob))
+
+    response = client.post("/llm/jobs", json={
+        "analysis_type": "risk_assessment",
+        "lgu_ids": [1, 10 ** 9],
+        "report_ids": [10 ** 9 + 1]
+    })
+
+    assert response.status_code == 404
+    assert response.json()["detail"]["lgu_ids"] == [10 ** 9]
+    assert response.json()["detail"]["report_ids"] == [10 ** 9 + 1]
+    with loaded_database.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(models.LLMJob)) == jobs
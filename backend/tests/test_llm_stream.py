@@ -0,0 +1,91 @@
+"""/llm/analyze/stream sends "token" events then "done" with the stored analysis, replays a
+stored analysis on a hit, and ends with "error" when the provider fails."""
+import json
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+
+from app import models
+from app.config import settings
+from app.llm_providers import LLMProviderError, MockProvider, provider_pool
+
+
+class FailingProvider(MockProvider):
+    """Streams one token, then fails the way an upstream API error surfaces."""
+
+    async def stream(self, model: str, analysis_type: str, prompt: str):
+        yield "Partial"
+        raise LLMProviderError("upstream closed the stream")
+
+
+def events(response):
+    """(event, data) pairs of a text/event-stream body."""
+    parsed = []
+    for block in response.text.split("\n\n"):
+        if block:
+            fields = dict(line.split(": ", 1) for line in block.splitlines())
+            parsed.append((fields["event"], json.loads(fields["data"])))
+    return parsed
+
+
+@pytest.fixture
+def body():
+    # A model name no earlier run has cached analyses for, since TEST_DATABASE_URL may be reused
+    return {"analysis_type": "risk_assessment", "model": f"mock-{uuid.uuid4()}", "lgu_id": 1}
+
+
+@pytest.fixture(autouse=True)
+def fast_mock(monkeypatch):
+    monkeypatch.setattr(settings, "llm_mock_latency_seconds", 0)
+
+
+def stored(loaded_database, model):
+    with loaded_database.connect() as conn:
+        return conn.scalar(
+            select(func.count()).select_from(models.LLMAnalysis).where(models.LLMAnalysis.model_name == model)
+        )
+
+
+def test_tokens_then_the_stored_analysis(client, loaded_database, body, monkeypatch):
+    monkeypatch.setattr(provider_pool, "provider", MockProvider())
+
+    response = client.post("/llm/analyze/stream", json=body)
+    stream = events(response)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["X-LLM-Cache"] == "miss"
+    assert [event for event, _ in stream] == ["token"] * (len(stream) - 1) + ["done"]
+    assert len(stream) > 2
+    done = stream[-1][1]
+    assert "".join(data["text"] for _, data in stream[:-1]) == done["response"]
+    assert done["response"].startswith(f"[mock {body['model']}]")
+    assert (done["lgu_id"], done["analysis_type"]) == (1, "risk_assessment")
+
+    assert stored(loaded_database, body["model"]) == 1
+    assert client.get(f"/llm/analyses/{done['id']}").json()["response"] == done["response"]
+    again = client.post("/llm/analyze", json=body)
+    assert again.headers["X-LLM-Cache"] == "hit"
+    assert again.json()["id"] == done["id"]
+
+
+def test_a_hit_is_replayed_without_the_provider(client, loaded_database, body, monkeypatch):
+    monkeypatch.setattr(provider_pool, "provider", MockProvider())
+    analysis = client.post("/llm/analyze", json=body).json()
+    monkeypatch.setattr(provider_pool, "provider", FailingProvider())
+
+    response = client.post("/llm/analyze/stream", json=body)
+
+    assert response.headers["X-LLM-Cache"] == "hit"
+    assert events(response) == [("token", {"text": analysis["response"]}), ("done", analysis)]
+    assert stored(loaded_database, body["model"]) == 1
+
+
+def test_provider_failure_ends_with_an_error_event(client, loaded_database, body, monkeypatch):
+    monkeypatch.setattr(provider_pool, "provider", FailingProvider())
+
+    response = client.post("/llm/analyze/stream", json=body)
+
+    assert response.status_code == 200
+    assert events(response) == [("token", {"text": "Partial"}), ("error", {"detail": "upstream closed the stream"})]
+    assert stored(loaded_database, body["model"]) == 0
@@ -0,0 +1,58 @@
+"""Loading a file that overlaps loaded rows either appends all of it or writes nothing."""
+import sqlite3
+
+from test_migrations import run
+
+CSV = (
+    "lgu,province,year,unliquidated\n"
+    "Aborlan,Palawan,2015,100.00\n"
+    "Aborlan,Palawan,2015,250.00\n"
+    "Abra de Ilog,Occidental Mindoro,2016,75.50\n"
+)
+# New rows ahead of rows the first file already loaded
+OVERLAPPING = CSV.replace("lgu,province,year,unliquidated\n", "lgu,province,year,unliquidated\nAgoo,La Union,2015,40.00\n")
+
+
+def counts(path):
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute(
+            "SELECT g.name, t.year, t.source_seq, t.amount FROM unliquidated_transactions t "
+            "JOIN local_governments g ON g.id = t.lgu_id ORDER BY g.name, t.year, t.source_seq"
+        ).fetchall()
+        yearly = conn.execute("SELECT year, total_amount, transaction_count FROM yearly_rollups ORDER BY year").fetchall()
+        version = conn.execute("SELECT version FROM data_versions").fetchone()
+    return rows, yearly, version
+
+
+def test_default_load_appends_after_loaded_rows(tmp_path):
+    path = tmp_path / "load.db"
+    url = f"sqlite:///{path}"
+    (tmp_path / "first.csv").write_text(CSV)
+    (tmp_path / "second.csv").write_text(OVERLAPPING)
+
+    run(url, "scripts/load_data.py", str(tmp_path / "first.csv"))
+    run(url, "scripts/load_data.py", str(tmp_path / "second.csv"))
+    rows, yearly, version = counts(path)
+
+    assert rows == [
+        ("Aborlan", 2015, 0, 100.0), ("Aborlan", 2015, 1, 250.0),
+        ("Aborlan", 2015, 2, 100.0), ("Aborlan", 2015, 3, 250.0),
+        ("Abra de Ilog", 2016, 0, 75.5), ("Abra de Ilog", 2016, 1, 75.5),
+        ("Agoo", 2015, 0, 40.0),
+    ]
+    assert yearly == [(2015, 740.0, 5), (2016, 151.0, 2)]
+    assert version == (2,)
+
+
+def test_conflicting_bulk_load_writes_nothing(tmp_path):
+    path = tmp_path / "bulk.db"
+    url = f"sqlite:///{path}"
+    (tmp_path / "first.csv").write_text(CSV)
+    (tmp_path / "second.csv").write_text(OVERLAPPING)
+    run(url, "scripts/load_data.py", str(tmp_path / "first.csv"), "--bulk")
+    before = counts(path)
+
+    output = run(url, "scripts/load_data.py", str(tmp_path / "second.csv"), "--bulk", returncode=1)
+
+    assert "rolled back" in output
+    assert counts(path) == before
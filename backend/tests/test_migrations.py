@@ -0,0 +1,76 @@
+"""A database from before migrations is adopted, upgraded and then loaded incrementally."""
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# Rows as the original load_data.py left them: no content hash, no source_seq
+LEGACY_LGUS = [(1, "Aborlan", "Palawan"), (2, "Abra de Ilog", "Occidental Mindoro")]
+LEGACY_TRANSACTIONS = [(1, 1, 2015, 100.0), (2, 1, 2015, 250.0), (3, 2, 2015, 75.5), (4, 2, 2016, 80.0)]
+
+
+def run(database_url: str, *args: str, returncode: int = 0) -> str:
+    env = {**os.environ, "DATABASE_URL": database_url}
+    result = subprocess.run(
+        [sys.executable, *args], cwd=BACKEND, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == returncode, result.stdout + result.stderr
+    return result.stdout
+
+
+@pytest.fixture
+def legacy_database(tmp_path):
+    """The baseline schema (revision 0001) with some rows and no alembic_version table."""
+    path = tmp_path / "legacy.db"
+    url = f"sqlite:///{path}"
+    run(url, "-c", "from app.migrations import upgrade_database; upgrade_database('0001')")
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP TABLE alembic_version")
+        conn.executemany("INSERT INTO local_governments (id, name, province) VALUES (?, ?, ?)", LEGACY_LGUS)
+        conn.executemany(
+            "INSERT INTO unliquidated_transactions (id, lgu_id, year, amount) VALUES (?, ?, ?, ?)",
+            LEGACY_TRANSACTIONS
+        )
+    return path, url
+
+
+def test_legacy_database_is_migrated_and_loaded_incrementally(legacy_database, tmp_path):
+    path, url = legacy_database
+    run(url, "-m", "app.migrations")
+
+    with sqlite3.connect(path) as conn:
+        seqs = conn.execute("SELECT id, source_seq FROM unliquidated_transactions ORDER BY id").fetchall()
+        yearly = conn.execute("SELECT year, total_amount, transaction_count FROM yearly_rollups ORDER BY year").fetchall()
+    assert seqs == [(1, 0), (2, 1), (3, 0), (4, 0)]
+    assert yearly == [(2015, 425.5, 3), (2016, 80.0, 1)]
+
+    # The same file, with Aborlan's second 2015 row corrected and a new 2016 row
+    csv_path = tmp_path / "extraction.csv"
+    csv_path.write_text(
+        "lgu,province,year,unliquidated\n"
+        "Aborlan,Palawan,2015,100.00\n"
+        "Aborlan,Palawan,2015,260.00\n"
+        "Abra de Ilog,Occidental Mindoro,2015,75.50\n"
+        "Abra de Ilog,Occidental Mindoro,2016,80.00\n"
+        "Aborlan,Palawan,2016,40.00\n"
+    )
+    output = run(url, "scripts/load_data.py", str(csv_path), "--incremental")
+    assert "Keyed 4 previously loaded rows" in output
+    assert "Inserted: 1, updated: 1" in output
+
+    with sqlite3.connect(path) as conn:
+        unkeyed = conn.execute("SELECT COUNT(*) FROM unliquidated_transactions WHERE content_hash IS NULL").fetchone()
+        amounts = conn.execute("SELECT id, amount FROM unliquidated_transactions ORDER BY id").fetchall()
+        yearly = conn.execute("SELECT year, total_amount, transaction_count FROM yearly_rollups ORDER BY year").fetchall()
+    assert unkeyed == (0,)
+    assert amounts == [(1, 100.0), (2, 260.0), (3, 75.5), (4, 80.0), (5, 40.0)]
+    assert yearly == [(2015, 435.5, 3), (2016, 120.0, 2)]
+
+    # The adopted database ends up with the same schema as a fresh one
+    run(url, "-m", "alembic", "check")
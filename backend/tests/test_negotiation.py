@@ -0,0 +1,82 @@
+"""Accept picks the response format, and every format carries the same rows."""
+import pyarrow as pa
+import pytest
+from starlette.requests import Request
+
+from app.negotiation import ARROW_MEDIA_TYPE, COLUMNAR_JSON_MEDIA_TYPE, heatmap_arrow, heatmap_matrix, negotiate
+
+
+def request_accepting(accept):
+    headers = [(b"accept", accept.encode())] if accept is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, "json"),
+    ("", "json"),
+    ("*/*", "json"),
+    ("application/*", "json"),
+    ("text/html", "json"),
+    (ARROW_MEDIA_TYPE, "arrow"),
+    (f"{ARROW_MEDIA_TYPE}, {COLUMNAR_JSON_MEDIA_TYPE}", "arrow"),
+    (f"{ARROW_MEDIA_TYPE};q=0.5, {COLUMNAR_JSON_MEDIA_TYPE}", "columnar"),
+    (f"application/json;q=0.9, {ARROW_MEDIA_TYPE}", "arrow"),
+    (f"*/*;q=0.1, {COLUMNAR_JSON_MEDIA_TYPE};q=0.8", "columnar"),
+    (f"{ARROW_MEDIA_TYPE};q=0, */*", "json"),
+    (f"{ARROW_MEDIA_TYPE};q=high", "json"),
+    (f"text/html, {COLUMNAR_JSON_MEDIA_TYPE};q=0.2", "columnar"),
+])
+def test_highest_quality_known_type_wins(accept, expected):
+    assert negotiate(request_accepting(accept)) == expected
+
+
+def test_arrow_round_trip_matches_json(client):
+    params = {"year": 2015, "limit": 50}
+    as_json = client.get("/transactions/", params=params)
+    as_arrow = client.get("/transactions/", params=params, headers={"Accept": ARROW_MEDIA_TYPE})
+
+    assert as_arrow.headers["content-type"] == ARROW_MEDIA_TYPE
+    assert as_arrow.headers["vary"] == "Accept"
+    assert as_arrow.headers["x-next-cursor"] == as_json.headers["x-next-cursor"]
+
+    table = pa.ipc.open_stream(as_arrow.content).read_all()
+    assert table.column("id").to_pylist() == [row["id"] for row in as_json.json()]
+    assert [str(amount) for amount in table.column("amount").to_pylist()] == [row["amount"] for row in as_json.json()]
+    assert table.column("province").to_pylist() == [row["lgu"]["province"] for row in as_json.json()]
+
+
+def test_heatmap_matrix_leaves_missing_cells_null():
+    cells = [
+        {"province": "Palawan", "year": 2015, "total_amount": 10.0},
+        {"province": "Abra", "year": 2016, "total_amount": 5.5},
+        {"province": None, "year": 2015, "total_amount": 1.0},
+    ]
+
+    matrix = heatmap_matrix(cells)
+
+    assert matrix["provinces"] == ["Abra", "Palawan", None]
+    assert matrix["years"] == [2015, 2016]
+    assert matrix["total_amount"] == [[None, 5.5], [10.0, None], [1.0, None]]
+
+    table = heatmap_arrow(matrix)
+    assert table.column_names == ["province", "2015", "2016"]
+    assert table.column("2016").to_pylist() == [5.5, None, None]
+
+
+def test_heatmap_formats_agree(client):
+    cells = client.get("/analytics/heatmap/province-year").json()
+    columnar = client.get("/analytics/heatmap/province-year", headers={"Accept": COLUMNAR_JSON_MEDIA_TYPE})
+    arrow = client.get("/analytics/heatmap/province-year", headers={"Accept": ARROW_MEDIA_TYPE})
+
+    matrix = columnar.json()
+    assert columnar.headers["content-type"] == COLUMNAR_JSON_MEDIA_TYPE
+    # Caches must key the three formats apart
+    assert columnar.headers["vary"] == arrow.headers["vary"] == "Accept"
+    assert len(matrix["total_amount"]) == len(matrix["provinces"])
+    assert all(len(row) == len(matrix["years"]) for row in matrix["total_amount"])
+    filled = sum(value is not None for row in matrix["total_amount"] for value in row)
+    assert filled == len(cells)
+
+    table = pa.ipc.open_stream(arrow.content).read_all()
+    assert table.column("province").to_pylist() == matrix["provinces"]
+    assert table.num_columns == len(matrix["years"]) + 1
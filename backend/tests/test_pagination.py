@@ -0,0 +1,90 @@
+"""Keyset pages cover every transaction exactly once, in (sort column, id) order."""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+YEAR = 2014
+TIED_AMOUNT = Decimal("31415.92")
+TIES = 12
+SOURCE_SEQ = 10 ** 6
+PAGE_SIZE = 97
+
+pytestmark = pytest.mark.usefixtures("tied_transactions")
+
+
+@pytest.fixture(scope="module")
+def tied_transactions(loaded_database):
+    """A run of equal amounts longer than a page, so pages end inside the tie."""
+    txn = models.UnliquidatedTransaction
+    with Session(loaded_database) as db:
+        lgu = db.execute(select(models.LocalGovernment).order_by(models.LocalGovernment.id).limit(1)).scalar_one()
+        db.add_all([
+            txn(lgu_id=lgu.id, province=lgu.province, year=YEAR, amount=TIED_AMOUNT, source_seq=SOURCE_SEQ + seq)
+            for seq in range(TIES)
+        ])
+        db.commit()
+
+    yield
+
+    with Session(loaded_database) as db:
+        db.execute(delete(txn).where(txn.year == YEAR, txn.source_seq >= SOURCE_SEQ))
+        db.commit()
+
+
+def walk(client, **params):
+    ids, cursor, pages = [], None, 0
+    while True:
+        response = client.get("/transactions/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        ids += [row["id"] for row in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        pages += 1
+        if not cursor:
+            return ids, pages
+
+
+@pytest.mark.parametrize("sort", ["id", "year", "amount"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_cover_every_row_once(client, loaded_database, sort, order):
+    txn = models.UnliquidatedTransaction
+    column = getattr(txn, sort)
+    key = (column.desc(), txn.id.desc()) if order == "desc" else (column.asc(), txn.id.asc())
+    with loaded_database.connect() as conn:
+        expected = list(conn.scalars(
+            select(txn.id).join(models.LocalGovernment).where(txn.year == YEAR).order_by(*key)
+        ))
+
+    ids, pages = walk(client, year=YEAR, sort=sort, order=order, limit=PAGE_SIZE)
+
+    assert ids == expected
+    assert pages == -(-len(expected) // PAGE_SIZE)
+
+
+def test_ties_split_across_pages(client, loaded_database):
+    txn = models.UnliquidatedTransaction
+    with loaded_database.connect() as conn:
+        tied = set(conn.scalars(select(txn.id).where(txn.year == YEAR, txn.amount == TIED_AMOUNT)))
+
+    ids, pages = walk(client, year=YEAR, min_amount=float(TIED_AMOUNT), sort="amount", limit=5)
+
+    assert len(tied) >= TIES
+    assert ids[:len(tied)] == sorted(tied)
+    assert len(ids) == len(set(ids))
+
+
+def test_next_cursor_resumes_after_the_page(client):
+    two = [row["id"] for row in client.get("/transactions/", params={"year": YEAR, "limit": 2}).json()]
+    first = client.get("/transactions/", params={"year": YEAR, "limit": 1})
+    second = client.get("/transactions/", params={"year": YEAR, "limit": 1, "cursor": first.headers["X-Next-Cursor"]})
+
+    assert [first.json()[0]["id"], second.json()[0]["id"]] == two
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WzFd", "WyJ4IiwxXQ", "e30"])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get("/transactions/", params={"sort": "amount", "cursor": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,57 @@
+"""EXPLAIN the transaction queries behind each endpoint; see scripts/check_query_plans.py."""
+import asyncio
+import json
+
+import pytest
+
+from scripts.check_query_plans import (
+    ENDPOINTS,
+    POSTGRESQL_ENDPOINTS,
+    TRANSACTIONS,
+    _plan_nodes,
+    capture_statements,
+    discover_fixtures,
+    explain,
+)
+
+
+@pytest.fixture(scope="module")
+def postgresql(loaded_database):
+    return loaded_database.dialect.name == "postgresql"
+
+
+@pytest.fixture(scope="module")
+def plan_checks(loaded_database, postgresql):
+    endpoints = ENDPOINTS + (POSTGRESQL_ENDPOINTS if postgresql else [])
+    captured = capture_statements(endpoints, discover_fixtures())
+    return asyncio.run(explain(captured, planner_costs=False))
+
+
+@pytest.mark.parametrize("endpoint", [name for name, _, _ in ENDPOINTS + POSTGRESQL_ENDPOINTS])
+def test_queries_use_an_index_or_partition_pruning(endpoint, plan_checks, postgresql):
+    if not postgresql and endpoint in {name for name, _, _ in POSTGRESQL_ENDPOINTS}:
+        pytest.skip("searched in process on SQLite")
+
+    checks = [check for check in plan_checks if check.endpoint == endpoint]
+    assert checks, f"{endpoint} ran no transaction query"
+    for check in checks:
+        assert check.ok, f"{check.summary}\n{check.statement}\n{check.plan}"
+
+
+@pytest.mark.parametrize("year, partition", [
+    (2015, f"{TRANSACTIONS}_2015"),
+    (2004, f"{TRANSACTIONS}_before_2010"),
+    (2035, f"{TRANSACTIONS}_default"),
+])
+def test_year_filter_prunes_to_one_partition(year, partition, loaded_database, postgresql):
+    if not postgresql:
+        pytest.skip("transactions are partitioned on PostgreSQL only")
+
+    with loaded_database.connect() as conn:
+        plan = conn.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) SELECT id, amount FROM {TRANSACTIONS} WHERE year = %(year)s",
+            {"year": year}
+        ).scalar()
+    plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]
+    scanned = {node["Relation Name"] for node in _plan_nodes(plan["Plan"]) if "Relation Name" in node}
+    assert scanned == {partition}
@@ -0,0 +1,108 @@
+"""Cached responses are keyed on path, query, Accept and data version, and revalidate with ETags."""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from app.cache import ResponseCache, ResponseCacheMiddleware
+
+
+class Backend:
+    """An app whose answers change with every call, so a cached body is recognizable."""
+
+    def __init__(self):
+        self.version = 1
+        self.calls = 0
+
+    async def current_version(self) -> int:
+        return self.version
+
+
+@pytest.fixture
+def backend():
+    return Backend()
+
+
+@pytest.fixture
+def cache_client(backend):
+    app = FastAPI()
+
+    @app.get("/analytics/stats")
+    async def stats(request: Request, year: int = 0, province: str = ""):
+        backend.calls += 1
+        body = {"call": backend.calls, "year": year, "province": province}
+        if request.headers.get("accept") == "text/plain":
+            return PlainTextResponse(f"call {backend.calls}")
+        return body
+
+    @app.get("/analytics/trends/missing")
+    async def missing():
+        backend.calls += 1
+        return PlainTextResponse("no", status_code=404)
+
+    @app.get("/llm/analyses")
+    async def uncached():
+        backend.calls += 1
+        return {"call": backend.calls}
+
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        cache=ResponseCache(max_entries=16, ttl_seconds=60),
+        version_source=backend.current_version
+    )
+    with TestClient(app) as cache_client:
+        yield cache_client
+
+
+def test_repeated_requests_are_served_from_memory(cache_client, backend):
+    first = cache_client.get("/analytics/stats", params={"year": 2015, "province": "Palawan"})
+    # The same query in a different order
+    second = cache_client.get("/analytics/stats?province=Palawan&year=2015")
+
+    assert backend.calls == 1
+    assert second.json() == first.json()
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.headers["cache-control"] == "no-cache"
+
+
+def test_a_new_data_version_is_recomputed(cache_client, backend):
+    before = cache_client.get("/analytics/stats")
+    backend.version += 1
+    after = cache_client.get("/analytics/stats")
+
+    assert backend.calls == 2
+    assert after.json()["call"] == 2
+    assert after.headers["etag"] != before.headers["etag"]
+
+
+def test_if_none_match_is_answered_with_304(cache_client, backend):
+    etag = cache_client.get("/analytics/stats").headers["etag"]
+
+    revalidated = cache_client.get("/analytics/stats", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    backend.version += 1
+    changed = cache_client.get("/analytics/stats", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_accept_is_part_of_the_key(cache_client, backend):
+    as_json = cache_client.get("/analytics/stats", headers={"Accept": "application/json"})
+    as_text = cache_client.get("/analytics/stats", headers={"Accept": "text/plain"})
+    again = cache_client.get("/analytics/stats", headers={"Accept": "application/json"})
+
+    assert backend.calls == 2
+    assert as_text.headers["content-type"].startswith("text/plain")
+    assert again.headers["content-type"] == "application/json"
+    assert again.json() == as_json.json()
+
+
+def test_errors_and_other_paths_are_not_cached(cache_client, backend):
+    for _ in range(2):
+        assert cache_client.get("/analytics/trends/missing").status_code == 404
+        cache_client.get("/llm/analyses")
+
+    assert backend.calls == 4
@@ -0,0 +1,44 @@
+"""Rescoring only the changed LGU-years gives the same table as a full rescore."""
+from sqlalchemy import func, select, update
+
+from app import models
+from app.risk_scores import refresh_risk_scores
+
+SCORE = models.LGURiskScore
+SNAPSHOT = select(
+    SCORE.lgu_id, SCORE.year, SCORE.previous_year, SCORE.amount_z, SCORE.yoy_z,
+    SCORE.peer_percentile, SCORE.province_share, SCORE.peer_count, SCORE.risk_score
+).order_by(SCORE.lgu_id, SCORE.year)
+
+
+def test_incremental_rescore_matches_full_rescore(loaded_database):
+    rollup = models.LGUYearRollup
+    with loaded_database.connect() as conn:
+        transaction = conn.begin()
+        try:
+            refresh_risk_scores(conn)
+            before = conn.execute(SNAPSHOT).all()
+
+            # An LGU-year with a later year, so the change reaches two peer groups
+            lgu_id, year = conn.execute(
+                select(SCORE.lgu_id, SCORE.year)
+                .where(SCORE.peer_count >= 5, SCORE.total_amount > 0, select(func.max(rollup.year)).where(rollup.lgu_id == SCORE.lgu_id)
+                       .scalar_subquery() > SCORE.year)
+                .order_by(SCORE.lgu_id, SCORE.year).limit(1)
+            ).one()
+            conn.execute(
+                update(rollup).where(rollup.lgu_id == lgu_id, rollup.year == year)
+                .values(total_amount=rollup.total_amount * 50)
+            )
+
+            refresh_risk_scores(conn, years=[year], lgu_ids=[lgu_id])
+            incremental = conn.execute(SNAPSHOT).all()
+            refresh_risk_scores(conn)
+            full = conn.execute(SNAPSHOT).all()
+        finally:
+            transaction.rollback()
+
+    assert incremental == full
+    changed = {(row.lgu_id, row.year) for row in set(full) - set(before)}
+    assert (lgu_id, year) in changed
+    assert len({year for _, year in changed}) == 2
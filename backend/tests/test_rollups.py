@@ -0,0 +1,41 @@
+"""Yearly rollups cover every transaction; province rollups only those matched to an LGU."""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.rollups import refresh_rollups
+
+YEAR = 2015
+UNATTRIBUTED = Decimal("1234.56")
+
+
+@pytest.fixture
+def unattributed_transaction(loaded_database):
+    txn = models.UnliquidatedTransaction
+    with Session(loaded_database) as db:
+        row = txn(lgu_id=None, year=YEAR, amount=UNATTRIBUTED, source_seq=0)
+        db.add(row)
+        db.flush()
+        refresh_rollups(db, years=[YEAR])
+        yield db
+        db.execute(delete(txn).where(txn.id == row.id, txn.year == YEAR))
+        refresh_rollups(db, years=[YEAR])
+        db.commit()
+
+
+def test_yearly_rollup_includes_transactions_without_an_lgu(unattributed_transaction):
+    db = unattributed_transaction
+    txn = models.UnliquidatedTransaction
+    total, count, lgus = db.execute(
+        select(func.sum(txn.amount), func.count(txn.id), func.count(func.distinct(txn.lgu_id))).where(txn.year == YEAR)
+    ).one()
+    yearly = db.get(models.YearlyRollup, YEAR)
+    province_total = db.scalar(
+        select(func.sum(models.ProvinceYearRollup.total_amount)).where(models.ProvinceYearRollup.year == YEAR)
+    )
+
+    assert (yearly.total_amount, yearly.transaction_count, yearly.lgus_count) == (total, count, lgus)
+    assert province_total == total - UNATTRIBUTED
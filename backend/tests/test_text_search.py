@@ -0,0 +1,104 @@
+"""Full-text search ranks, facets and pages the same way on every backend."""
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.data_version import bump_data_version, data_version_tracker
+
+REPORT_TYPE = "search_fixture"
+# A word no generated text contains, so the fixture reports are its only matches
+WORD = "quillfeather"
+TEXTS = [
+    (2016, f"{WORD} cash advances were not liquidated; {WORD} balances and {WORD} vouchers remain open"),
+    (2017, f"A {WORD} voucher lacked supporting documents"),
+    (2016, f"Payments for {WORD} supplies were disbursed in cash without a purchase request"),
+    (2016, "Procurement of office supplies was not posted on PhilGEPS"),
+]
+
+pytestmark = pytest.mark.usefixtures("reports")
+
+
+@pytest.fixture(scope="module")
+def reports(loaded_database):
+    with Session(loaded_database) as db:
+        lgus = db.execute(
+            select(models.LocalGovernment.id, models.LocalGovernment.province)
+            .order_by(models.LocalGovernment.id).limit(len(TEXTS))
+        ).all()
+        rows = [
+            models.AuditReport(lgu_id=lgu.id, year=year, report_type=REPORT_TYPE, raw_text=text)
+            for lgu, (year, text) in zip(lgus, TEXTS)
+        ]
+        db.add_all(rows)
+        bump_data_version(db)
+        db.commit()
+        fixture = [(row.id, lgu.province, row.year) for row, lgu in zip(rows, lgus)]
+
+    with pytest.MonkeyPatch.context() as patch:
+        # The in-process index is rebuilt on the next data version
+        patch.setattr(data_version_tracker, "poll_seconds", 0)
+        yield fixture
+
+    with Session(loaded_database) as db:
+        db.execute(delete(models.AuditReport).where(models.AuditReport.report_type == REPORT_TYPE))
+        bump_data_version(db)
+        db.commit()
+
+
+def test_hits_are_ranked_by_term_frequency(client, reports):
+    response = client.get("/search/", params={"q": WORD})
+    body = response.json()
+
+    assert response.status_code == 200
+    assert body["total"] == 3
+    assert [hit["id"] for hit in body["hits"]][0] == reports[0][0]
+    assert {hit["id"] for hit in body["hits"]} == {report_id for report_id, _, _ in reports[:3]}
+    assert all("<mark>" in hit["snippet"] for hit in body["hits"])
+
+
+def test_facets_count_every_match(client, reports):
+    body = client.get("/search/", params={"q": WORD, "limit": 1}).json()
+
+    years = {facet["value"]: facet["count"] for facet in body["facets"]["year"]}
+    assert years == {2016: 2, 2017: 1}
+    provinces = {facet["value"]: facet["count"] for facet in body["facets"]["province"]}
+    assert sum(provinces.values()) == 3
+    assert set(provinces) == {province for _, province, _ in reports[:3]}
+
+    filtered = client.get("/search/", params={"q": WORD, "year": 2016}).json()
+    assert filtered["total"] == 2
+    assert [facet["value"] for facet in filtered["facets"]["year"]] == [2016]
+
+
+def test_cursor_pages_through_every_hit_once(client):
+    everything = [hit["id"] for hit in client.get("/search/", params={"q": WORD}).json()["hits"]]
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/search/", params={"q": WORD, "limit": 1, **({"cursor": cursor} if cursor else {})})
+        seen += [hit["id"] for hit in response.json()["hits"]]
+        cursor = response.json()["next_cursor"]
+        assert response.headers.get("X-Next-Cursor") == cursor
+        if not cursor:
+            break
+
+    assert seen == everything
+
+
+def test_exclusions_narrow_the_required_terms(client, reports):
+    body = client.get("/search/", params={"q": f"{WORD} -cash"}).json()
+    assert [hit["id"] for hit in body["hits"]] == [reports[1][0]]
+
+
+def test_exclusions_alone_match_every_other_document(client, reports, loaded_database):
+    with loaded_database.connect() as conn:
+        total = conn.scalar(select(func.count()).select_from(models.AuditReport))
+
+    body = client.get("/search/", params={"q": f"-{WORD}", "limit": 100}).json()
+
+    hits = {hit["id"] for hit in body["hits"]}
+    assert body["total"] == total - 3
+    assert not hits & {report_id for report_id, _, _ in reports[:3]}
+    if not body["next_cursor"]:
+        assert reports[3][0] in hits
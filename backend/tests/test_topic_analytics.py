@@ -0,0 +1,140 @@
+"""Topic endpoints read the topic rollup, and the correlation matrix is rebuilt only when the
+data version moves."""
+import numpy as np
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app import models, topic_analytics
+from app.data_version import bump_data_version, data_version_tracker
+from app.rollups import refresh_topic_rollups
+from app.topic_analytics import build_topic_matrix
+
+# Years and provinces no generated row uses, so the rollup groups hold only the fixture's reports
+PROPORTIONS = [
+    # province, year, first topic, second topic
+    ("Quillprov", 2091, 0.6, 0.4),
+    ("Quillprov", 2092, 0.2, 0.8),
+    ("Zedprov", 2091, 0.5, 0.5),
+]
+
+
+def test_matrix_of_a_small_example():
+    topics = [(10, 1), (20, 2), (30, 3)]
+    rows = [
+        (1, 10, 0.6), (1, 20, 0.4), (1, 30, 0),
+        (2, 10, 0.2), (2, 20, 0.8), (2, 30, 0),
+        (3, 10, 0.95), (3, 20, 0.05), (3, 30, 0),
+        # Topics the model no longer has are ignored
+        (3, 99, 0.9),
+    ]
+
+    matrix = build_topic_matrix(rows, topics)
+
+    assert (matrix.topic_ids, matrix.topic_numbers, matrix.reports) == ([10, 20, 30], [1, 2, 3], 3)
+    # Topic 2 is one minus topic 1; topic 3 never varies, so it correlates with nothing
+    np.testing.assert_allclose(matrix.correlation, [[1, -1, 0], [-1, 1, 0], [0, 0, 0]], atol=1e-12)
+    # Topic 2 is below the co-occurrence threshold in the third report
+    assert matrix.cooccurrence.tolist() == [[3, 2, 0], [2, 2, 0], [0, 0, 0]]
+
+
+def test_matrix_without_enough_reports_is_zero():
+    topics = [(10, 1), (20, 2)]
+
+    assert build_topic_matrix([], topics).reports == 0
+    single = build_topic_matrix([(1, 10, 0.7), (1, 20, 0.3)], topics)
+    assert single.correlation.tolist() == [[0, 0], [0, 0]]
+    assert single.cooccurrence.tolist() == [[1, 1], [1, 1]]
+
+
+@pytest.fixture(scope="module")
+def topics(loaded_database):
+    with Session(loaded_database) as db:
+        topic_rows = [
+            models.AuditTopic(topic_number=9000 + n, description=f"Fixture topic {n}") for n in (1, 2)
+        ]
+        lgus = {
+            province: models.LocalGovernment(name=f"{province} town", province=province)
+            for province in dict.fromkeys(province for province, *_ in PROPORTIONS)
+        }
+        db.add_all(topic_rows + list(lgus.values()))
+        db.flush()
+        for province, year, *proportions in PROPORTIONS:
+            report = models.AuditReport(lgu_id=lgus[province].id, year=year, report_type="topic_fixture")
+            db.add(report)
+            db.flush()
+            db.add_all([
+                models.ReportTopic(report_id=report.id, topic_id=topic.id, topic_proportion=proportion)
+                for topic, proportion in zip(topic_rows, proportions)
+            ])
+        db.flush()
+        refresh_topic_rollups(db, years=[2091, 2092])
+        bump_data_version(db)
+        db.commit()
+        topic_ids = [topic.id for topic in topic_rows]
+        lgu_ids = [lgu.id for lgu in lgus.values()]
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(data_version_tracker, "poll_seconds", 0)
+        yield topic_ids
+
+    with Session(loaded_database) as db:
+        db.execute(delete(models.ReportTopic).where(models.ReportTopic.topic_id.in_(topic_ids)))
+        db.execute(delete(models.AuditReport).where(models.AuditReport.report_type == "topic_fixture"))
+        db.execute(delete(models.LocalGovernment).where(models.LocalGovernment.id.in_(lgu_ids)))
+        refresh_topic_rollups(db, years=[2091, 2092])
+        db.execute(delete(models.AuditTopic).where(models.AuditTopic.id.in_(topic_ids)))
+        bump_data_version(db)
+        db.commit()
+
+
+def test_overview_and_summary(client, topics):
+    overview = {row["topic"]["id"]: row for row in client.get("/topics/overview").json()}
+    first = client.get(f"/topics/{topics[0]}/analysis").json()
+
+    assert [(overview[t]["report_count"], float(overview[t]["avg_proportion"])) for t in topics] == [
+        (3, 0.4333), (3, 0.5667)
+    ]
+    assert (first["report_count"], float(first["avg_proportion"])) == (3, 0.4333)
+    assert client.get("/topics/999999/analysis").status_code == 404
+
+
+def test_trends_by_year_and_province(client, topics):
+    by_year = client.get("/topics/trends/by-year", params={"topic_id": topics[0]}).json()
+    by_province = client.get(
+        "/topics/trends/by-province", params={"topic_id": topics[0], "year": 2091}
+    ).json()
+
+    # Shares are of all topics in the same year or province, not only the filtered one
+    assert [(p["year"], p["report_count"], p["avg_proportion"], p["share"]) for p in by_year] == [
+        (2091, 2, 0.55, 0.55), (2092, 1, 0.2, 0.2)
+    ]
+    assert [(p["province"], p["report_count"], p["avg_proportion"], p["share"]) for p in by_province] == [
+        ("Quillprov", 1, 0.6, 0.6), ("Zedprov", 1, 0.5, 0.5)
+    ]
+
+
+def test_correlations_are_rebuilt_only_for_a_new_data_version(client, loaded_database, topics, monkeypatch):
+    builds = []
+    build = topic_analytics.build_topic_matrix
+
+    def counting_build(rows, topic_rows):
+        builds.append(len(rows))
+        return build(rows, topic_rows)
+
+    monkeypatch.setattr(topic_analytics, "build_topic_matrix", counting_build)
+
+    first = client.get("/topics/correlations").json()
+    again = client.get("/topics/correlations").json()
+    assert len(builds) == 1
+    assert again == first
+
+    with Session(loaded_database) as db:
+        bump_data_version(db)
+        db.commit()
+    assert client.get("/topics/correlations").json() == first
+    assert len(builds) == 2
+
+    a, b = (first["topic_ids"].index(topic_id) for topic_id in topics)
+    assert first["correlation"][a][b] == -1
+    assert first["cooccurrence"][a][b] == 3
@@ -0,0 +1,42 @@
+"""Topic rows reused by a new fit must describe that fit's topics, not the seeded ones,
+and inference with a saved model must leave the labels alone."""
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.topic_model import TopicModel, ensure_topics
+
+TEXTS = [
+    "cash advance liquidation unliquidated officer",
+    "procurement bidding contract supplier delay",
+    "payroll salary employees overtime benefits",
+] * 10
+
+
+def test_ensure_topics_describes_the_fitted_topics(loaded_database):
+    model = TopicModel.fit(TEXTS, topics=3, max_iter=5, n_jobs=1)
+    terms = model.top_terms(3)
+
+    with Session(loaded_database) as db:
+        topic_ids = ensure_topics(db, model, relabel=True)
+        descriptions = dict(db.execute(
+            select(models.AuditTopic.id, models.AuditTopic.description)
+            .where(models.AuditTopic.id.in_(topic_ids.values()))
+        ).all())
+        db.rollback()
+
+    for index, topic_id in topic_ids.items():
+        assert descriptions[topic_id] == f"Topic {index + 1}: {', '.join(terms[index])}"
+
+
+def test_inference_keeps_curated_labels(loaded_database):
+    model = TopicModel.fit(TEXTS, topics=3, max_iter=5, n_jobs=1)
+
+    with Session(loaded_database) as db:
+        topic_ids = ensure_topics(db, model, relabel=True)
+        db.execute(update(models.AuditTopic).where(models.AuditTopic.id == topic_ids[0]).values(description="Cash advances"))
+        assert ensure_topics(db, model) == topic_ids
+        description = db.scalar(select(models.AuditTopic.description).where(models.AuditTopic.id == topic_ids[0]))
+        db.rollback()
+
+    assert description == "Cash advances"
@@ -1,22 +1,16 @@
 import { useQuery } from '@tanstack/react-query';
-import { analyticsAPI, transactionsAPI } from '@/services/api';
+import { analyticsAPI } from '@/services/api';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, LineChart, Line } from 'recharts';
 
 export function Dashboard() {
-  const { data: stats } = useQuery({
-    queryKey: ['stats'],
-    queryFn: async () => (await analyticsAPI.getStats()).data,
+  const { data: dashboard } = useQuery({
+    queryKey: ['dashboard'],
+    queryFn: async () => (await analyticsAPI.getDashboard(10)).data,
   });
 
-  const { data: yearlyTrends } = useQuery({
-    queryKey: ['yearlyTrends'],
-    queryFn: async () => (await analyticsAPI.getYearlyTrends()).data,
-  });
-
-  const { data: topLGUs } = useQuery({
-    queryKey: ['topLGUs'],
-    queryFn: async () => (await transactionsAPI.getTopLGUs(10)).data,
-  });
+  const stats = dashboard?.stats;
+  const yearlyTrends = dashboard?.yearly_trends;
+  const topLGUs = dashboard?.top_lgus;
 
   return (
     <div className="space-y-6">
@@ -1,6 +1,6 @@
 import { useState } from 'react';
 import { useQuery } from '@tanstack/react-query';
-import { transactionsAPI, lgusAPI } from '@/services/api';
+import { transactionsAPI, lgusAPI, expandColumnarTransactions } from '@/services/api';
 import type { UnliquidatedTransaction } from '@/types';
 
 export function Explorer() {
@@ -22,13 +22,13 @@ export function Explorer() {
   const { data: transactions, isLoading } = useQuery({
     queryKey: ['transactions', selectedYear, selectedProvince, minAmount, maxAmount],
     queryFn: async () =>
-      (await transactionsAPI.getAll({
+      expandColumnarTransactions((await transactionsAPI.getAllColumnar({
         year: selectedYear,
         province: selectedProvince,
         min_amount: minAmount,
         max_amount: maxAmount,
         limit: 100,
-      })).data,
+      })).data),
   });
 
   return (
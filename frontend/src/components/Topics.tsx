@@ -2,9 +2,10 @@ import { useQuery } from '@tanstack/react-query';
 import { topicsAPI } from '@/services/api';
 
 export function Topics() {
-  const { data: topics, isLoading } = useQuery({
-    queryKey: ['topics'],
-    queryFn: async () => (await topicsAPI.getAll()).data,
+  // One aggregate query over the topic rollup, however many reports there are
+  const { data: overview, isLoading } = useQuery({
+    queryKey: ['topics', 'overview'],
+    queryFn: async () => (await topicsAPI.getOverview()).data,
   });
 
   if (isLoading) {
@@ -24,7 +25,7 @@ export function Topics() {
         </p>
 
         <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
-          {topics?.map((topic) => (
+          {overview?.map(({ topic, report_count }) => (
             <div
               key={topic.id}
               className="border border-gray-200 rounded-lg p-4 hover:shadow-md transition-shadow"
@@ -37,6 +38,9 @@ export function Topics() {
                     </span>
                     <h3 className="font-semibold text-gray-900">{topic.description}</h3>
                   </div>
+                  <p className="text-xs text-gray-500">
+                    {report_count.toLocaleString()} reports
+                  </p>
                   {topic.terms && (
                     <p className="text-sm text-gray-500 mt-2">
                       <span className="font-medium">Key terms:</span> {topic.terms.substring(0, 100)}...
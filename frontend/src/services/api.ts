@@ -1,20 +1,29 @@
 import axios from 'axios';
 import type {
   AuditTopic,
+  TopicOverview,
+  TopicTrendPoint,
+  TopicMatrix,
   LocalGovernment,
+  LGUSearchHit,
   UnliquidatedTransaction,
+  ColumnarTransactions,
+  ProvinceYearMatrix,
   StatsResponse,
   LGUDetailResponse,
   YearlyAggregate,
   ProvinceAggregate,
   TopLGU,
   YearlyTrend,
+  DashboardResponse,
   LLMAnalysis,
   LLMRequest
 } from '@/types';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
+export const COLUMNAR_JSON = 'application/vnd.openaudit.columnar+json';
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -26,27 +35,87 @@ export const topicsAPI = {
   getAll: () => api.get<AuditTopic[]>('/topics'),
   getById: (id: number) => api.get<AuditTopic>(`/topics/${id}`),
   getAnalysis: (id: number) => api.get(`/topics/${id}/analysis`),
+  getOverview: () => api.get<TopicOverview[]>('/topics/overview'),
+  getTrendsByYear: (topicId?: number) =>
+    api.get<TopicTrendPoint[]>('/topics/trends/by-year', { params: { topic_id: topicId } }),
+  getTrendsByProvince: (params?: { topic_id?: number; year?: number }) =>
+    api.get<TopicTrendPoint[]>('/topics/trends/by-province', { params }),
+  getCorrelations: () => api.get<TopicMatrix>('/topics/correlations'),
 };
 
 export const lgusAPI = {
-  getAll: (params?: { skip?: number; limit?: number; province?: string }) =>
+  getAll: (params?: { skip?: number; limit?: number; cursor?: string; province?: string }) =>
     api.get<LocalGovernment[]>('/lgus', { params }),
   getProvinces: () => api.get<string[]>('/lgus/provinces'),
-  getById: (id: number) => api.get<LGUDetailResponse>(`/lgus/${id}`),
+  getById: (
+    id: number,
+    params?: {
+      include?: string;
+      transactions_limit?: number;
+      transactions_cursor?: string;
+      reports_limit?: number;
+      reports_cursor?: string;
+    }
+  ) => api.get<LGUDetailResponse>(`/lgus/${id}`, { params }),
   searchByName: (name: string) => api.get<LocalGovernment[]>(`/lgus/search/by-name`, {
     params: { name },
   }),
+  autocomplete: (q: string, limit: number = 10) =>
+    api.get<LGUSearchHit[]>(`/lgus/search/autocomplete`, {
+      params: { q, limit },
+    }),
+};
+
+type TransactionParams = {
+  skip?: number;
+  limit?: number;
+  cursor?: string;
+  sort?: 'id' | 'year' | 'amount';
+  order?: 'asc' | 'desc';
+  year?: number;
+  province?: string;
+  min_amount?: number;
+  max_amount?: number;
 };
 
+export function expandColumnarTransactions(data: ColumnarTransactions): UnliquidatedTransaction[] {
+  const lgus = new Map(
+    data.lgus.id.map((id, i) => [
+      id,
+      {
+        id,
+        name: data.lgus.name[i],
+        province: data.lgus.province[i] ?? undefined,
+        region: data.lgus.region[i] ?? undefined,
+        lgu_type: data.lgus.lgu_type[i] ?? undefined,
+        created_at: data.lgus.created_at[i],
+        updated_at: data.lgus.updated_at[i],
+      },
+    ])
+  );
+
+  return data.id.map((id, i) => ({
+    id,
+    lgu_id: data.lgu_id[i],
+    report_id: data.report_id[i] ?? undefined,
+    year: data.year[i],
+    amount: data.amount[i],
+    context_pre: data.context_pre[i] ?? undefined,
+    context_post: data.context_post[i] ?? undefined,
+    created_at: data.created_at[i],
+    updated_at: data.updated_at[i],
+    lgu: lgus.get(data.lgu_id[i]),
+  }));
+}
+
 export const transactionsAPI = {
-  getAll: (params?: {
-    skip?: number;
-    limit?: number;
-    year?: number;
-    province?: string;
-    min_amount?: number;
-    max_amount?: number;
-  }) => api.get<UnliquidatedTransaction[]>('/transactions', { params }),
+  getAll: (params?: TransactionParams) =>
+    api.get<UnliquidatedTransaction[]>('/transactions', { params }),
+  getAllColumnar: (params?: TransactionParams) =>
+    api.get<ColumnarTransactions>('/transactions', {
+      params,
+      headers: { Accept: COLUMNAR_JSON },
+    }),
   getYears: () => api.get<number[]>('/transactions/years'),
   aggregateByYear: () => api.get<YearlyAggregate[]>('/transactions/aggregate/by-year'),
   aggregateByProvince: (year?: number) =>
@@ -60,20 +129,66 @@ export const transactionsAPI = {
 };
 
 export const analyticsAPI = {
+  getDashboard: (topLgusLimit: number = 10) =>
+    api.get<DashboardResponse>('/analytics/dashboard', {
+      params: { top_lgus_limit: topLgusLimit },
+    }),
   getStats: () => api.get<StatsResponse>('/analytics/stats'),
   getYearlyTrends: () => api.get<YearlyTrend[]>('/analytics/trends/yearly'),
   getAmountDistribution: () => api.get('/analytics/distribution/amount-ranges'),
   getProvinceYearHeatmap: () => api.get('/analytics/heatmap/province-year'),
+  getProvinceYearMatrix: () =>
+    api.get<ProvinceYearMatrix>('/analytics/heatmap/province-year', {
+      headers: { Accept: COLUMNAR_JSON },
+    }),
 };
 
+async function analyzeStream(
+  request: LLMRequest,
+  onToken: (text: string) => void,
+  signal?: AbortSignal
+): Promise<LLMAnalysis> {
+  const response = await fetch(`${API_BASE_URL}/llm/analyze/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify(request),
+    signal,
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Analysis failed with status ${response.status}`);
+  }
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = block.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] ?? 'null');
+      if (event === 'token') onToken(data.text);
+      else if (event === 'done') return data as LLMAnalysis;
+      else if (event === 'error') throw new Error(data.detail);
+    }
+  }
+  throw new Error('Analysis stream ended early');
+}
+
 export const llmAPI = {
   analyze: (request: LLMRequest) => api.post<LLMAnalysis>('/llm/analyze', request),
+  analyzeStream,
   getAnalyses: (params?: {
     lgu_id?: number;
     report_id?: number;
     analysis_type?: string;
     skip?: number;
     limit?: number;
+    cursor?: string;
   }) => api.get<LLMAnalysis[]>('/llm/analyses', { params }),
   getAnalysisById: (id: number) => api.get<LLMAnalysis>(`/llm/analyses/${id}`),
 };
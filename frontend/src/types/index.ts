@@ -18,6 +18,13 @@ export interface LocalGovernment {
   updated_at: string;
 }
 
+export interface LGUSearchHit {
+  id: number;
+  name: string;
+  province?: string;
+  score: number;
+}
+
 export interface UnliquidatedTransaction {
   id: number;
   lgu_id: number;
@@ -51,12 +58,23 @@ export interface StatsResponse {
   provinces_count: number;
 }
 
+export interface LGUYearTotal {
+  year: number;
+  total_amount: number;
+  transaction_count: number;
+}
+
 export interface LGUDetailResponse {
   lgu: LocalGovernment;
   total_unliquidated: number;
   years_with_data: number[];
+  by_year: LGUYearTotal[];
+  transaction_count: number;
+  report_count: number;
   transactions: UnliquidatedTransaction[];
+  transactions_next_cursor?: string;
   reports: AuditReport[];
+  reports_next_cursor?: string;
 }
 
 export interface YearlyAggregate {
@@ -87,6 +105,81 @@ export interface YearlyTrend {
   lgus_count: number;
 }
 
+export interface AmountRange {
+  range: string;
+  min: number;
+  max: number | null;
+  count: number;
+  total_amount: number;
+}
+
+export interface ProvinceYearCell {
+  province: string | null;
+  year: number;
+  total_amount: number;
+}
+
+export interface TopicOverview {
+  topic: AuditTopic;
+  report_count: number;
+  avg_proportion: number | null;
+}
+
+export interface TopicTrendPoint {
+  topic_id: number;
+  topic_number: number;
+  year: number | null;
+  province: string | null;
+  report_count: number;
+  avg_proportion: number;
+  share: number | null;
+}
+
+export interface TopicMatrix {
+  topic_ids: number[];
+  topic_numbers: number[];
+  reports: number;
+  cooccurrence_threshold: number;
+  correlation: number[][];
+  cooccurrence: number[][];
+}
+
+export interface ProvinceYearMatrix {
+  provinces: (string | null)[];
+  years: number[];
+  total_amount: (number | null)[][];
+}
+
+export interface ColumnarTransactions {
+  id: number[];
+  lgu_id: number[];
+  report_id: (number | null)[];
+  year: number[];
+  amount: number[];
+  context_pre: (string | null)[];
+  context_post: (string | null)[];
+  created_at: string[];
+  updated_at: string[];
+  lgus: {
+    id: number[];
+    name: string[];
+    province: (string | null)[];
+    region: (string | null)[];
+    lgu_type: (string | null)[];
+    created_at: string[];
+    updated_at: string[];
+  };
+}
+
+export interface DashboardResponse {
+  stats: StatsResponse;
+  yearly_trends: YearlyTrend[];
+  province_totals: ProvinceAggregate[];
+  top_lgus: TopLGU[];
+  amount_distribution: AmountRange[];
+  province_year_heatmap: ProvinceYearCell[];
+}
+
 export interface LLMAnalysis {
   id: number;
   report_id?: number;